@@ -0,0 +1,184 @@
+'''
+FPL API Snapshot for FPL Automation Project
+
+Every lookup on the FPL bootstrap-static endpoint (recent gameweek, average scores, injuries) goes
+through one shared snapshot, so a process downloads the payload at most once. Snapshots are also kept
+on disk for a configurable TTL, and in offline mode no request is ever made: the last snapshot on disk
+is used whatever its age, and a requests.ConnectionError is raised if there is none.
+
+Configure from code with api.configure(...) or from the environment with FPL_API_URL, FPL_API_TTL,
+FPL_API_CACHE and FPL_OFFLINE=1. Any other base URL (e.g. a local fpl_auto.standin server) gets its own
+snapshot, cached on disk apart from the live API's.
+'''
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = 'https://fantasy.premierleague.com/api/'
+
+class bootstrap_snapshot:
+    def __init__(self, base_url=API_URL, cache_location='data/api', ttl=3600, offline=False):
+        """
+        Initialize the snapshot.
+
+        Args:
+            base_url (str): The root of the FPL API (default: the live API).
+            cache_location (str): The directory snapshots are kept in on disk (default: 'data/api').
+            ttl (float): Seconds a snapshot stays fresh, in memory and on disk (default: 3600).
+            offline (bool): Never make a request, only use the snapshot on disk (default: False).
+        """
+        self.base_url = base_url if base_url.endswith('/') else f'{base_url}/'
+        self.cache_location = cache_location
+        self.ttl = ttl
+        self.offline = offline
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.lock = threading.Lock()
+        self.payload = None
+        self.fetched_at = 0
+        self.requests_made = 0
+
+    def cache_path(self):
+        """
+        Get the path of the snapshot on disk.
+
+        Returns:
+            str: The path of the cached bootstrap-static payload, in a folder of its own for any API other than the live one.
+        """
+        if self.base_url == API_URL:
+            return f'{self.cache_location}/bootstrap-static.json'
+        return f"{self.cache_location}/{urlsplit(self.base_url).netloc.replace(':', '_')}/bootstrap-static.json"
+
+    def read_disk(self):
+        """
+        Read the snapshot on disk.
+
+        Returns:
+            tuple: The payload and the time it was fetched, or (None, 0) if there is no snapshot.
+        """
+        try:
+            with open(self.cache_path()) as file:
+                return json.load(file), os.path.getmtime(self.cache_path())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, 0
+
+    def write_disk(self, payload):
+        """
+        Write a snapshot to disk, replacing the previous one atomically.
+
+        Args:
+            payload (dict): The bootstrap-static payload.
+        """
+        os.makedirs(os.path.dirname(self.cache_path()), exist_ok=True)
+        temp_path = f'{self.cache_path()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(payload, file)
+        os.replace(temp_path, self.cache_path())
+
+    def get(self):
+        """
+        Get the bootstrap-static payload, from memory, then disk, then the API.
+
+        Returns:
+            dict: The bootstrap-static payload.
+        """
+        with self.lock:
+            now = time.time()
+            if self.payload is not None and (self.offline or now - self.fetched_at < self.ttl):
+                return self.payload
+
+            payload, fetched_at = self.read_disk()
+            if payload is not None and (self.offline or now - fetched_at < self.ttl):
+                self.payload, self.fetched_at = payload, fetched_at
+                return payload
+            if self.offline:
+                raise requests.ConnectionError(f'Offline mode and no bootstrap-static snapshot at {self.cache_path()}')
+
+            response = self.session.get(f'{self.base_url}bootstrap-static/', timeout=30)
+            response.raise_for_status()
+            self.requests_made += 1
+            self.payload, self.fetched_at = response.json(), now
+            self.write_disk(self.payload)
+            return self.payload
+
+    def clear(self):
+        """
+        Drop the in-memory snapshot, so the next lookup reads the disk (or the API) again.
+        """
+        with self.lock:
+            self.payload = None
+            self.fetched_at = 0
+
+def from_environment():
+    """
+    Build a snapshot configured from the FPL_API_URL, FPL_API_TTL, FPL_API_CACHE and FPL_OFFLINE environment variables.
+
+    Returns:
+        bootstrap_snapshot: The configured snapshot.
+    """
+    return bootstrap_snapshot(base_url=os.environ.get('FPL_API_URL', API_URL),
+                              cache_location=os.environ.get('FPL_API_CACHE', 'data/api'),
+                              ttl=float(os.environ.get('FPL_API_TTL', 3600)),
+                              offline=os.environ.get('FPL_OFFLINE', '') not in ('', '0', 'false', 'False'))
+
+# Shared by every fpl_data instance in the process
+shared_snapshot = from_environment()
+# Snapshots of other base URLs, e.g. local stand-ins of the API
+url_snapshots = {}
+
+def configure(base_url=None, cache_location=None, ttl=None, offline=None):
+    """
+    Reconfigure the shared snapshot. Arguments left as None keep their current value.
+
+    Args:
+        base_url (str): The root of the FPL API.
+        cache_location (str): The directory snapshots are kept in on disk.
+        ttl (float): Seconds a snapshot stays fresh.
+        offline (bool): Never make a request, only use the snapshot on disk.
+
+    Returns:
+        bootstrap_snapshot: The shared snapshot.
+    """
+    if base_url is not None:
+        shared_snapshot.base_url = base_url if base_url.endswith('/') else f'{base_url}/'
+    if cache_location is not None:
+        shared_snapshot.cache_location = cache_location
+    if ttl is not None:
+        shared_snapshot.ttl = ttl
+    if offline is not None:
+        shared_snapshot.offline = offline
+    shared_snapshot.clear()
+    return shared_snapshot
+
+def snapshot(base_url=None):
+    """
+    Get the snapshot of an API, shared by every lookup on the same base URL.
+
+    Args:
+        base_url (str): The root of the API (default: None, the shared snapshot's).
+
+    Returns:
+        bootstrap_snapshot: The snapshot, with the shared snapshot's cache location, TTL and offline mode.
+    """
+    if base_url is None:
+        return shared_snapshot
+    base_url = base_url if base_url.endswith('/') else f'{base_url}/'
+    if base_url == shared_snapshot.base_url:
+        return shared_snapshot
+    if base_url not in url_snapshots:
+        url_snapshots[base_url] = bootstrap_snapshot(base_url, shared_snapshot.cache_location, shared_snapshot.ttl, shared_snapshot.offline)
+    return url_snapshots[base_url]
+
+def bootstrap_static():
+    """
+    Get the bootstrap-static payload from the shared snapshot.
+
+    Returns:
+        dict: The bootstrap-static payload.
+    """
+    return shared_snapshot.get()
@@ -0,0 +1,129 @@
+'''
+Player Availability for FPL Automation Project
+
+Per-gameweek bitsets (numpy bool vectors over the season's player ids) of who played and who didn't,
+built once per season from the compiled gameweek store (or the gameweek CSVs). Checking, masking and
+auto-subbing non-players are then boolean array operations instead of reloading a gameweek and
+filtering minutes == 0. A player with any zero-minute row in a gameweek (e.g. one fixture of a double
+gameweek) counts as not having played, as the minutes == 0 filter did.
+'''
+import numpy as np
+
+# Marks a player without a zero-minute row in a gameweek
+NO_ROW = np.iinfo(np.int32).max
+
+class availability:
+    def __init__(self, played, didnt_play, order):
+        """
+        Initialize the availability bitsets.
+
+        Args:
+            played (numpy.ndarray): (gameweeks x players) bool, True where a player has a row with minutes; row 0 is GW1.
+            didnt_play (numpy.ndarray): (gameweeks x players) bool, True where a player has a zero-minute row.
+            order (numpy.ndarray): (gameweeks x players) int32, the position of each player's first zero-minute row
+                among the gameweek's zero-minute rows, NO_ROW where there is none.
+        """
+        self.played = played
+        self.didnt_play = didnt_play
+        self.order = order
+        self.weeks = set((np.nonzero(played.any(axis=1) | didnt_play.any(axis=1))[0] + 1).tolist())
+
+    def has_gw(self, week_num):
+        """
+        Check whether a gameweek has any rows.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek is present.
+        """
+        return week_num in self.weeks
+
+    def mask(self, bitsets, player_ids, week_num):
+        """
+        Look players up in a gameweek's bitset.
+
+        Args:
+            bitsets (numpy.ndarray): self.played or self.didnt_play.
+            player_ids (list): The player ids.
+            week_num (int): The week number.
+
+        Returns:
+            numpy.ndarray: A bool per player, False for ids interned after the bitsets were built.
+        """
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        known = player_ids < bitsets.shape[1]
+        mask = np.zeros(len(player_ids), dtype=bool)
+        mask[known] = bitsets[week_num - 1, player_ids[known]]
+        return mask
+
+    def played_mask(self, player_ids, week_num):
+        """
+        Check which players played in a gameweek.
+
+        Args:
+            player_ids (list): The player ids.
+            week_num (int): The week number.
+
+        Returns:
+            numpy.ndarray: True for each player with minutes in the gameweek.
+        """
+        return self.mask(self.played, player_ids, week_num)
+
+    def didnt_play_mask(self, player_ids, week_num):
+        """
+        Check which players didn't play in a gameweek.
+
+        Args:
+            player_ids (list): The player ids.
+            week_num (int): The week number.
+
+        Returns:
+            numpy.ndarray: True for each player with a zero-minute row in the gameweek.
+        """
+        return self.mask(self.didnt_play, player_ids, week_num)
+
+    def didnt_play_ids(self, week_num, player_ids=None):
+        """
+        Get the players who didn't play in a gameweek, in the order of the gameweek's rows.
+
+        Args:
+            week_num (int): The week number.
+            player_ids (list): Only consider these players (default: None, every player).
+
+        Returns:
+            list: The ids of the players with a zero-minute row.
+        """
+        if player_ids is None:
+            player_ids = np.flatnonzero(self.didnt_play[week_num - 1])
+        else:
+            player_ids = np.unique(np.asarray(player_ids, dtype=np.int64)[self.didnt_play_mask(player_ids, week_num)])
+        return player_ids[np.argsort(self.order[week_num - 1, player_ids], kind='stable')].tolist()
+
+def build_availability(season_gws, player_ids):
+    """
+    Build the availability bitsets of a season.
+
+    Args:
+        season_gws (list): (week number, names, minutes) per gameweek, names and minutes as arrays in CSV row order.
+        player_ids (ids.player_ids): The season's player ids; every name in the gameweeks is interned.
+
+    Returns:
+        availability: The availability bitsets, or None if there are no gameweeks.
+    """
+    if len(season_gws) == 0:
+        return None
+    season_codes = [np.array(player_ids.intern_all(np.asarray(names).astype(str)), dtype=np.int64) for _, names, _ in season_gws]
+    shape = (max(week_num for week_num, _, _ in season_gws), len(player_ids))
+    played = np.zeros(shape, dtype=bool)
+    didnt_play = np.zeros(shape, dtype=bool)
+    order = np.full(shape, NO_ROW, dtype=np.int32)
+    for (week_num, _, minutes), codes in zip(season_gws, season_codes):
+        zero = np.asarray(minutes) == 0
+        played[week_num - 1, codes[~zero]] = True
+        didnt_play[week_num - 1, codes[zero]] = True
+        # np.unique's first index of each player is their first zero-minute row
+        zero_codes, first = np.unique(codes[zero], return_index=True)
+        order[week_num - 1, zero_codes] = first
+    return availability(played, didnt_play, order)
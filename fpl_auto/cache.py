@@ -0,0 +1,122 @@
+'''
+Shared Table Cache for FPL Automation Project
+
+A process-wide, size-bounded LRU cache of parsed data tables (gameweeks, fixtures, teams,
+player lists) so that every fpl_data instance parses each file at most once per process.
+
+Cached tables are shared between callers and must be treated as read-only.
+'''
+import os
+import threading
+from collections import OrderedDict
+
+class table_cache:
+    def __init__(self, max_entries=256):
+        """
+        Initialize the table cache.
+
+        Args:
+            max_entries (int): The maximum number of tables held before the least recently used is evicted.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Get a table from the cache, loading it on a miss.
+
+        Args:
+            key (tuple): The cache key (data_location, season, table, week).
+            loader (callable): Called with no arguments to load the table on a miss.
+
+        Returns:
+            object: The cached table.
+        """
+        table = key[2]
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits[table] = self.hits.get(table, 0) + 1
+                return self.entries[key]
+            self.misses[table] = self.misses.get(table, 0) + 1
+
+        # Load outside the lock, failed loads (e.g. missing files) are not cached
+        value = loader()
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, data_location=None, season=None, table=None):
+        """
+        Drop cached tables, e.g. after the data tree has changed. Arguments left as None match everything.
+
+        Args:
+            data_location (str): Only drop tables from this data location.
+            season (str): Only drop tables from this season.
+            table (str): Only drop this kind of table.
+
+        Returns:
+            int: The number of tables dropped.
+        """
+        if data_location is not None:
+            data_location = os.path.normpath(data_location)
+        with self.lock:
+            stale = [key for key in self.entries
+                     if (data_location is None or key[0] == data_location)
+                     and (season is None or key[1] == season)
+                     and (table is None or key[2] == table)]
+            for key in stale:
+                del self.entries[key]
+        return len(stale)
+
+    def resize(self, max_entries):
+        """
+        Change the maximum number of cached tables, evicting the least recently used if needed.
+
+        Args:
+            max_entries (int): The new maximum number of tables.
+        """
+        with self.lock:
+            self.max_entries = max_entries
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def reset_stats(self):
+        """
+        Reset the hit, miss and eviction counters.
+        """
+        with self.lock:
+            self.hits = {}
+            self.misses = {}
+            self.evictions = 0
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Hits and misses per table, plus the totals, evictions and current size.
+        """
+        with self.lock:
+            tables = sorted(set(self.hits) | set(self.misses))
+            return {
+                'tables': {table: {'hits': self.hits.get(table, 0), 'misses': self.misses.get(table, 0)} for table in tables},
+                'hits': sum(self.hits.values()),
+                'misses': sum(self.misses.values()),
+                'evictions': self.evictions,
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+            }
+
+# Shared by every fpl_data instance in the process
+shared_cache = table_cache()
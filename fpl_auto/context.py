@@ -0,0 +1,263 @@
+'''
+Season Context for FPL Automation Project
+
+Everything a team needs that only depends on the season (and gameweek), built once and
+shared by every team object in a simulation so per-gameweek construction only holds squad state.
+Per-player lookups are keyed by the season's interned player ids (see fpl_auto.ids), the same ids
+the team engine holds its squad in.
+'''
+import fpl_auto.data as fpl
+from fpl_auto import predictions
+from fpl_auto import xp_index
+
+# Club code of players without a club in the gameweek data
+NO_CLUB = 0
+# The season the team engine treats as live, the only one whose recent gameweek comes from the API
+LIVE_SEASON = '2023-24'
+
+class season_context:
+    def __init__(self, season, data_location='data', predictions_location='predictions', api_url=None):
+        """
+        Initialize the season context.
+
+        Parameters:
+            - season (str): The season being simulated.
+            - data_location (str): The location of the data (default: 'data').
+            - predictions_location (str): The location of the exported predictions (default: 'predictions').
+            - api_url (str): The root of the FPL API, e.g. a local fpl_auto.standin server (default: None, the configured API).
+
+        Returns:
+            - None
+        """
+        self.season = season
+        self.predictions_location = predictions_location
+        self.predictions_store = predictions.load_predictions(predictions_location, season)
+        self.fpl = fpl.fpl_data(data_location, season, api_url=api_url)
+        self.positions = ['GK', 'DEF', 'MID', 'FWD']
+        self.player_list = self.fpl.player_list
+        self.player_ids = self.fpl.player_ids
+        # Player id --> position, for every player in the season's player list
+        self.player_id_list = self.player_ids.keyed(self.player_list)
+        self.position_player_lists = {position: [player for player in self.player_id_list if self.player_id_list[player] == position] for position in self.positions}
+
+        # Past seasons are simulated without contacting the API
+        self.recent_gw = 38
+        if season == LIVE_SEASON:
+            try:
+                self.recent_gw = self.fpl.get_recent_gw() - 1
+            except:
+                self.recent_gw = 38 # if gw = 1, recent_gw = 0 ==> set recent_gw=38
+
+        # Per-gameweek lookups, filled lazily and then reused
+        self.gw_data = {}
+        self.predictions = {}
+        self.xp_dicts = {}
+        self.xp_horizons = {}
+        self.n_gws_xp = {}
+        self.n_gws_xp_dicts = {}
+        self.xp_indexes = {}
+        self.position_dicts = {}
+        self.points_dicts = {}
+        self.club_dicts = {}
+        self.club_code_dicts = {}
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError(f'season_context is immutable, cannot set {name}')
+        super().__setattr__(name, value)
+
+    def get_gw_data(self, gameweek):
+        """
+        Returns the data for a gameweek.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - pandas.DataFrame: The gameweek data, indexed by player name.
+        """
+        if gameweek not in self.gw_data:
+            self.gw_data[gameweek] = self.fpl.get_gw_data(self.season, gameweek)
+        return self.gw_data[gameweek]
+
+    def get_predictions(self, gameweek):
+        """
+        Returns the exported predictions for a gameweek.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - list: The GK, DEF, MID and FWD predictions (Name, xP).
+        """
+        if gameweek not in self.predictions:
+            if self.predictions_store is not None and self.predictions_store.has_gw(gameweek):
+                self.predictions[gameweek] = self.predictions_store.get_gw(gameweek)
+            else:
+                # Seasons exported before the predictions store (or with TSVs only)
+                self.predictions[gameweek] = predictions.read_tsv_gw(self.predictions_location, self.season, gameweek)
+        return self.predictions[gameweek]
+
+    def get_xp_dicts(self, gameweek):
+        """
+        Returns the predicted points for a gameweek as player id --> xP dictionaries.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - list: The GK, DEF, MID and FWD dictionaries.
+        """
+        if gameweek not in self.xp_dicts:
+            self.xp_dicts[gameweek] = [dict(zip(self.player_ids.intern_all(xp.Name), xp.xP)) for xp in self.get_predictions(gameweek)]
+        return self.xp_dicts[gameweek]
+
+    def get_xp_horizons(self, gameweek):
+        """
+        Returns the fixture-adjusted expected points (xP) of every player over the rest of the season.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - list: The GK, DEF, MID and FWD horizon.xp_horizon, one column per remaining fixture up to GW38.
+        """
+        if gameweek not in self.xp_horizons:
+            self.xp_horizons[gameweek] = self.fpl.get_xp_horizons(self.get_predictions(gameweek), gameweek, 38 - gameweek)
+        return self.xp_horizons[gameweek]
+
+    def get_n_gws_xp(self, gameweek, n, discount_factor):
+        """
+        Returns the expected points (xP) over the next n gameweeks.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+            - n (int): The number of gameweeks.
+            - discount_factor (float): The discount factor for the expected points.
+
+        Returns:
+            - list: The discounted GK, DEF, MID and FWD predictions.
+        """
+        key = (gameweek, n, discount_factor)
+        if key not in self.n_gws_xp:
+            if gameweek < 36:
+                self.n_gws_xp[key] = self.fpl.discount_next_n_gws(self.get_predictions(gameweek), gameweek, n, discount_factor=discount_factor, xp_horizons=self.get_xp_horizons(gameweek))
+            else:
+                self.n_gws_xp[key] = self.get_predictions(gameweek)
+        return self.n_gws_xp[key]
+
+    def get_n_gws_xp_dicts(self, gameweek, n, discount_factor):
+        """
+        Returns the expected points (xP) over the next n gameweeks as player id --> xP dictionaries.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+            - n (int): The number of gameweeks.
+            - discount_factor (float): The discount factor for the expected points.
+
+        Returns:
+            - list: The GK, DEF, MID and FWD dictionaries.
+        """
+        key = (gameweek, n, discount_factor)
+        if key not in self.n_gws_xp_dicts:
+            self.n_gws_xp_dicts[key] = [dict(zip(self.player_ids.intern_all(xp.Name), xp.xP)) for xp in self.get_n_gws_xp(gameweek, n, discount_factor)]
+        return self.n_gws_xp_dicts[key]
+
+    def get_xp_index(self, gameweek, n, discount_factor, position, price_gameweek):
+        """
+        Returns the xP-sorted index of a position's players over the next n gameweeks, priced in some gameweek.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+            - n (int): The number of gameweeks.
+            - discount_factor (float): The discount factor for the expected points.
+            - position (str): The position ('GK', 'DEF', 'MID', 'FWD').
+            - price_gameweek (int): The gameweek the players are priced in.
+
+        Returns:
+            - xp_index.position_index: The index.
+        """
+        key = (gameweek, n, discount_factor, position, price_gameweek)
+        if key not in self.xp_indexes:
+            position_xp = self.get_n_gws_xp(gameweek, n, discount_factor)[self.positions.index(position)]
+            price_data = self.get_gw_data(price_gameweek)
+            self.xp_indexes[key] = xp_index.build_position_index(position_xp, self.player_ids, lambda names: self.fpl.get_prices(names, price_data))
+        return self.xp_indexes[key]
+
+    def position_dict(self, gameweek):
+        """
+        Returns the player id --> position dictionary for a gameweek.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - dict: The position of each player.
+        """
+        if gameweek not in self.position_dicts:
+            self.position_dicts[gameweek] = self.player_ids.keyed(self.fpl.position_dict(gameweek))
+        return self.position_dicts[gameweek]
+
+    def actual_points_dict(self, gameweek):
+        """
+        Returns the player id --> points dictionary for a gameweek.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - dict: The points scored by each player.
+        """
+        if gameweek not in self.points_dicts:
+            self.points_dicts[gameweek] = self.player_ids.keyed(self.fpl.actual_points_dict(self.season, gameweek))
+        return self.points_dicts[gameweek]
+
+    def club_dict(self, gameweek):
+        """
+        Returns the player id --> club dictionary for a gameweek.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - dict: The club of each player in the gameweek data. Names with several rows map to all their clubs (a Series), as gw_data.loc does.
+        """
+        if gameweek not in self.club_dicts:
+            clubs = self.get_gw_data(gameweek)['team']
+            duplicated = clubs.index.duplicated(keep=False)
+            club_dict = dict(zip(self.player_ids.intern_all(clubs.index[~duplicated]), clubs[~duplicated].tolist()))
+            for name in clubs.index[duplicated].unique():
+                club_dict[self.player_ids.intern(name)] = clubs.loc[name]
+            self.club_dicts[gameweek] = club_dict
+        return self.club_dicts[gameweek]
+
+    def club_codes(self, gameweek):
+        """
+        Returns the player id --> club code dictionary for a gameweek, for counting clubs in an array.
+
+        Parameters:
+            - gameweek (int): The gameweek.
+
+        Returns:
+            - dict: The club code of each player in the gameweek data, players without one are NO_CLUB.
+            - list: The club of each code, as a string ('None' for NO_CLUB).
+        """
+        if gameweek not in self.club_code_dicts:
+            club_dict = self.club_dict(gameweek)
+            club_names = ['None'] + sorted(set(str(club) for club in club_dict.values()) - {'None'})
+            name_to_code = {name: code for code, name in enumerate(club_names)}
+            self.club_code_dicts[gameweek] = ({player: name_to_code[str(club)] for player, club in club_dict.items()}, club_names)
+        return self.club_code_dicts[gameweek]
+
+    def get_player_list(self, position):
+        """
+        Returns the list of players for a given position.
+
+        Parameters:
+            - position (str): The position ('GK', 'DEF', 'MID', 'FWD').
+
+        Returns:
+            - list: A list of player ids for the given position.
+        """
+        return self.position_player_lists[position]
@@ -7,30 +7,87 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.neural_network import MLPRegressor
 import datetime
-import requests 
+import os
 import json
+import time
+import tracemalloc
+from fpl_auto import store
+from fpl_auto import cache
+from fpl_auto import players
+from fpl_auto import understat
+from fpl_auto import timeline
+from fpl_auto import api
+from fpl_auto import fixtures
+from fpl_auto import prices
+from fpl_auto import ids
+from fpl_auto import availability
+from fpl_auto import names
+from fpl_auto import horizon
+from fpl_auto import rolling
+
+# Post-model weightings, the share of xP added for the next fixture (and the xP added per fixture over a horizon)
+HOME_WEIGHTING = 0.1
+AWAY_WEIGHTING = -0.1
+DIFFICULTY_WEIGHTINGS = {1: 0.2, 2: 0.05, 3: 0.0, 4: -0.05, 5: -0.2}
 
 class fpl_data:
-    def __init__(self, data_location, season):
+    def __init__(self, data_location, season, understat_stats=None, api_url=None):
         """
         Initialize the fpl_data class.
 
         Args:
             data_location (str): The location of the data.
             season (str): The season of the data.
+            understat_stats (list): Understat stats (e.g. ['xG', 'xA']) to add to the position data features (default: None, no understat features).
+            api_url (str): The root of the FPL API, e.g. a local fpl_auto.standin server (default: None, the configured API).
         """
-        self.data_location = f'{data_location}'
+        # Normalised, so 'data' and 'data/' share cache entries and player ids
+        self.data_location = os.path.normpath(data_location)
         self.season = season
+        self.understat_stats = understat_stats
+        self.api = api.snapshot(api_url)
         self.prev_season = f'{int(season[:4])-1}-{int(season[5:])-1}'
+        self.timeline = self.cached(None, 'timeline', None, lambda: timeline.timeline(self.data_location))
         self.player_list = self.get_player_list(season)
+        self.player_ids = self.get_player_ids(season)
         self.team_list = self.get_team_list(season)
         self.team_to_id = self.team_list.reset_index().set_index('name').to_dict()['id']
         self.id_to_name = self.id_to_name_dict()
+        # (season, position) --> rolling player window, and the gameweek totals it was built from
+        self.player_windows = {}
+        self.player_window_weeks = {}
+
+    def cached(self, season, table, week_num, loader):
+        """
+        Retrieve a table through the process-wide table cache.
+
+        Args:
+            season (str): The season of the data.
+            table (str): The kind of table (e.g. 'gws', 'fixtures').
+            week_num (int): The week number of the data, None for season-wide tables.
+            loader (callable): Loads the table on a cache miss.
+
+        Returns:
+            object: The cached table, shared with other fpl_data instances.
+        """
+        return cache.shared_cache.get((self.data_location, season, table, week_num), loader)
 
     def get_player_list(self, season):
         """
         Retrieve the player list for a given season.
 
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            dict: The player list for the specified season.
+        """
+        return self.cached(season, 'players', None, lambda: self.read_player_list(season))
+
+    def read_player_list(self, season):
+        """
+        Parse the player list for a given season.
+
         Args:
             season (str): The season of the data.
 
@@ -48,10 +105,47 @@ class fpl_data:
 
         return player_dict
     
+    def get_player_ids(self, season):
+        """
+        Retrieve the player ids for a given season, shared by every fpl_data instance of the season.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            ids.player_ids: The season's player ids, seeded from the player list; other names are interned on demand.
+        """
+        # Kept out of the LRU table cache, tables keyed by id (e.g. availability) must never see the ids change
+        key = (self.data_location, season)
+        if key not in ids.season_player_ids:
+            ids.season_player_ids.setdefault(key, ids.player_ids(self.get_player_list(season)))
+        return ids.season_player_ids[key]
+
+    def get_name_index(self):
+        """
+        Retrieve the name index of every season, for finding players from any spelling of their name.
+
+        Returns:
+            names.name_index: The index of folded names, element ids and cross-season identities.
+        """
+        return self.cached(None, 'names', None, lambda: names.build_name_index(self.data_location))
+
     def get_team_list(self, season):
         """
         Retrieve the team list for a given season.
 
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            pandas.DataFrame: The team list for the specified season.
+        """
+        return self.cached(season, 'teams', None, lambda: self.read_team_list(season))
+
+    def read_team_list(self, season):
+        """
+        Parse the team list for a given season.
+
         Args:
             season (str): The season of the data.
 
@@ -73,16 +167,122 @@ class fpl_data:
         Returns:
             pandas.DataFrame: The game week data for the specified season and week.
         """
-        try:
-            if week_num < 1:
-                gw_data = pd.read_csv(f'{self.data_location}/{self.prev_season}/gws/gw{38 + week_num}.csv')
-            else:
-                gw_data = pd.read_csv(f'{self.data_location}/{season}/gws/gw{week_num}.csv')
-        except FileNotFoundError:
-            #print(f'File not found: {self.data_location}/{season}/gws/gw{week_num}.csv, Either the gameweek has not happened yet, or the data is not available.')
-            pass
-        gw_data = gw_data[['name', 'position', 'team', 'assists', 'bps', 'clean_sheets', 'creativity', 'goals_conceded', 'goals_scored', 'ict_index', 'influence', 'minutes', 'own_goals', 'penalties_missed', 'penalties_saved', 'red_cards', 'saves', 'threat', 'total_points', 'yellow_cards', 'selected', 'was_home', 'value']]
-        return gw_data.set_index('name')
+        season, week_num = self.resolve_gw(season, week_num)
+        gw_data = self.cached(season, 'gws', week_num, lambda: self.load_gw_data(season, week_num))
+        # set_index hands each caller its own copy of the shared table
+        gw_data = gw_data.set_index('name')
+        # Remember where the frame came from so get_price can read the compiled tensor instead
+        gw_data.attrs['gw'] = (season, week_num, len(gw_data))
+        return gw_data
+
+    def resolve_gw(self, season, week_num):
+        """
+        Resolve a week number, mapping weeks before GW1 onto the end of earlier seasons.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): The week number of the data.
+
+        Returns:
+            tuple: The season and week number holding the data.
+        """
+        return self.timeline.resolve(season, week_num)
+
+    def get_gw_tensor(self, season, week_num=None):
+        """
+        Retrieve the memory-mapped gameweek tensor of a season, if one has been built.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): Only return the tensor if it holds this week (default: None, any week).
+
+        Returns:
+            store.gw_tensor: The gameweek tensor, or None.
+        """
+        gw_tensor = self.cached(season, 'gw_tensor', None, lambda: store.load_gw_tensor(self.data_location, season))
+        if gw_tensor is None or (week_num is not None and not gw_tensor.has_gw(week_num)):
+            return None
+        return gw_tensor
+
+    def load_gw_data(self, season, week_num):
+        """
+        Load the (unindexed) game week data, from the compiled store if available, otherwise from the CSV, in the compact store.GW_SCHEMA dtypes.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): The week number of the data.
+
+        Returns:
+            pandas.DataFrame: The game week data for the specified season and week.
+        """
+        gw_data = self.get_stored_gw_data(season, week_num)
+        if gw_data is None:
+            # Fall back to parsing the CSV if the season has not been compiled
+            gw_data = self.read_gw_csv(season, week_num)
+        return store.compact_gw(gw_data)
+
+    def read_gw_csv(self, season, week_num):
+        """
+        Parse the game week CSV for a given season and week.
+        Raises FileNotFoundError if the gameweek has not happened yet, or the data is not available.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): The week number of the data.
+
+        Returns:
+            pandas.DataFrame: The game week data (unindexed) for the specified season and week.
+        """
+        gw_data = pd.read_csv(f'{self.data_location}/{season}/gws/gw{week_num}.csv')
+        gw_data = gw_data[store.GW_COLUMNS]
+        return gw_data
+
+    def get_stored_gw_data(self, season, week_num):
+        """
+        Retrieve the game week data from the compiled gameweek store, if one has been built.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): The week number of the data.
+
+        Returns:
+            pandas.DataFrame: The game week data, or None if the season/week is not in a compiled store.
+        """
+        gw_store = self.cached(season, 'gw_store', None, lambda: store.load_gw_store(self.data_location, season))
+        if gw_store is None:
+            return None
+        return gw_store.get_gw(week_num)
+
+    def get_player_history(self, elements, table='gw', season=None):
+        """
+        Retrieve the per-player history of one or many players, from the consolidated player store if available.
+
+        Args:
+            elements (int or list): The element id(s) of the player(s).
+            table (str): 'gw' for the season's gameweek rows, 'history' for previous seasons (default: 'gw').
+            season (str): The season of the data (default: the season of this fpl_data).
+
+        Returns:
+            pandas.DataFrame: The rows of every player found, with an 'element' column, ordered by player then round.
+        """
+        season = season or self.season
+        if not isinstance(elements, (list, tuple, np.ndarray)):
+            elements = [elements]
+        player_store = self.cached(season, 'player_store', None, lambda: players.load_player_store(self.data_location, season))
+        if player_store is not None:
+            return player_store.get_players(elements, table)
+
+        # Fall back to the per-player directories if the season has not been consolidated
+        player_dirs = self.cached(season, 'player_dirs', None, lambda: players.player_dirs(self.data_location, season))
+        frames = []
+        for element in elements:
+            if element in player_dirs:
+                _, tables = players.read_player_dir(self.data_location, season, player_dirs[element])
+                if tables[table] is not None:
+                    frames.append(tables[table].assign(element=element))
+        if len(frames) == 0:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
 
     def get_pos_data(self, season, week_num, position):
         """
@@ -96,15 +296,79 @@ class fpl_data:
         Returns:
             pandas.DataFrame: Player data for the specified position in the given season and week.
         """
-        gw_data = self.get_gw_data(season, week_num)
-        gw_data = gw_data[gw_data['position'] == position]
+        gw_season, gw_week = self.resolve_gw(season, week_num)
+        gw_tensor = self.get_gw_tensor(gw_season, gw_week)
+        if gw_tensor is not None:
+            gw_data = store.compact_gw(gw_tensor.get_gw(gw_week, position)).set_index('name')
+        else:
+            gw_data = self.get_gw_data(season, week_num)
+            gw_data = gw_data[gw_data['position'] == position]
+        return self.join_understat(self.prepare_pos_data(gw_data).drop('position', axis=1), self.get_week_understat(gw_season, gw_week))
+
+    def prepare_pos_data(self, gw_data):
+        """
+        Turn game week data into player features: add team data and drop incomplete rows.
+
+        Args:
+            gw_data (pandas.DataFrame): The game week data, indexed by player name.
+
+        Returns:
+            pandas.DataFrame: The player features, with the position column still in.
+        """
         # Append team data to player data
         gw_data = gw_data.join(self.team_list, on='team')
         
         # Drop rows with NaN values
         gw_data = gw_data.dropna()
-        gw_data = gw_data.drop(['position', 'team', 'ict_index'], axis=1)
-        return gw_data
+        return gw_data.drop(['team', 'ict_index'], axis=1)
+
+    def get_week_understat(self, gw_season, gw_week):
+        """
+        Retrieve the understat stats requested in understat_stats for one game week.
+
+        Args:
+            gw_season (str): The season holding the game week.
+            gw_week (int): The game week in that season.
+
+        Returns:
+            pandas.DataFrame: The understat stats indexed by player name, or None if none were requested.
+        """
+        if not self.understat_stats:
+            return None
+        return self.get_understat(gw_season, gw_week, gw_week)
+
+    def join_understat(self, pos_data, understat_data):
+        """
+        Add understat stats to player features.
+
+        Args:
+            pos_data (pandas.DataFrame): The player features of one position, indexed by player name.
+            understat_data (pandas.DataFrame): The week's understat stats, from get_week_understat.
+
+        Returns:
+            pandas.DataFrame: The player features, with understat stats if any were requested.
+        """
+        if understat_data is not None:
+            # Players without understat matches that week have no expected goals / assists
+            pos_data = pos_data.join(understat_data).fillna({stat: 0 for stat in self.understat_stats})
+        return pos_data
+
+    def get_understat(self, season, from_gw, to_gw):
+        """
+        Retrieve the understat stats requested in understat_stats, summed over a window of gameweeks.
+
+        Args:
+            season (str): The season of the data.
+            from_gw (int): The first gameweek of the window.
+            to_gw (int): The last gameweek of the window (inclusive).
+
+        Returns:
+            pandas.DataFrame: The understat stats indexed by player name, empty if the season has no understat data.
+        """
+        understat_table = self.cached(season, 'understat', None, lambda: understat.load_understat(self.data_location, season))
+        if understat_table is None:
+            return pd.DataFrame(columns=self.understat_stats, dtype=float)
+        return understat_table.window(from_gw, to_gw, self.understat_stats)
     
     def get_all_pos_data(self, season, week_num):
         """
@@ -117,11 +381,19 @@ class fpl_data:
         Returns:
             tuple: Player data for all positions in the given season and week.
         """
-        gk_data = self.get_pos_data(season, week_num, 'GK')
-        def_data = self.get_pos_data(season, week_num, 'DEF')
-        mid_data = self.get_pos_data(season, week_num, 'MID')
-        fwd_data = self.get_pos_data(season, week_num, 'FWD')
-        return gk_data, def_data, mid_data, fwd_data
+        # Read and prepare the week once, then split it by position in one pass
+        gw_season, gw_week = self.resolve_gw(season, week_num)
+        gw_tensor = self.get_gw_tensor(gw_season, gw_week)
+        if gw_tensor is not None:
+            gw_data = store.compact_gw(gw_tensor.get_gw(gw_week)).set_index('name')
+        else:
+            gw_data = self.get_gw_data(season, week_num)
+        gw_data = self.prepare_pos_data(gw_data)
+        positions = gw_data.pop('position').astype(str).to_numpy()
+        pos_datas = dict(tuple(gw_data.groupby(positions, sort=False)))
+        understat_data = self.get_week_understat(gw_season, gw_week)
+        # The understat join reorders duplicate names, so it is made per position as before
+        return tuple(self.join_understat(pos_datas.get(position, gw_data.iloc[:0]), understat_data) for position in ['GK', 'DEF', 'MID', 'FWD'])
     
     def sum_player_data(self, season, from_gw, to_gw):
         """
@@ -138,47 +410,41 @@ class fpl_data:
         if self.season == '2022-23' and from_gw == 7:
             from_gw = 8
 
-        gk_data = self.get_pos_data(season, from_gw, 'GK')
-        def_data = self.get_pos_data(season, from_gw, 'DEF')
-        mid_data = self.get_pos_data(season, from_gw, 'MID')
-        fwd_data = self.get_pos_data(season, from_gw, 'FWD')
-
-        for i in range(from_gw + 1, to_gw + 1):
-            if self.season == '2022-23' and i == 7:
-                continue
-            gk_data = pd.concat((gk_data, self.get_pos_data(season, i, 'GK')))
-            def_data = pd.concat((def_data, self.get_pos_data(season, i, 'DEF')))
-            mid_data = pd.concat((mid_data, self.get_pos_data(season, i, 'MID')))
-            fwd_data = pd.concat((fwd_data, self.get_pos_data(season, i, 'FWD')))
-
-        # Group by player name and calculate the average
-        gk_data = gk_data.groupby('name').mean().reset_index().set_index('name')
-        def_data = def_data.groupby('name').mean().reset_index().set_index('name')
-        mid_data = mid_data.groupby('name').mean().reset_index().set_index('name')
-        fwd_data = fwd_data.groupby('name').mean().reset_index().set_index('name')
-
-        #print(f'Before: {len(gk_data)}')
-        
-        # Set injured players xP to 0
-        players_who_didnt_play = self.non_players(season, from_gw)
-        players_who_didnt_play = players_who_didnt_play.index
-
-        gk_data.loc[gk_data.index.isin(players_who_didnt_play), :] = 0
-        def_data.loc[def_data.index.isin(players_who_didnt_play), :] = 0
-        mid_data.loc[mid_data.index.isin(players_who_didnt_play), :] = 0
-        fwd_data.loc[fwd_data.index.isin(players_who_didnt_play), :] = 0
-        
-        # Set injured players xP to 0
-        players_who_didnt_play = self.non_players(season, from_gw + 1)
-        players_who_didnt_play = players_who_didnt_play.index
+        # Average of each player's rows in the window, from the cumulative sums of the window's gameweeks
+        pos_datas = tuple(self.get_player_window(season, position, from_gw, to_gw).mean(from_gw, max(from_gw, to_gw)) for position in ['GK', 'DEF', 'MID', 'FWD'])
+
+        # Set injured players (no minutes in from_gw or the week after) xP to 0
+        for pos_data in pos_datas:
+            pos_data.loc[self.didnt_play_mask(pos_data.index, season, from_gw, from_gw + 1), :] = 0
+
+        return pos_datas
+
+    def get_player_window(self, season, position, from_gw, to_gw):
+        """
+        Get the rolling window of a position's player data holding a range of game weeks, extending it if needed.
 
-        gk_data.loc[gk_data.index.isin(players_who_didnt_play), :] = 0
-        def_data.loc[def_data.index.isin(players_who_didnt_play), :] = 0
-        mid_data.loc[mid_data.index.isin(players_who_didnt_play), :] = 0
-        fwd_data.loc[fwd_data.index.isin(players_who_didnt_play), :] = 0
-        #print(f'After: {len(gk_data)}')
+        Args:
+            season (str): The season of the data.
+            position (str): The position of the players.
+            from_gw (int): The starting game week, < 1 for earlier seasons.
+            to_gw (int): The ending game week (inclusive).
 
-        return gk_data, def_data, mid_data, fwd_data
+        Returns:
+            rolling.player_window: A window over at least from_gw to to_gw; week keys are game weeks relative to season.
+        """
+        to_gw = max(from_gw, to_gw)
+        key = (season, position)
+        player_window = self.player_windows.get(key)
+        if player_window is not None and player_window.has_weeks(from_gw, to_gw):
+            return player_window
+        weeks = self.player_window_weeks.setdefault(key, {})
+        first_gw, last_gw = min([from_gw] + list(weeks)), max([to_gw] + list(weeks))
+        for week_num in range(first_gw, last_gw + 1):
+            if week_num not in weeks:
+                # GW7 of 2022-23 is left out of this season's windows
+                weeks[week_num] = None if self.season == '2022-23' and week_num == 7 else rolling.week_totals(self.get_pos_data(season, week_num, position))
+        self.player_windows[key] = rolling.player_window([(week_num, weeks[week_num]) for week_num in range(first_gw, last_gw + 1)])
+        return self.player_windows[key]
     
     def prune_features(self, features):
         """
@@ -277,28 +543,16 @@ class fpl_data:
 
         Args:
             season (str): The season of the data.
-            from_gw (int): The starting game week.
-            to_gw (int): The ending game week.
+            from_gw (int): The starting game week, < 1 to start in earlier seasons.
+            to_gw (int): The ending game week (exclusive).
 
         Returns:
             tuple: The training data and test data for each position.
         """
-        for i in range(from_gw, to_gw):
-            if i == from_gw:
-                if i < 1:
-                    training_gk, training_def, training_mid, training_fwd = self.get_training_data(self.prev_season, 37 + i)
-                else:
-                    training_gk, training_def, training_mid, training_fwd = self.get_training_data(season, i)
-            else:
-                if i < 1:
-                    training_gk_new, training_def_new, training_mid_new, training_fwd_new = self.get_training_data(self.prev_season, 38 + i)
-                else:
-                    training_gk_new, training_def_new, training_mid_new, training_fwd_new = self.get_training_data(season, i)
-                training_gk = (pd.concat((training_gk[0], training_gk_new[0])), pd.concat((training_gk[1], training_gk_new[1])))
-                training_def = (pd.concat((training_def[0], training_def_new[0])), pd.concat((training_def[1], training_def_new[1])))
-                training_mid = (pd.concat((training_mid[0], training_mid_new[0])), pd.concat((training_mid[1], training_mid_new[1])))
-                training_fwd = (pd.concat((training_fwd[0], training_fwd_new[0])), pd.concat((training_fwd[1], training_fwd_new[1])))
-            
+        # One contiguous window over the timeline, however many season boundaries it crosses
+        weekly_data = [self.get_training_data(gw_season, gw_week) for gw_season, gw_week in self.timeline.window(season, from_gw, to_gw)]
+        training_gk, training_def, training_mid, training_fwd = [(pd.concat([week[position][0] for week in weekly_data]), pd.concat([week[position][1] for week in weekly_data])) for position in range(4)]
+
         gk_features_train, gk_features_test, gk_labels_train, gk_labels_test = train_test_split(training_gk[0], training_gk[1], test_size=0.2, random_state=42)
         def_features_train, def_features_test, def_labels_train, def_labels_test = train_test_split(training_def[0], training_def[1], test_size=0.2, random_state=42)
         mid_features_train, mid_features_test, mid_labels_train, mid_labels_test = train_test_split(training_mid[0], training_mid[1], test_size=0.2, random_state=42)
@@ -319,6 +573,29 @@ class fpl_data:
 
         return training_data, test_data
 
+    def training_data_report(self, season, to_gw, training_prev_weeks):
+        """
+        Measure the time and peak memory of assembling the training data over a window.
+
+        Args:
+            season (str): The season of the data.
+            to_gw (int): The ending game week (exclusive).
+            training_prev_weeks (int): How many past weeks of data the window holds.
+
+        Returns:
+            dict: The number of weeks, training and test rows, seconds and peak bytes allocated.
+        """
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            training_data, test_data = self.get_training_data_all(season, to_gw - training_prev_weeks, to_gw)
+            seconds = time.perf_counter() - start
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {'weeks': training_prev_weeks, 'rows': sum(len(features) for features, _ in training_data + test_data),
+                'seconds': seconds, 'peak_bytes': peak_bytes}
+
     def get_model(self, model_type, training_data):
         """
         Get the model for a given model type and training data.
@@ -416,11 +693,128 @@ class fpl_data:
         Returns:
             float: The price of the player.
         """
+        price_matrix, gw_week = self.gw_price_matrix(gw_data)
+        if price_matrix is not None:
+            return price_matrix.price(player, gw_week)
+
         gw_data = gw_data[['value']].to_dict()['value']
         if player in gw_data:
             return gw_data[player] / 10
         else:
             return None
+
+    def get_prices(self, players, gw_data):
+        """
+        Get the prices of many players for the week of some game week data.
+
+        Args:
+            players (list): The player names.
+            gw_data (pandas.DataFrame): The game week data.
+
+        Returns:
+            numpy.ndarray: The price of each player, NaN for players without a price.
+        """
+        price_matrix, gw_week = self.gw_price_matrix(gw_data)
+        if price_matrix is not None:
+            return price_matrix.prices(players, gw_week)
+
+        gw_data = gw_data[['value']].to_dict()['value']
+        return np.array([gw_data[player] / 10 if player in gw_data else np.nan for player in players], dtype=np.float64)
+
+    def gw_price_matrix(self, gw_data):
+        """
+        Find the price matrix holding the prices of some game week data.
+
+        Args:
+            gw_data (pandas.DataFrame): The game week data.
+
+        Returns:
+            tuple: The season's price matrix and the week number, or (None, None) if gw_data is not an unfiltered get_gw_data frame.
+        """
+        season, week_num, rows = gw_data.attrs.get('gw', (None, None, None))
+        if season is None or rows != len(gw_data):
+            return None, None
+        price_matrix = self.get_price_matrix(season)
+        if price_matrix is None or not price_matrix.has_gw(week_num):
+            return None, None
+        return price_matrix, week_num
+
+    def get_price_matrix(self, season):
+        """
+        Get the (players x gameweeks) price matrix of a season, built once per process.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            prices.price_matrix: The season's price matrix, or None if the season has no gameweek data.
+        """
+        return self.cached(season, 'prices', None, lambda: self.read_price_matrix(season))
+
+    def read_price_matrix(self, season):
+        """
+        Build the price matrix of a season from the compiled gameweek store, or else the gameweek CSVs.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            prices.price_matrix: The season's price matrix, or None if the season has no gameweek data.
+        """
+        return prices.build_price_matrix(self.read_season_columns(season, 'name', 'value'))
+
+    def read_season_columns(self, season, *columns):
+        """
+        Read columns of every gameweek of a season, from the compiled gameweek store, or else the gameweek CSVs.
+
+        Args:
+            season (str): The season of the data.
+            columns (str): The gameweek columns to read.
+
+        Returns:
+            list: (week number, column arrays...) per gameweek, each array in CSV row order.
+        """
+        gw_store = self.cached(season, 'gw_store', None, lambda: store.load_gw_store(self.data_location, season))
+        season_gws = []
+        if gw_store is not None:
+            for slot, week_num in enumerate(gw_store.weeks.tolist()):
+                start, end = gw_store.offsets[slot], gw_store.offsets[slot + 1]
+                season_gws.append((week_num, *[gw_store.columns[column][start:end] for column in columns]))
+        else:
+            for week_num in range(1, self.timeline.lengths.get(season, timeline.GAMEWEEKS) + 1):
+                if os.path.exists(f'{self.data_location}/{season}/gws/gw{week_num}.csv'):
+                    gw_data = self.cached(season, 'gws', week_num, lambda: self.load_gw_data(season, week_num))
+                    season_gws.append((week_num, *[gw_data[column].to_numpy() for column in columns]))
+        return season_gws
+
+    def get_availability(self, season):
+        """
+        Get the per-gameweek played / didn't play bitsets of a season, built once per process.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            availability.availability: The season's bitsets over its player ids, or None if the season has no gameweek data.
+        """
+        return self.cached(season, 'availability', None, lambda: availability.build_availability(self.read_season_columns(season, 'name', 'minutes'), self.get_player_ids(season)))
+
+    def gw_availability(self, season, week_num):
+        """
+        Find the availability bitsets holding a gameweek.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): The week number, weeks before GW1 are in earlier seasons.
+
+        Returns:
+            tuple: The bitsets, their season's player ids and the week number in that season, or (None, None, None) if the gameweek has no data.
+        """
+        gw_season, gw_week = self.resolve_gw(season, week_num)
+        season_availability = self.get_availability(gw_season)
+        if season_availability is None or not season_availability.has_gw(gw_week):
+            return None, None, None
+        return season_availability, self.get_player_ids(gw_season), gw_week
     
     def actual_points_dict(self, season, week_num):
         """
@@ -433,6 +827,11 @@ class fpl_data:
         Returns:
             dict: The actual points for the specified season and week.
         """
+        gw_season, gw_week = self.resolve_gw(season, week_num)
+        gw_tensor = self.get_gw_tensor(gw_season, gw_week)
+        if gw_tensor is not None:
+            return gw_tensor.stat_dict(gw_week, 'total_points')
+
         gw_data = self.get_gw_data(season, week_num)
         # Name --> Actual Points (Dictionary)
         gw_data = gw_data[['total_points']]
@@ -462,12 +861,35 @@ class fpl_data:
         Returns:
             pandas.DataFrame: The players who didn't play.
         """
+        season_availability, player_ids, gw_week = self.gw_availability(self.season, gameweek)
+        if season_availability is not None:
+            return dict.fromkeys(player_ids.names_of(season_availability.didnt_play_ids(gw_week)), 0)
+
         gw_data = self.get_gw_data(self.season, gameweek)
         gw_data = gw_data[gw_data['minutes'] == 0]
         # conver to dict (name -> id)
         gw_data = gw_data.to_dict()['minutes']
         return gw_data
     
+    def didnt_play_mask(self, names, season, *week_nums):
+        """
+        Check which players didn't play in any of some gameweeks.
+
+        Args:
+            names (list): The player names.
+            season (str): The season of the data.
+            week_nums (int): The week numbers, weeks before GW1 are in earlier seasons.
+
+        Returns:
+            numpy.ndarray: True for each player with a zero-minute row in one of the gameweeks.
+        """
+        mask = np.zeros(len(names), dtype=bool)
+        for week_num in week_nums:
+            season_availability, player_ids, gw_week = self.gw_availability(season, week_num)
+            if season_availability is not None:
+                mask |= season_availability.didnt_play_mask(player_ids.intern_all(names), gw_week)
+        return mask
+
     def non_players(self, season, gameweek):
         """
         Get the players who didn't play for a given gameweek.
@@ -477,12 +899,14 @@ class fpl_data:
             gameweek (int): The gameweek.
         
         Returns:
-            pandas.DataFrame: The players who didn't play.
+            pandas.DataFrame: The zero-minute rows of the gameweek data.
         """
-        if gameweek < self.get_recent_gw():
-            gw_data = self.get_gw_data(season, gameweek)
-            gw_data = gw_data[gw_data['minutes'] == 0]
-        return gw_data
+        gw_data = self.get_gw_data(season, gameweek)
+        season_availability, player_ids, gw_week = self.gw_availability(season, gameweek)
+        if season_availability is not None:
+            # Only the rows of players with a zero-minute row are checked
+            gw_data = gw_data[gw_data.index.isin(player_ids.names_of(season_availability.didnt_play_ids(gw_week)))]
+        return gw_data[gw_data['minutes'] == 0]
 
     def post_model_weightings(self, clean_predictions, week_num, next_num_gws):
         """
@@ -494,129 +918,104 @@ class fpl_data:
             next_num_gws (int): The number of future gameweeks to predict.
 
         Returns:
-            list: The post-model weightings.
+            list: The post-model weightings, an array of the next next_num_gws fixtures' xP per player.
+        """
+        return [xp_horizon.frame() for xp_horizon in self.get_xp_horizons(clean_predictions, week_num, next_num_gws)]
+
+    def get_xp_horizons(self, clean_predictions, week_num, next_num_gws, home_weighting=HOME_WEIGHTING, away_weighting=AWAY_WEIGHTING, difficulty_weightings=DIFFICULTY_WEIGHTINGS):
+        """
+        Spread the predictions over each player's next fixtures, adjusted for home/away and difficulty.
+        The weightings are added to each fixture's xP, where post_model_weightings_for_next_gw scales xP by them.
+
+        Args:
+            clean_predictions (list): The clean predictions.
+            week_num (int): The week number.
+            next_num_gws (int): The number of future fixtures.
+            home_weighting (float): Added to xP for a home fixture (default: HOME_WEIGHTING).
+            away_weighting (float): Added to xP for an away fixture (default: AWAY_WEIGHTING).
+            difficulty_weightings (dict): Fixture difficulty --> added to xP (default: DIFFICULTY_WEIGHTINGS).
+
+        Returns:
+            list: The horizon.xp_horizon of each position.
         """
-        overall_predictions = []
         gw_data = self.get_gw_data(self.season, week_num)
-        # For each pos in predictions
+        next_fixtures = self.get_fixture_index(self.season).next_fixture_matrix(week_num, next_num_gws)
+        xp_horizons = []
         for pos in clean_predictions:
-            # change pos into dataframe, skip first header
             pos = pos.reset_index()
-            # For each player in pos
-            post_predictions = []
-            for i in range(len(pos)):
-                name = pos.loc[i, 'Name']
-                xP = pos.loc[i, 'xP']
-                next_gws_p = np.ones(next_num_gws) * xP
-                try:
-                    team_name = self.get_player_team(name, week_num, gw_data)
-                    team_id = self.team_to_id[team_name]
-                    fixture_list = self.get_future_fixtures_for_player(name, week_num, gw_data)[0:next_num_gws]
-                except (KeyError, TypeError):
-                    if next_num_gws == 1:
-                        post_predictions.append([name, [0]])
-                    else:
-                        post_predictions.append([name, np.zeros(next_num_gws)])
-                    continue
-
-                for i, fixture in enumerate(fixture_list.itertuples()):
-                    home_fixture = fixture.team_h == team_id
-                    home_away_p = 0.1 if home_fixture else -0.1
-                    difficulty = fixture.team_h_difficulty if home_fixture else fixture.team_a_difficulty
-                    diff_p = 0.2 if difficulty == 1 else 0.05 if difficulty == 2 else 0.0 if difficulty == 3 else -0.05 if difficulty == 4 else -0.2
-                    p = xP + home_away_p + diff_p
-                    p = round(p, 3)
-                    next_gws_p[i] = p
-
-                post_predictions.append([name, next_gws_p])
-
-            post_predictions = pd.DataFrame(post_predictions, columns=['Name', 'xP'])
-            overall_predictions.append(post_predictions)
-        return overall_predictions
+            xp_horizons.append(horizon.build_xp_horizon(pos, self.get_player_team_ids(pos['Name'], gw_data), next_fixtures,
+                                                        home_weighting, away_weighting, difficulty_weightings))
+        return xp_horizons
     
-    def post_model_weightings_for_next_gw(self, clean_predictions, week_num):
+    def post_model_weightings_for_next_gw(self, clean_predictions, week_num, home_weighting=HOME_WEIGHTING, away_weighting=AWAY_WEIGHTING, difficulty_weightings=DIFFICULTY_WEIGHTINGS):
         """
         Apply post-model weightings to the predictions for the next gameweek.
 
+        Each player's xP is scaled up or down by the home/away and difficulty weightings of their team's next fixture.
+        Players without a single team in the gameweek data are predicted 0.
+
         Args:
             clean_predictions (list): The clean predictions.
             week_num (int): The week number.
+            home_weighting (float): The share of xP added for a home fixture (default: HOME_WEIGHTING).
+            away_weighting (float): The share of xP added for an away fixture (default: AWAY_WEIGHTING).
+            difficulty_weightings (dict): Fixture difficulty --> the share of xP added (default: DIFFICULTY_WEIGHTINGS).
 
         Returns:
             list: The post-model weightings for the next gameweek.
         """
         overall_predictions = []
-        next_num_gws = 1
         gw_data = self.get_gw_data(self.season, week_num)
-        # For each pos in predictions
+        has_fixture, home, difficulty = self.get_fixture_index(self.season).next_fixture_table(week_num)
+        # Weighting of each team's next fixture, indexed by team id
+        team_weightings = np.where(home, home_weighting, away_weighting)
+        team_difficulty_weightings = np.array([difficulty_weightings.get(team_difficulty, 0.0) for team_difficulty in difficulty.tolist()])
         for pos in clean_predictions:
             # Change pos into dataframe, skip first header
             pos = pos.reset_index()
-            
-            # Create an empty list to store post predictions
-            post_predictions = []
-            
-            # For each player in pos
-            for i in range(len(pos)):
-                name = pos.loc[i, 'Name']
-                xP = pos.loc[i, 'xP']
-                p = xP
-                
-                try:
-                    team_name = self.get_player_team(name, week_num, gw_data)
-                    team_id = self.team_to_id[team_name]
-                    fixture_list = self.get_future_fixtures_for_player(name, week_num, gw_data)[0:next_num_gws]
-                except (KeyError, TypeError):
-                   post_predictions.append([name, 0])
-                   continue
-
-                fixture = fixture_list.iloc[0]
-
-                # Home Advantage
-                home_away_p = 0
-                home_fixture = False
-                if fixture['team_h'] == team_id:
-                    home_fixture = True
-                
-                if home_fixture:
-                    home_away_p = p * 0.1
-                else:
-                    home_away_p = p * -0.1
-                
-                # Difficulty of fixture (based on team)
-                diff_p = 0
-                if home_fixture:
-                    difficulty = fixture['team_h_difficulty']
-                else:
-                    difficulty = fixture['team_a_difficulty']
-
-                if difficulty == 1:
-                    diff_p = p * 0.2
-                elif difficulty == 2:
-                    diff_p = p * 0.05
-                elif difficulty == 3:
-                    diff_p = p * 0.0
-                elif difficulty == 4:
-                    diff_p = p * -0.05
-                elif difficulty == 5:
-                    diff_p = p * -0.2
-            
-                # Check for form?
-                p += home_away_p + diff_p
-                p = round(p, 3)
-                
-                post_predictions.append([name, p])
-
-            # Convert to dataframe and set index to name
-            post_predictions = pd.DataFrame(post_predictions, columns=['Name', 'xP'])
-            overall_predictions.append(post_predictions)
+            xP = pos['xP'].to_numpy(dtype=np.float64)
+            team_ids = self.get_player_team_ids(pos['Name'], gw_data)
+            has_team = team_ids >= 0
+            team_ids = np.where(has_team & (team_ids < len(has_fixture)), team_ids, 0)
+            p = xP + (xP * team_weightings[team_ids] + xP * team_difficulty_weightings[team_ids])
+            # Players whose team has no fixture left keep their xP
+            p = np.where(has_fixture[team_ids], np.round(p, 3), xP)
+            overall_predictions.append(pd.DataFrame({'Name': pos['Name'].to_numpy(), 'xP': np.where(has_team, p, 0.0)}))
 
         return overall_predictions
+
+    def get_player_team_ids(self, player_names, gw_data):
+        """
+        Get the team ids of players in a gameweek.
+
+        Args:
+            player_names (pandas.Series): The player names.
+            gw_data (pandas.DataFrame): The game week data.
+
+        Returns:
+            numpy.ndarray: The team id of each player, -1 for players without a single team in the gameweek data.
+        """
+        if 'team' not in gw_data.columns:
+            return np.full(len(player_names), -1, dtype=np.int64)
+        teams = gw_data['team'].astype(object)
+        # Players with several rows (double gameweeks) have no single team, as with get_player_team
+        teams = teams[~teams.index.duplicated(keep=False)]
+        team_ids = player_names.map(teams).map(self.team_to_id)
+        return team_ids.fillna(-1).to_numpy(dtype=np.int64)
         
     def id_to_name_dict(self):
         """
         Get the id to name dictionary.
 
+        Returns:
+            dict: The id to name dictionary.
+        """
+        return self.cached(self.season, 'player_idlist', None, self.read_id_to_name_dict)
+
+    def read_id_to_name_dict(self):
+        """
+        Parse the id to name dictionary from the player id list.
+
         Returns:
             dict: The id to name dictionary.
         """
@@ -637,8 +1036,7 @@ class fpl_data:
             int: The most recent (previous) gameweek's ID.
         """
 
-        data = requests.get('https://fantasy.premierleague.com/api/bootstrap-static/')
-        data = json.loads(data.content)
+        data = self.api.get()
 
         gameweeks = data['events']
         
@@ -656,8 +1054,7 @@ class fpl_data:
         Returns:
             float: The average score for the specified gameweek.
         """
-        fpl_api = requests.get(f'https://fantasy.premierleague.com/api/bootstrap-static/')
-        fpl_api = json.loads(fpl_api.content)
+        fpl_api = self.api.get()
         events = fpl_api['events']
         avg_scores = np.zeros(len(events))
         for i, event in enumerate(events):
@@ -665,6 +1062,30 @@ class fpl_data:
 
         return avg_scores
     
+    def get_fixtures(self, season):
+        """
+        Get every fixture of a season.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            pandas.DataFrame: The season's fixtures.csv.
+        """
+        return self.cached(season, 'fixtures', None, lambda: pd.read_csv(f'{self.data_location}/{season}/fixtures.csv'))
+
+    def get_fixture_index(self, season):
+        """
+        Get the per-team fixture index of a season, built once per process.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            fixtures.fixture_index: The season's fixture index.
+        """
+        return self.cached(season, 'fixture_index', None, lambda: fixtures.fixture_index(self.get_fixtures(season)))
+
     def get_future_fixtures(self, season, week_num):
         """
         Get the future fixtures for a given season and week.
@@ -676,8 +1097,7 @@ class fpl_data:
         Returns:
             pandas.DataFrame: The future fixtures for the specified season and week.
         """
-        # load fixtures.csv
-        all_fixtures = pd.read_csv(f'{self.data_location}/{season}/fixtures.csv')
+        all_fixtures = self.get_fixtures(season)
 
         # Get fixtures where event > current gw
         future_fixtures = all_fixtures[all_fixtures['event'] > week_num]
@@ -741,9 +1161,7 @@ class fpl_data:
         Returns:
             dict: The FPL API as JSON.
         """
-        res = requests.get(f'https://fantasy.premierleague.com/api/bootstrap-static/')
-        res = json.loads(res.content)
-        return res
+        return self.api.get()
     
     def get_injuries(self):
         """
@@ -752,13 +1170,12 @@ class fpl_data:
         Returns:
             dict: The injuries from the FPL API.
         """
-        fpl_api = requests.get(f'https://fantasy.premierleague.com/api/bootstrap-static/')
-        fpl_api = json.loads(fpl_api.content)
+        fpl_api = self.api.get()
         # export this to json
         with open('fpl_auto/injuries.json', 'w') as f:
             json.dump(fpl_api, f)
 
-    def discount_next_n_gws(self, predictions, gw, n, discount_factor=0.8, sum=True):
+    def discount_next_n_gws(self, predictions, gw, n, discount_factor=0.8, sum=True, xp_horizons=None):
         """
         Discount the next n gameweeks.
 
@@ -768,6 +1185,7 @@ class fpl_data:
             n (int): The number of future gameweeks to predict.
             discount_factor (float): The discount factor.
             sum (bool): Whether to sum the predictions.
+            xp_horizons (list): Horizons of the predictions at least n fixtures long, from get_xp_horizons (default: None, built here).
 
         Returns:
             list: The discounted predictions.
@@ -775,22 +1193,13 @@ class fpl_data:
         if gw + n > 38:
             n = 38 - gw
         
-        # Get the next n gameweeks
-        n_next_weeks = self.post_model_weightings(predictions, gw, n)
+        if xp_horizons is None:
+            xp_horizons = self.get_xp_horizons(predictions, gw, n)
         
         if n == 0 or gw >= 36:
-            return n_next_weeks
-        
-        # For each player in each position
-        for pos in n_next_weeks:
-            for i, row in pos.iterrows():
-                xp_array = row['xP']
-                for i in range(len(xp_array)):
-                    xp_array[i] *= discount_factor ** i
-                if sum:
-                    row['xP'] = round(np.mean(xp_array), 2)
-                else:
-                    row['xP'] = xp_array
+            return [xp_horizon.frame(n) for xp_horizon in xp_horizons]
         
-        return n_next_weeks
+        if sum:
+            return [xp_horizon.frame(n, discount_factor) for xp_horizon in xp_horizons]
+        return [pd.DataFrame({'Name': xp_horizon.names, 'xP': list(xp_horizon.discounted(n, discount_factor))}) for xp_horizon in xp_horizons]
 # %%
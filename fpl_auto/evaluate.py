@@ -5,6 +5,7 @@ import math
 import numpy as np
 import json
 import os
+from fpl_auto import predictions
 
 def score_model(predictions, labels):
     """
@@ -86,26 +87,31 @@ def plot_predictions(predictions, test_data, week_num):
     plt.plot([0, 20], [0, 20], color='black')
     plt.show()
 
-def export_tsv(clean_predictions, season, week_num):
+def export_tsv(clean_predictions, season, week_num, tsv=False, predictions_location='predictions'):
     """
-    Export the predictions to a TSV file for each position.
+    Export the predictions to the season's predictions store, and optionally to a TSV file for each position.
 
     Args:
         clean_predictions (list): A list of DataFrames containing the predictions for each position.
         season (str): The season for which the predictions were made.
         week_num (int): The gameweek number.
+        tsv (bool): Whether to also write predictions/{season}/GW{week_num}/[POS].tsv (default: False).
+        predictions_location (str): The location of the predictions (default: 'predictions').
     """
-    # Create predictions/{season}/gw{week_num}/ directory
-    directory = f'predictions/{season}/GW{week_num}/'
-    os.makedirs(directory, exist_ok=True)
-
-    positions = ['GK', 'DEF', 'MID', 'FWD']
-    for i, position in enumerate(positions):
+    for i in range(len(clean_predictions)):
         # sort by xP
         clean_predictions[i] = clean_predictions[i].sort_values(by='xP', ascending=False)
-        clean_predictions[i].to_csv(f'{directory}{position}.tsv', sep='\t')
 
-    print(f'- Saved predictions to {directory}[POS].tsv')
+    path = predictions.append_predictions(predictions_location, season, week_num, clean_predictions)
+    print(f'- Saved predictions to {path}')
+
+    if tsv:
+        # Create predictions/{season}/gw{week_num}/ directory
+        directory = f'{predictions_location}/{season}/GW{week_num}/'
+        os.makedirs(directory, exist_ok=True)
+        for i, position in enumerate(predictions.POSITIONS):
+            clean_predictions[i].to_csv(f'{directory}{position}.tsv', sep='\t')
+        print(f'- Saved predictions to {directory}[POS].tsv')
 
 def plot_p_minus_xp(p_list, xp_list, from_week, to_week):
     """
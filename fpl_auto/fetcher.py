@@ -0,0 +1,152 @@
+'''
+Concurrent Player History Fetcher for FPL Automation Project
+
+Refreshes every player's history from the FPL API's element-summary endpoint, one request per player,
+with a bounded connection pool, a concurrency and rate limit, and retries with exponential backoff.
+Responses are handled as they arrive: each is written to players/<Name_id>/gw.csv and history.csv and
+kept for the consolidated player store, which is written once every player has been fetched (players not
+fetched in the run keep their stored rows). Throughput and latency are reported, to size the concurrency
+limit for the deadline window.
+
+Run with: python -m fpl_auto.fetcher -season 2024-25 -concurrency 16
+'''
+import argparse
+import asyncio
+import os
+import time
+import numpy as np
+import pandas as pd
+from fpl_auto import players
+from fpl_auto import timeline
+from fpl_auto import updater
+
+class player_fetcher:
+    def __init__(self, client, data_location, season, elements):
+        """
+        Initialize the fetcher.
+
+        Args:
+            client (updater.updater): The API client, holding the connection pool, limits and retry policy.
+            data_location (str): The location of the data.
+            season (str): The season being fetched.
+            elements (list): The elements to fetch, from bootstrap-static.
+        """
+        self.client = client
+        self.data_location = data_location
+        self.season = season
+        self.elements = elements
+        self.frames = {table: [] for table in players.PLAYER_TABLES}
+        self.latencies = []
+        self.failed = []
+
+    def write_player(self, element, summary):
+        """
+        Write one player's element summary to their players/ directory and keep it for the store.
+
+        Args:
+            element (dict): The element, from bootstrap-static.
+            summary (dict): The element-summary response.
+        """
+        player_dir = f'{self.data_location}/{self.season}/players/{updater.player_dir_name(element)}'
+        for table, key in (('gw', 'history'), ('history', 'history_past')):
+            if len(summary.get(key, [])) == 0:
+                continue
+            frame = pd.DataFrame(summary[key])
+            os.makedirs(player_dir, exist_ok=True)
+            frame.to_csv(f'{player_dir}/{table}.csv', index=False)
+            self.frames[table].append((element['id'], frame))
+
+    async def fetch_player(self, element, limiter):
+        """
+        Fetch and write one player, timing the request (including any retries).
+
+        Args:
+            element (dict): The element, from bootstrap-static.
+            limiter (updater.rate_limiter): The shared rate limiter.
+        """
+        async with limiter.semaphore:
+            await limiter.wait()
+            # Latency is timed from when the request starts, not from when it was queued
+            start = time.perf_counter()
+            try:
+                summary = await asyncio.get_running_loop().run_in_executor(self.client.executor, self.client.get_json, f"element-summary/{element['id']}/")
+            except Exception as error:
+                self.failed.append((element['id'], str(error)))
+                return
+            self.latencies.append(time.perf_counter() - start)
+        self.write_player(element, summary)
+
+    async def fetch_all(self):
+        """
+        Fetch every player, writing each as soon as its response arrives.
+        """
+        limiter = updater.rate_limiter(self.client.max_per_second, self.client.max_concurrent)
+        for task in asyncio.as_completed([self.fetch_player(element, limiter) for element in self.elements]):
+            await task
+
+def fetch_players(data_location='data', season=None, base_url=updater.API_URL, max_per_second=10, max_concurrent=8, retries=3, elements=None):
+    """
+    Refresh the per-player histories of the API's current season and rebuild its consolidated player store.
+
+    Args:
+        data_location (str): The location of the data (default: 'data').
+        season (str): The season the API is serving (default: None, inferred from the first event's deadline).
+        base_url (str): The root of the FPL API (default: the live API).
+        max_per_second (float): The maximum number of requests started per second (default: 10).
+        max_concurrent (int): The maximum number of requests in flight at once (default: 8).
+        retries (int): How many times a failed request is retried (default: 3).
+        elements (list): The element ids to fetch (default: None, every element in bootstrap-static).
+
+    Returns:
+        dict: The season, the players written, failures, requests and retries made, the player store path,
+            the seconds taken, players per second and the median and 95th percentile request latency.
+    """
+    start = time.time()
+    client = updater.updater(data_location, base_url, max_per_second, max_concurrent, retries)
+    try:
+        bootstrap = client.get_json('bootstrap-static/')
+        season = season or timeline.season_name(int(bootstrap['events'][0]['deadline_time'][:4]))
+        wanted = [element for element in bootstrap['elements'] if elements is None or element['id'] in elements]
+
+        fetcher = player_fetcher(client, data_location, season, wanted)
+        asyncio.run(fetcher.fetch_all())
+    finally:
+        client.close()
+    fetch_seconds = time.time() - start
+    # Players not fetched this run (or whose request failed) keep their rows
+    path = players.merge_player_store(data_location, season, fetcher.frames)
+
+    latencies = np.array(fetcher.latencies) if len(fetcher.latencies) > 0 else np.zeros(1)
+    return {'season': season, 'players': len(fetcher.latencies), 'failed': fetcher.failed,
+            'requests': client.requests_made, 'retries': client.retries_made, 'store': path,
+            'seconds': time.time() - start, 'players_per_second': len(fetcher.latencies) / fetch_seconds,
+            'latency_p50': float(np.percentile(latencies, 50)), 'latency_p95': float(np.percentile(latencies, 95))}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Fetch player histories")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default=None,
+                        help='Season the API is serving. Format: YYYY-YY e.g 2024-25, default: inferred from the API')
+    parser.add_argument('-base_url', type=str, default=updater.API_URL,
+                        help=f'Root of the FPL API, default: {updater.API_URL}')
+    parser.add_argument('-rate', type=float, default=10,
+                        help='Maximum requests per second, default: 10')
+    parser.add_argument('-concurrency', type=int, default=8,
+                        help='Maximum requests in flight at once, default: 8')
+    parser.add_argument('-retries', type=int, default=3,
+                        help='Retries per failed request, default: 3')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    result = fetch_players(inputs.gw_data, inputs.season, inputs.base_url, inputs.rate, inputs.concurrency, inputs.retries)
+    print(f"{result['season']}: fetched {result['players']} players in {result['seconds']:.2f}s "
+          f"({result['players_per_second']:.1f} players/s, {result['requests']} requests, {result['retries']} retries)")
+    print(f"Request latency: p50 {result['latency_p50'] * 1000:.0f}ms, p95 {result['latency_p95'] * 1000:.0f}ms")
+    if len(result['failed']) > 0:
+        print(f"Failed: {len(result['failed'])} players, e.g. element {result['failed'][0][0]}: {result['failed'][0][1]}")
+    print(f"Player store: {result['store']}")
+
+if __name__ == '__main__':
+    main()
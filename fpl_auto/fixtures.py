@@ -0,0 +1,120 @@
+'''
+Fixture Index for FPL Automation Project
+
+Each season's fixtures.csv is indexed once per process into per-team arrays (event, home/away,
+difficulty, opponent), sorted by event, so a team's next N fixtures after a gameweek are a binary
+search and an array slice rather than a filter over the whole fixtures table.
+'''
+import numpy as np
+import pandas as pd
+
+# Per-team arrays of the index, one row per team per fixture
+FIXTURE_COLUMNS = ['event', 'home', 'difficulty', 'opponent', 'fixture']
+
+class fixture_index:
+    def __init__(self, fixtures):
+        """
+        Index a season's fixtures by team.
+
+        Args:
+            fixtures (pandas.DataFrame): The season's fixtures.csv. Fixtures without an event (not yet scheduled) are left out.
+        """
+        fixtures = fixtures[fixtures['event'].notna()]
+        row = np.arange(len(fixtures))
+        sides = []
+        for home, team, opponent, difficulty in ((True, 'team_h', 'team_a', 'team_h_difficulty'), (False, 'team_a', 'team_h', 'team_a_difficulty')):
+            sides.append(pd.DataFrame({'team': fixtures[team].to_numpy(), 'event': fixtures['event'].to_numpy(), 'home': home,
+                                       'difficulty': fixtures[difficulty].to_numpy(), 'opponent': fixtures[opponent].to_numpy(),
+                                       'fixture': fixtures['id'].to_numpy(), 'row': row}))
+        # Fixtures in the same event (double gameweeks) keep their fixtures.csv order
+        sides = pd.concat(sides, ignore_index=True).sort_values(['team', 'event', 'row'])
+
+        team = sides['team'].to_numpy(dtype=np.int64)
+        self.event = sides['event'].to_numpy(dtype=np.int16)
+        self.home = sides['home'].to_numpy(dtype=bool)
+        self.difficulty = sides['difficulty'].to_numpy(dtype=np.int8)
+        self.opponent = sides['opponent'].to_numpy(dtype=np.int16)
+        self.fixture = sides['fixture'].to_numpy(dtype=np.int32)
+        self.teams = np.unique(team).tolist()
+        # Rows of team t are offsets[t]:offsets[t + 1]
+        self.offsets = np.searchsorted(team, np.arange(max(self.teams, default=0) + 2))
+
+    def team_rows(self, team_id, after_gw, n=None):
+        """
+        Get the rows of a team's fixtures after a gameweek.
+
+        Args:
+            team_id (int): The team's id in the season.
+            after_gw (int): Fixtures in later gameweeks are returned.
+            n (int): The maximum number of fixtures (default: None, all of them).
+
+        Returns:
+            tuple: The start and end row.
+        """
+        if not 0 <= team_id < len(self.offsets) - 1:
+            return 0, 0
+        start, end = self.offsets[team_id], self.offsets[team_id + 1]
+        start += np.searchsorted(self.event[start:end], after_gw, side='right')
+        return start, end if n is None else min(end, start + n)
+
+    def next_fixtures(self, team_id, after_gw, n=None):
+        """
+        Get a team's next fixtures after a gameweek, in order.
+
+        Args:
+            team_id (int): The team's id in the season.
+            after_gw (int): Fixtures in later gameweeks are returned.
+            n (int): The maximum number of fixtures (default: None, all of them).
+
+        Returns:
+            dict: Array slices of event, home (bool), difficulty (the team's own), opponent and fixture id.
+        """
+        start, end = self.team_rows(team_id, after_gw, n)
+        return {column: getattr(self, column)[start:end] for column in FIXTURE_COLUMNS}
+
+    def next_fixture_table(self, after_gw):
+        """
+        Get every team's next fixture after a gameweek as arrays indexed by team id.
+
+        Args:
+            after_gw (int): The fixture in the first later gameweek is returned.
+
+        Returns:
+            tuple: has_fixture (bool), home (bool) and difficulty (the team's own) arrays, one entry per team id.
+        """
+        return tuple(column[:, 0] for column in self.next_fixture_matrix(after_gw, 1))
+
+    def next_fixture_matrix(self, after_gw, n):
+        """
+        Get every team's next n fixtures after a gameweek as (team id x fixture) arrays.
+
+        Args:
+            after_gw (int): Fixtures in later gameweeks are returned.
+            n (int): The number of fixtures.
+
+        Returns:
+            tuple: has_fixture (bool), home (bool) and difficulty (the team's own) arrays; a team's kth fixture is column k.
+        """
+        shape = (len(self.offsets) - 1, n)
+        has_fixture = np.zeros(shape, dtype=bool)
+        home = np.zeros(shape, dtype=bool)
+        difficulty = np.zeros(shape, dtype=np.int8)
+        for team_id in self.teams:
+            start, end = self.team_rows(team_id, after_gw, n)
+            has_fixture[team_id, :end - start] = True
+            home[team_id, :end - start] = self.home[start:end]
+            difficulty[team_id, :end - start] = self.difficulty[start:end]
+        return has_fixture, home, difficulty
+
+    def next_fixtures_all(self, after_gw, n=None):
+        """
+        Get every team's next fixtures after a gameweek.
+
+        Args:
+            after_gw (int): Fixtures in later gameweeks are returned.
+            n (int): The maximum number of fixtures per team (default: None, all of them).
+
+        Returns:
+            dict: team id --> the team's next_fixtures.
+        """
+        return {team_id: self.next_fixtures(team_id, after_gw, n) for team_id in self.teams}
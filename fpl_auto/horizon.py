@@ -0,0 +1,112 @@
+'''
+xP Horizon for FPL Automation Project
+
+One position's predictions spread over the gameweeks ahead as a dense (players x gameweeks) matrix,
+each player's xP adjusted for their team's next fixtures (home/away and difficulty). It is built once
+per gameweek; xP over any horizon with any discount factor is then one matrix-vector product with its
+first columns rather than rebuilding and mutating a per-player array for every request.
+
+The fixture weightings are the post-model weightings of fpl_auto.data, but over the horizon they are
+added to a player's xP rather than scaled by it.
+'''
+import numpy as np
+import pandas as pd
+
+class xp_horizon:
+    def __init__(self, names, xp):
+        """
+        Initialize the horizon.
+
+        Args:
+            names (numpy.ndarray): The player names.
+            xp (numpy.ndarray): (players x gameweeks) fixture-adjusted xP; column k is the player's (k+1)th next fixture.
+        """
+        self.names = names
+        self.xp = xp
+
+    def __len__(self):
+        return len(self.names)
+
+    def weights(self, n, discount_factor):
+        """
+        Get the discount weights of the next n fixtures.
+
+        Args:
+            n (int): The number of fixtures.
+            discount_factor (float): Fixture k (from 0) is weighted discount_factor ** k.
+
+        Returns:
+            numpy.ndarray: The n weights.
+        """
+        return np.array([discount_factor ** i for i in range(n)])
+
+    def discounted(self, n, discount_factor):
+        """
+        Get each player's fixture-adjusted xP over the next n fixtures, discounted per fixture.
+
+        Args:
+            n (int): The number of fixtures.
+            discount_factor (float): Fixture k (from 0) is weighted discount_factor ** k.
+
+        Returns:
+            numpy.ndarray: (players x n) discounted xP.
+        """
+        return self.xp[:, :n] * self.weights(n, discount_factor)
+
+    def mean(self, n, discount_factor):
+        """
+        Get each player's mean discounted xP over the next n fixtures.
+
+        Args:
+            n (int): The number of fixtures.
+            discount_factor (float): Fixture k (from 0) is weighted discount_factor ** k.
+
+        Returns:
+            numpy.ndarray: The mean of each player's discounted xP, rounded to 2 decimals.
+        """
+        return np.round(self.xp[:, :n] @ self.weights(n, discount_factor) / n, 2)
+
+    def frame(self, n=None, discount_factor=None):
+        """
+        Get the horizon as a predictions table.
+
+        Args:
+            n (int): The number of fixtures (default: None, every column).
+            discount_factor (float): Average the discounted xP with this factor (default: None, an array of xP per player).
+
+        Returns:
+            pandas.DataFrame: Name and xP of each player.
+        """
+        n = self.xp.shape[1] if n is None else n
+        if discount_factor is None:
+            return pd.DataFrame({'Name': self.names, 'xP': list(self.xp[:, :n].copy())})
+        # An object column, as when it held the per-player arrays, so sorting by xP keeps the same tie order
+        return pd.DataFrame({'Name': self.names, 'xP': pd.Series(list(self.mean(n, discount_factor)), dtype=object)})
+
+def build_xp_horizon(position_xp, team_ids, next_fixtures, home_weighting, away_weighting, difficulty_weightings):
+    """
+    Build the horizon of one position's predictions.
+
+    Args:
+        position_xp (pandas.DataFrame): The predictions of the position (Name, xP).
+        team_ids (numpy.ndarray): The team id of each player, -1 for players without a team (predicted 0).
+        next_fixtures (tuple): has_fixture, home and difficulty (teams x gameweeks) of each team's next fixtures.
+        home_weighting (float): Added to xP for a home fixture.
+        away_weighting (float): Added to xP for an away fixture.
+        difficulty_weightings (dict): Fixture difficulty --> added to xP (0 for a difficulty not in it).
+
+    Returns:
+        xp_horizon: The horizon; players whose team has run out of fixtures keep their xP in the later columns.
+    """
+    has_fixture, home, difficulty = next_fixtures
+    xp = position_xp['xP'].to_numpy(dtype=np.float64)[:, np.newaxis]
+    has_team = team_ids >= 0
+    team_ids = np.where(has_team & (team_ids < len(has_fixture)), team_ids, 0)
+    home_adjustments = np.where(home, home_weighting, away_weighting)
+    difficulty_adjustments = np.zeros(difficulty.shape)
+    for fixture_difficulty, weighting in difficulty_weightings.items():
+        difficulty_adjustments[difficulty == fixture_difficulty] = weighting
+    adjusted = np.round(xp + home_adjustments[team_ids] + difficulty_adjustments[team_ids], 3)
+    xp = np.where(has_fixture[team_ids], adjusted, xp)
+    xp[~has_team] = 0.0
+    return xp_horizon(position_xp['Name'].to_numpy(), xp)
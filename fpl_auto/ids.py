@@ -0,0 +1,104 @@
+'''
+Player Ids for FPL Automation Project
+
+Player names are interned once per season into dense integer ids (0, 1, 2, ...), so the team engine
+can hold squads, captaincy and per-gameweek lookups as small integers, and index arrays with them,
+instead of hashing and comparing name strings. Names are only looked up again for display and export.
+'''
+
+# (data location, season) --> player_ids, for the life of the process so a season's ids never change
+season_player_ids = {}
+
+class player_ids:
+    def __init__(self, names=()):
+        """
+        Initialize the player ids.
+
+        Args:
+            names (iterable): Names to intern first, in order (default: none).
+        """
+        self.names = []
+        self.ids = {}
+        self.intern_all(names)
+
+    def intern(self, name):
+        """
+        Get the id of a name, giving it the next free id if it has not been seen before.
+
+        Args:
+            name (str): The player name.
+
+        Returns:
+            int: The player id.
+        """
+        player_id = self.ids.get(name)
+        if player_id is None:
+            player_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return player_id
+
+    def intern_all(self, names):
+        """
+        Get the ids of many names, interning any new ones.
+
+        Args:
+            names (iterable): The player names.
+
+        Returns:
+            list: The player ids, in the same order.
+        """
+        return [self.intern(name) for name in names]
+
+    def lookup(self, name):
+        """
+        Get the id of a name without interning it.
+
+        Args:
+            name (str): The player name.
+
+        Returns:
+            int: The player id, or None if the name has not been seen.
+        """
+        return self.ids.get(name)
+
+    def name(self, player_id):
+        """
+        Get the name of an id.
+
+        Args:
+            player_id (int): The player id.
+
+        Returns:
+            str: The player name.
+        """
+        return self.names[player_id]
+
+    def names_of(self, player_ids):
+        """
+        Get the names of many ids.
+
+        Args:
+            player_ids (iterable): The player ids.
+
+        Returns:
+            list: The player names, in the same order.
+        """
+        return [self.names[player_id] for player_id in player_ids]
+
+    def keyed(self, name_dict):
+        """
+        Re-key a name --> value dictionary by player id.
+
+        Args:
+            name_dict (dict): The dictionary, keyed by player name.
+
+        Returns:
+            dict: The same values, keyed by player id, in the same order.
+        """
+        return {self.intern(name): value for name, value in name_dict.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
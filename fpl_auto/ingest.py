@@ -0,0 +1,170 @@
+'''
+Bulk Ingest for FPL Automation Project
+
+Builds every compiled file (gameweek store and tensor, player history store, understat table) for
+every season in the data directory, one season per worker process. Each season's input files are
+content hashed and the hash recorded in data/<season>/compiled/manifest.json, so seasons that have
+not changed since the last ingest are skipped.
+
+Run after each data refresh: python -m fpl_auto.ingest
+'''
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fpl_auto import store
+from fpl_auto import players
+from fpl_auto import understat
+
+# Bumped whenever the compiled formats change, so every season is rebuilt
+INGEST_VERSION = 1
+
+def manifest_path(data_location, season):
+    """
+    Get the path of the ingest manifest for a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The path of the manifest.
+    """
+    return f'{store.compiled_dir(data_location, season)}/manifest.json'
+
+def season_inputs(data_location, season):
+    """
+    List the input files of a season, i.e. everything but the compiled directory.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        list: The file paths, sorted.
+    """
+    season_dir = f'{data_location}/{season}'
+    paths = []
+    for root, dirs, files in os.walk(season_dir):
+        if root == season_dir and 'compiled' in dirs:
+            dirs.remove('compiled')
+        paths.extend(f'{root}/{file}' for file in files)
+    # Understat ids can be resolved through other seasons' id_dict.csv files
+    paths.extend(f'{data_location}/{other_season}/id_dict.csv' for other_season in store.list_seasons(data_location)
+                 if other_season != season and os.path.exists(f'{data_location}/{other_season}/id_dict.csv'))
+    return sorted(paths)
+
+def season_hash(data_location, season):
+    """
+    Hash the names and contents of a season's input files.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256(f'{INGEST_VERSION}'.encode())
+    for path in season_inputs(data_location, season):
+        digest.update(os.path.relpath(path, data_location).encode())
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def read_manifest(data_location, season):
+    """
+    Read the ingest manifest of a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        dict: The manifest, or None if the season has not been ingested.
+    """
+    try:
+        with open(manifest_path(data_location, season)) as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def ingest_season(data_location, season, force=False):
+    """
+    Build every compiled file of a season, unless its inputs are unchanged since the last ingest.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        force (bool): Rebuild even if the inputs are unchanged (default: False).
+
+    Returns:
+        dict: The season, whether it was skipped, the seconds taken and the files written.
+    """
+    start = time.time()
+    content_hash = season_hash(data_location, season)
+    manifest = read_manifest(data_location, season)
+    if not force and manifest is not None and manifest['hash'] == content_hash \
+            and all(os.path.exists(path) for path in manifest['outputs']):
+        return {'season': season, 'skipped': True, 'seconds': time.time() - start, 'outputs': manifest['outputs']}
+
+    outputs = []
+    season_gws = store.read_season_gws(data_location, season)
+    if store.build_gw_store(data_location, season, season_gws) is not None:
+        store.build_gw_tensor(data_location, season, season_gws)
+        outputs.append(store.gw_store_path(data_location, season))
+        outputs.extend(store.gw_tensor_paths(data_location, season))
+    player_store = players.build_player_store(data_location, season)
+    if player_store is not None:
+        outputs.append(player_store)
+    understat_table = understat.build_understat(data_location, season, season_gws)
+    if understat_table is not None:
+        outputs.append(understat_table)
+
+    os.makedirs(store.compiled_dir(data_location, season), exist_ok=True)
+    with open(manifest_path(data_location, season), 'w') as file:
+        json.dump({'hash': content_hash, 'version': INGEST_VERSION, 'outputs': outputs, 'seconds': time.time() - start}, file, indent=2)
+    return {'season': season, 'skipped': False, 'seconds': time.time() - start, 'outputs': outputs}
+
+def ingest(data_location, seasons=None, workers=None, force=False):
+    """
+    Ingest many seasons in a process pool.
+
+    Args:
+        data_location (str): The location of the data.
+        seasons (list): The seasons to ingest (default: None, every season in the data directory).
+        workers (int): The number of worker processes (default: None, one per CPU).
+        force (bool): Rebuild even if the inputs are unchanged (default: False).
+
+    Returns:
+        list: The ingest_season result of each season, in season order.
+    """
+    seasons = seasons or store.list_seasons(data_location)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(ingest_season, [data_location] * len(seasons), seasons, [force] * len(seasons)))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Bulk ingest")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, nargs='*', default=None,
+                        help='Seasons to ingest. Format: YYYY-YY e.g 2021-22, default: every season in the dataset')
+    parser.add_argument('-workers', type=int, default=None,
+                        help='Number of worker processes, default: one per CPU')
+    parser.add_argument('-force',
+                        action=argparse.BooleanOptionalAction, default=False, help='Rebuild seasons even if unchanged, default: False')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    start = time.time()
+    for result in ingest(inputs.gw_data, inputs.season, inputs.workers, inputs.force):
+        status = 'unchanged, skipped' if result['skipped'] else f"built {len(result['outputs'])} files"
+        print(f"{result['season']}: {status} in {result['seconds']:.2f}s")
+    print(f'Total: {time.time() - start:.2f}s')
+
+if __name__ == '__main__':
+    main()
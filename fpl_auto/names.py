@@ -0,0 +1,244 @@
+'''
+Player Name Index for FPL Automation Project
+
+Every season's players_raw.csv indexed once per process, so a player can be found from any spelling of
+their name in O(1): names are folded (accents stripped, case folded, '_' and repeated spaces collapsed)
+before lookup, so 'Gabriel dos Santos Magalhaes', 'gabriel dos santos magalhães' and
+'Gabriel_dos_Santos_Magalhães_3' all find the same element. Web names ('Gabriel') are keys too where they
+are unique in the season.
+
+Each player's identity is FPL's player code, which stays the same across seasons while element ids and
+display names change, so players can be joined between seasons (and from understat ids) on it.
+'''
+import functools
+import os
+import re
+import unicodedata
+import pandas as pd
+from fpl_auto import store
+from fpl_auto import understat
+
+# Letters NFKD does not decompose into a base letter and an accent
+FOLDED_LETTERS = str.maketrans({'đ': 'dj', 'ø': 'o', 'ł': 'l', 'æ': 'ae', 'œ': 'oe', 'ı': 'i', 'ð': 'd', 'þ': 'th'})
+# Names in older gameweek files carry the element id, e.g. 'Aaron_Cresswell_376'
+ELEMENT_SUFFIX = re.compile(r'^(.*?)[_ ](\d+)$')
+# Marks a key shared by several players
+AMBIGUOUS = -1
+
+@functools.lru_cache(maxsize=65536)
+def fold(name):
+    """
+    Fold a player name into its lookup key.
+
+    Args:
+        name (str): The player name.
+
+    Returns:
+        str: The name without accents, case folded, with '_' as a space and single spaces only.
+    """
+    name = unicodedata.normalize('NFKD', str(name).replace('_', ' '))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(name.casefold().translate(FOLDED_LETTERS).split())
+
+class name_index:
+    def __init__(self, players, data_location='data'):
+        """
+        Index the players of every season.
+
+        Args:
+            players (pandas.DataFrame): One row per season and element: season, element, code, name (first and second name) and web_name.
+            data_location (str): The location of the data, for understat joins (default: 'data').
+        """
+        self.data_location = data_location
+        self.names = {}
+        self.identities = {}
+        self.elements = {}
+        self.keys = {}
+        self.season_keys = {}
+        self.understat = {}
+        web_keys = {}
+        for season, element, code, name, web_name in players[['season', 'element', 'code', 'name', 'web_name']].itertuples(index=False):
+            self.names[(season, element)] = name
+            self.identities[(season, element)] = code
+            self.elements.setdefault(code, {})[season] = element
+            self.add_key(self.season_keys, (season, fold(name)), element)
+            self.add_key(self.keys, fold(name), code)
+            self.add_key(web_keys, (season, fold(web_name)), element)
+        # Full names take precedence over web names
+        for key, element in web_keys.items():
+            self.season_keys.setdefault(key, element)
+        self.season_keys = {key: element for key, element in self.season_keys.items() if element != AMBIGUOUS}
+        self.keys = {key: code for key, code in self.keys.items() if code != AMBIGUOUS}
+
+    def add_key(self, keys, key, value):
+        """
+        Add a lookup key, marking it AMBIGUOUS if it already leads to another value.
+
+        Args:
+            keys (dict): The keys.
+            key (object): The key.
+            value (int): The element or identity it leads to.
+        """
+        if keys.get(key, value) != value:
+            value = AMBIGUOUS
+        keys[key] = value
+
+    def element(self, name, season):
+        """
+        Find a player's element id in a season from any spelling of their name.
+
+        Args:
+            name (str): The player name, full, web or with an element suffix ('Aaron_Cresswell_376').
+            season (str): The season.
+
+        Returns:
+            int: The element id, or None if no single player of the season has that name.
+        """
+        key = fold(name)
+        element = self.season_keys.get((season, key))
+        if element is not None:
+            return element
+        suffixed = ELEMENT_SUFFIX.match(key)
+        if suffixed is not None and (season, int(suffixed.group(2))) in self.names:
+            return int(suffixed.group(2))
+        # A name the player had in another season
+        return self.element_of(self.keys.get(key), season)
+
+    def resolve(self, name, season):
+        """
+        Find the name a season's data uses for a player, from any spelling of their name.
+
+        Args:
+            name (str): The player name.
+            season (str): The season.
+
+        Returns:
+            str: The player's first and second name in the season, or None if no single player has that name.
+        """
+        return self.names.get((season, self.element(name, season)))
+
+    def name(self, season, element):
+        """
+        Get a player's name in a season.
+
+        Args:
+            season (str): The season.
+            element (int): The element id.
+
+        Returns:
+            str: The first and second name, or None if the element is not in the season.
+        """
+        return self.names.get((season, element))
+
+    def identity(self, season, element):
+        """
+        Get a player's identity, which is the same in every season.
+
+        Args:
+            season (str): The season.
+            element (int): The element id.
+
+        Returns:
+            int: The player code, or None if the element is not in the season.
+        """
+        return self.identities.get((season, element))
+
+    def identity_of(self, name, season):
+        """
+        Get the identity of a player from any spelling of their name.
+
+        Args:
+            name (str): The player name.
+            season (str): The season.
+
+        Returns:
+            int: The player code, or None if no single player has that name.
+        """
+        return self.identity(season, self.element(name, season))
+
+    def element_of(self, identity, season):
+        """
+        Get a player's element id in a season from their identity.
+
+        Args:
+            identity (int): The player code.
+            season (str): The season.
+
+        Returns:
+            int: The element id, or None if the player was not in the season.
+        """
+        return self.elements.get(identity, {}).get(season)
+
+    def translate(self, name, from_season, to_season):
+        """
+        Get the name a player has in another season.
+
+        Args:
+            name (str): The player name in from_season.
+            from_season (str): The season the name is from.
+            to_season (str): The season to get the name in.
+
+        Returns:
+            str: The player's name in to_season, or None if they were not in it.
+        """
+        return self.name(to_season, self.element_of(self.identity_of(name, from_season), to_season))
+
+    def understat_element(self, understat_id, season):
+        """
+        Get the element id of an understat player in a season.
+
+        Args:
+            understat_id (int): The understat player id.
+            season (str): The season.
+
+        Returns:
+            int: The element id, or None if the player is not joined to one.
+        """
+        if season not in self.understat:
+            has_understat = os.path.isdir(f'{self.data_location}/{season}/understat')
+            self.understat[season] = understat.understat_to_element(self.data_location, season) if has_understat else {}
+        return self.understat[season].get(understat_id)
+
+    def understat_identity(self, understat_id, season):
+        """
+        Get the identity of an understat player.
+
+        Args:
+            understat_id (int): The understat player id.
+            season (str): The season.
+
+        Returns:
+            int: The player code, or None if the player is not joined to one.
+        """
+        return self.identity(season, self.understat_element(understat_id, season))
+
+def read_players(data_location, season):
+    """
+    Read the players of a season from players_raw.csv.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season.
+
+    Returns:
+        pandas.DataFrame: The season, element, code, name and web_name of each player.
+    """
+    players_raw = pd.read_csv(f'{data_location}/{season}/players_raw.csv', usecols=['id', 'code', 'first_name', 'second_name', 'web_name'])
+    return pd.DataFrame({'season': season, 'element': players_raw['id'], 'code': players_raw['code'],
+                         'name': players_raw['first_name'] + ' ' + players_raw['second_name'], 'web_name': players_raw['web_name']})
+
+def build_name_index(data_location):
+    """
+    Build the name index of every season in the dataset.
+
+    Args:
+        data_location (str): The location of the data.
+
+    Returns:
+        name_index: The index.
+    """
+    seasons = [season for season in store.list_seasons(data_location) if os.path.exists(f'{data_location}/{season}/players_raw.csv')]
+    players = [read_players(data_location, season) for season in seasons]
+    if len(players) == 0:
+        players = [pd.DataFrame(columns=['season', 'element', 'code', 'name', 'web_name'])]
+    return name_index(pd.concat(players, ignore_index=True), data_location)
@@ -0,0 +1,318 @@
+'''
+Consolidated Player History Store for FPL Automation Project
+
+Every data/<season>/players/<Name_id>/gw.csv and history.csv is consolidated into a single
+indexed .npz file per season. Rows are sorted by element id (then round / season), and each
+table keeps per-player offsets so any player's rows are a single O(1) slice.
+
+Build with: python -m fpl_auto.players -season 2023-24
+'''
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from fpl_auto import store
+from fpl_auto import cache
+
+# Per-player tables and the column each is ordered by within a player
+PLAYER_TABLES = {'gw': 'round', 'history': 'season_name'}
+
+def player_store_path(data_location, season):
+    """
+    Get the path of the consolidated player store for a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The path of the consolidated player store.
+    """
+    return f'{store.compiled_dir(data_location, season)}/players.npz'
+
+def player_dir_element(player_dir, gw_data=None):
+    """
+    Work out the element id of a player directory.
+
+    Args:
+        player_dir (str): The directory name, e.g. Aaron_Ramsdale_14.
+        gw_data (pandas.DataFrame): The player's gw.csv, used when the directory has no id suffix (default: None).
+
+    Returns:
+        int: The element id, or None if it cannot be determined.
+    """
+    suffix = player_dir.rsplit('_', 1)[-1]
+    if suffix.isdigit():
+        return int(suffix)
+    if gw_data is not None and 'element' in gw_data.columns and len(gw_data) > 0:
+        return int(gw_data['element'].iloc[0])
+    return None
+
+def read_player_csv(path):
+    """
+    Parse one per-player CSV.
+
+    Args:
+        path (str): The path of the CSV.
+
+    Returns:
+        pandas.DataFrame: The parsed file, or None if it is missing or empty.
+    """
+    try:
+        return pd.read_csv(path)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
+
+def read_player_dir(data_location, season, player_dir):
+    """
+    Parse the gw.csv and history.csv of one player directory.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        player_dir (str): The directory name, e.g. Aaron_Ramsdale_14.
+
+    Returns:
+        tuple: The element id and a dict of table name --> pandas.DataFrame (or None).
+    """
+    tables = {table: read_player_csv(f'{data_location}/{season}/players/{player_dir}/{table}.csv') for table in PLAYER_TABLES}
+    return player_dir_element(player_dir, tables['gw']), tables
+
+def player_dirs(data_location, season):
+    """
+    Map every player directory of a season to its element id.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        dict: element id --> directory name, empty if the season has no player directories.
+    """
+    players_dir = f'{data_location}/{season}/players'
+    if not os.path.isdir(players_dir):
+        return {}
+    element_dirs = {}
+    for player_dir in sorted(os.listdir(players_dir)):
+        element = player_dir_element(player_dir)
+        if element is None:
+            # Older seasons have no id suffix, so the id comes from the gw.csv itself
+            element = player_dir_element(player_dir, read_player_csv(f'{players_dir}/{player_dir}/gw.csv'))
+        if element is not None:
+            element_dirs[element] = player_dir
+    return element_dirs
+
+def table_arrays(table, frames):
+    """
+    Convert one consolidated table into named arrays for the store.
+
+    Args:
+        table (str): The table name ('gw' or 'history').
+        frames (list): (element, pandas.DataFrame) pairs.
+
+    Returns:
+        dict: The arrays, keyed '<table>.<name>'.
+    """
+    frames = [frame.assign(element=element) for element, frame in frames if frame is not None and len(frame) > 0]
+    if len(frames) == 0:
+        return {}
+    all_rows = pd.concat(frames, ignore_index=True)
+    all_rows = all_rows.sort_values(['element', PLAYER_TABLES[table]] if PLAYER_TABLES[table] in all_rows.columns else ['element'], kind='stable')
+
+    element_column = all_rows['element'].to_numpy()
+    elements, starts = np.unique(element_column, return_index=True)
+    arrays = {
+        f'{table}.elements': elements.astype(np.int64),
+        f'{table}.offsets': np.append(starts, len(element_column)).astype(np.int64),
+        f'{table}.columns': np.array(all_rows.columns.tolist()),
+    }
+    for column in all_rows.columns:
+        values = all_rows[column]
+        if values.dtype == object:
+            # Mixed or text columns are kept as strings, missing values as ''
+            arrays[f'{table}.{column}'] = values.fillna('').to_numpy(dtype=str)
+        else:
+            arrays[f'{table}.{column}'] = values.to_numpy()
+    return arrays
+
+def build_player_store(data_location, season):
+    """
+    Consolidate every per-player gw.csv and history.csv of a season into one indexed file.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The path of the written store, or None if the season has no player directories.
+    """
+    players_dir = f'{data_location}/{season}/players'
+    if not os.path.isdir(players_dir):
+        return None
+
+    frames = {table: [] for table in PLAYER_TABLES}
+    for player_dir in sorted(os.listdir(players_dir)):
+        element, tables = read_player_dir(data_location, season, player_dir)
+        if element is None:
+            continue
+        for table in PLAYER_TABLES:
+            frames[table].append((element, tables[table]))
+
+    return write_player_store(data_location, season, frames)
+
+def write_player_store(data_location, season, frames):
+    """
+    Write the consolidated player store of a season from already parsed player tables.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        frames (dict): table name --> list of (element, pandas.DataFrame) pairs.
+
+    Returns:
+        str: The path of the written store, or None if there are no rows.
+    """
+    arrays = {}
+    for table in PLAYER_TABLES:
+        arrays.update(table_arrays(table, frames.get(table, [])))
+    if len(arrays) == 0:
+        return None
+
+    path = player_store_path(data_location, season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **arrays)
+    cache.shared_cache.invalidate(data_location, season)
+    return path
+
+def merge_player_store(data_location, season, frames):
+    """
+    Write the consolidated player store of a season from freshly parsed tables of some of its players,
+    keeping every other player's rows from the existing store (or their directory, if not in the store).
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        frames (dict): table name --> list of (element, pandas.DataFrame) pairs of the refreshed players.
+
+    Returns:
+        str: The path of the written store, or None if there are no rows.
+    """
+    existing = load_player_store(data_location, season)
+    element_dirs = player_dirs(data_location, season)
+    merged = {}
+    for table in PLAYER_TABLES:
+        fresh = frames.get(table, [])
+        refreshed = {element for element, _ in fresh}
+        stored = set(existing.elements(table)) if existing is not None else set()
+        kept = [(element, existing.get_player(element, table)) for element in sorted(stored - refreshed)]
+        kept += [(element, read_player_dir(data_location, season, player_dir)[1][table])
+                 for element, player_dir in element_dirs.items() if element not in stored and element not in refreshed]
+        merged[table] = kept + fresh
+    return write_player_store(data_location, season, merged)
+
+class player_store:
+    def __init__(self, path):
+        """
+        Load a consolidated player store into memory.
+
+        Args:
+            path (str): The path of the consolidated player store.
+        """
+        self.tables = {}
+        with np.load(path, allow_pickle=False) as player_file:
+            for table in PLAYER_TABLES:
+                if f'{table}.elements' not in player_file:
+                    continue
+                elements = player_file[f'{table}.elements']
+                columns = player_file[f'{table}.columns'].tolist()
+                self.tables[table] = {
+                    'slots': {int(element): i for i, element in enumerate(elements)},
+                    'offsets': player_file[f'{table}.offsets'],
+                    'columns': columns,
+                    'values': {column: player_file[f'{table}.{column}'] for column in columns},
+                }
+
+    def elements(self, table='gw'):
+        """
+        List the players held in a table.
+
+        Args:
+            table (str): The table name ('gw' or 'history', default: 'gw').
+
+        Returns:
+            list: The element ids.
+        """
+        if table not in self.tables:
+            return []
+        return list(self.tables[table]['slots'])
+
+    def get_players(self, elements, table='gw'):
+        """
+        Get the full rows of one or many players.
+
+        Args:
+            elements (list): The element ids.
+            table (str): The table name ('gw' or 'history', default: 'gw').
+
+        Returns:
+            pandas.DataFrame: The rows of every requested player found, in the requested order.
+        """
+        if table not in self.tables:
+            return pd.DataFrame()
+        player_table = self.tables[table]
+        offsets = player_table['offsets']
+        ranges = [np.arange(offsets[player_table['slots'][element]], offsets[player_table['slots'][element] + 1]) for element in elements if element in player_table['slots']]
+        rows = np.concatenate(ranges) if len(ranges) > 0 else np.array([], dtype=np.int64)
+        return pd.DataFrame({column: player_table['values'][column][rows] for column in player_table['columns']})
+
+    def get_player(self, element, table='gw'):
+        """
+        Get the full rows of one player.
+
+        Args:
+            element (int): The element id.
+            table (str): The table name ('gw' or 'history', default: 'gw').
+
+        Returns:
+            pandas.DataFrame: The player's rows (empty if the player is not in the store).
+        """
+        return self.get_players([element], table)
+
+def load_player_store(data_location, season):
+    """
+    Load the consolidated player store for a season if it has been built.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        player_store: The consolidated store, or None if it has not been built.
+    """
+    path = player_store_path(data_location, season)
+    if not os.path.exists(path):
+        return None
+    return player_store(path)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Consolidate player histories")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default=None,
+                        help='Season to consolidate. Format: YYYY-YY e.g 2021-22, default: every season in the dataset')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    seasons = [inputs.season] if inputs.season else store.list_seasons(inputs.gw_data)
+    for season in seasons:
+        start = time.time()
+        path = build_player_store(inputs.gw_data, season)
+        if path is None:
+            print(f'{season}: skipped (no player directories)')
+        else:
+            print(f'{season}: wrote {path} in {time.time() - start:.2f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+'''
+Predictions Store for FPL Automation Project
+
+One columnar file per season (predictions/<season>/predictions.npz) holding every exported gameweek's
+predicted points, indexed by (gameweek, position, player). Rows are sorted by gameweek and position in
+the exported (xP descending) order, so a whole gameweek is one slice and a player's history is one lookup.
+
+Existing predictions/<season>/GW*/POS.tsv exports can be imported with:
+python -m fpl_auto.predictions -season 2022-23
+'''
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+POSITIONS = ['GK', 'DEF', 'MID', 'FWD']
+
+def predictions_path(predictions_location, season):
+    """
+    Get the path of the predictions store for a season.
+
+    Args:
+        predictions_location (str): The location of the predictions.
+        season (str): The season of the predictions.
+
+    Returns:
+        str: The path of the predictions store.
+    """
+    return f'{predictions_location}/{season}/predictions.npz'
+
+class predictions_store:
+    def __init__(self, gw=None, position=None, name=None, xp=None):
+        """
+        Initialize the predictions store from its columns (empty by default).
+
+        Args:
+            gw (numpy.ndarray): The gameweek of each row.
+            position (numpy.ndarray): The position code (index into POSITIONS) of each row.
+            name (numpy.ndarray): The player name of each row.
+            xp (numpy.ndarray): The predicted points of each row.
+        """
+        self.gw = np.array([], dtype=np.int16) if gw is None else gw.astype(np.int16)
+        self.position = np.array([], dtype=np.int8) if position is None else position.astype(np.int8)
+        self.name = np.array([], dtype=str) if name is None else name.astype(str)
+        self.xp = np.array([], dtype=np.float64) if xp is None else xp.astype(np.float64)
+        self.index()
+
+    def index(self):
+        """
+        Rebuild the gameweek offsets and player --> rows lookup.
+        """
+        # Rows of (gw, position) are offsets[gw, position]:offsets[gw, position + 1], position 4 wraps to the next gw
+        keys = self.gw.astype(np.int64) * len(POSITIONS) + self.position
+        self.offsets = np.searchsorted(keys, np.arange(40 * len(POSITIONS) + 1))
+        self.player_rows = {}
+        for row, name in enumerate(self.name.tolist()):
+            self.player_rows.setdefault(name, []).append(row)
+
+    def gws(self):
+        """
+        List the gameweeks held in the store.
+
+        Returns:
+            list: The gameweeks, sorted.
+        """
+        return np.unique(self.gw).tolist()
+
+    def has_gw(self, gameweek):
+        """
+        Check whether a gameweek is held in the store.
+
+        Args:
+            gameweek (int): The gameweek.
+
+        Returns:
+            bool: True if the gameweek is present.
+        """
+        return 0 <= gameweek < 40 and self.offsets[gameweek * len(POSITIONS)] < self.offsets[(gameweek + 1) * len(POSITIONS)]
+
+    def get_gw(self, gameweek):
+        """
+        Get every position's predictions for a gameweek, in the exported order.
+
+        Args:
+            gameweek (int): The gameweek.
+
+        Returns:
+            list: The GK, DEF, MID and FWD predictions (Name, xP), or None if the gameweek is not stored.
+        """
+        if not self.has_gw(gameweek):
+            return None
+        gw_predictions = []
+        for position in range(len(POSITIONS)):
+            start, end = self.offsets[gameweek * len(POSITIONS) + position], self.offsets[gameweek * len(POSITIONS) + position + 1]
+            gw_predictions.append(pd.DataFrame({'Name': self.name[start:end].astype(object), 'xP': self.xp[start:end]}))
+        return gw_predictions
+
+    def get_player(self, name):
+        """
+        Get a player's full prediction history.
+
+        Args:
+            name (str): The player name.
+
+        Returns:
+            pandas.DataFrame: The gameweek, position and xP of every prediction for the player, by gameweek.
+        """
+        rows = self.player_rows.get(name, [])
+        return pd.DataFrame({'gw': self.gw[rows], 'position': np.array(POSITIONS, dtype=object)[self.position[rows]], 'xP': self.xp[rows]})
+
+    def append_gw(self, gameweek, gw_predictions):
+        """
+        Add (or replace) a gameweek's predictions.
+
+        Args:
+            gameweek (int): The gameweek.
+            gw_predictions (list): The GK, DEF, MID and FWD predictions, each with Name and xP columns (or Name as the index).
+        """
+        keep = self.gw != gameweek
+        gw, position, name, xp = [self.gw[keep]], [self.position[keep]], [self.name[keep]], [self.xp[keep]]
+        for i, pos_predictions in enumerate(gw_predictions):
+            if 'Name' not in pos_predictions.columns:
+                pos_predictions = pos_predictions.reset_index()
+            gw.append(np.full(len(pos_predictions), gameweek, dtype=np.int16))
+            position.append(np.full(len(pos_predictions), i, dtype=np.int8))
+            name.append(pos_predictions['Name'].to_numpy(dtype=str))
+            xp.append(pos_predictions['xP'].to_numpy(dtype=np.float64))
+        gw, position, name, xp = [np.concatenate(column) for column in (gw, position, name, xp)]
+        # Stable sort keeps each position's exported order
+        order = np.lexsort((position, gw))
+        self.gw, self.position, self.name, self.xp = gw[order], position[order], name[order], xp[order]
+        self.index()
+
+    def save(self, path):
+        """
+        Write the store, replacing any previous file atomically.
+
+        Args:
+            path (str): The path of the predictions store.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.tmp.npz'
+        np.savez(temp_path, gw=self.gw, position=self.position, name=self.name, xP=self.xp)
+        os.replace(temp_path, path)
+
+def load_predictions(predictions_location, season):
+    """
+    Load the predictions store of a season.
+
+    Args:
+        predictions_location (str): The location of the predictions.
+        season (str): The season of the predictions.
+
+    Returns:
+        predictions_store: The predictions store, or None if the season has none.
+    """
+    path = predictions_path(predictions_location, season)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as store_file:
+        return predictions_store(store_file['gw'], store_file['position'], store_file['name'], store_file['xP'])
+
+def append_predictions(predictions_location, season, gameweek, gw_predictions):
+    """
+    Add (or replace) a gameweek in a season's predictions store, creating the store if needed.
+
+    Args:
+        predictions_location (str): The location of the predictions.
+        season (str): The season of the predictions.
+        gameweek (int): The gameweek.
+        gw_predictions (list): The GK, DEF, MID and FWD predictions.
+
+    Returns:
+        str: The path of the predictions store.
+    """
+    store = load_predictions(predictions_location, season) or predictions_store()
+    store.append_gw(gameweek, gw_predictions)
+    path = predictions_path(predictions_location, season)
+    store.save(path)
+    return path
+
+def read_tsv_gw(predictions_location, season, gameweek):
+    """
+    Read a gameweek's exported TSV predictions.
+
+    Args:
+        predictions_location (str): The location of the predictions.
+        season (str): The season of the predictions.
+        gameweek (int): The gameweek.
+
+    Returns:
+        list: The GK, DEF, MID and FWD predictions (Name, xP).
+    """
+    return [pd.read_csv(f'{predictions_location}/{season}/GW{gameweek}/{position}.tsv', sep='\t') for position in POSITIONS]
+
+def import_tsv(predictions_location, season):
+    """
+    Import every exported GW*/POS.tsv of a season into its predictions store.
+
+    Args:
+        predictions_location (str): The location of the predictions.
+        season (str): The season of the predictions.
+
+    Returns:
+        list: The gameweeks imported.
+    """
+    store = load_predictions(predictions_location, season) or predictions_store()
+    imported = []
+    for gameweek in range(0, 39):
+        if os.path.isdir(f'{predictions_location}/{season}/GW{gameweek}'):
+            store.append_gw(gameweek, read_tsv_gw(predictions_location, season, gameweek))
+            imported.append(gameweek)
+    if len(imported) > 0:
+        store.save(predictions_path(predictions_location, season))
+    return imported
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Import TSV predictions")
+    parser.add_argument('-predictions', type=str, default='predictions',
+                        help='Location of the predictions, default: predictions')
+    parser.add_argument('-season', type=str, default=None,
+                        help='Season to import. Format: YYYY-YY e.g 2021-22, default: every season with predictions')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    seasons = [inputs.season] if inputs.season else sorted(os.listdir(inputs.predictions))
+    for season in seasons:
+        if not os.path.isdir(f'{inputs.predictions}/{season}'):
+            continue
+        imported = import_tsv(inputs.predictions, season)
+        print(f'{season}: imported {len(imported)} gameweeks into {predictions_path(inputs.predictions, season)}')
+
+if __name__ == '__main__':
+    main()
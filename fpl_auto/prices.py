@@ -0,0 +1,110 @@
+'''
+Price Matrix for FPL Automation Project
+
+A dense (players x gameweeks) int16 matrix of every player's price in tenths of a million, built once
+per season from the compiled gameweek store (or the gameweek CSVs), so a price is one array lookup
+and the value of a whole squad is one array reduction. A player who played twice in a gameweek has
+the price of their last row, matching DataFrame.to_dict.
+'''
+import numpy as np
+
+# Marks a player without a row in a gameweek
+NO_PRICE = -1
+
+class price_matrix:
+    def __init__(self, names, values):
+        """
+        Initialize the price matrix.
+
+        Args:
+            names (list): The player names, one per row.
+            values (numpy.ndarray): The (players x gameweeks) prices in tenths, NO_PRICE where a player has no row; column 0 is GW1.
+        """
+        self.names = names
+        self.values = values
+        self.name_to_row = {name: i for i, name in enumerate(names)}
+        self.weeks = set((np.nonzero((values != NO_PRICE).any(axis=0))[0] + 1).tolist())
+
+    def has_gw(self, week_num):
+        """
+        Check whether a gameweek has any prices.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek is present.
+        """
+        return week_num in self.weeks
+
+    def price(self, name, week_num):
+        """
+        Get a player's price in a gameweek.
+
+        Args:
+            name (str): The player name.
+            week_num (int): The week number.
+
+        Returns:
+            float: The price in millions, or None if the player has no row in the gameweek.
+        """
+        row = self.name_to_row.get(name)
+        if row is None:
+            return None
+        value = self.values[row, week_num - 1]
+        return None if value == NO_PRICE else float(value) / 10
+
+    def tenths(self, names, week_num):
+        """
+        Get the prices of many players in a gameweek, in tenths.
+
+        Args:
+            names (list): The player names.
+            week_num (int): The week number.
+
+        Returns:
+            numpy.ndarray: The int16 prices in tenths, NO_PRICE for players without a row.
+        """
+        rows = np.array([self.name_to_row.get(name, -1) for name in names], dtype=np.int64)
+        tenths = np.full(len(names), NO_PRICE, dtype=np.int16)
+        found = rows >= 0
+        tenths[found] = self.values[rows[found], week_num - 1]
+        return tenths
+
+    def prices(self, names, week_num):
+        """
+        Get the prices of many players in a gameweek.
+
+        Args:
+            names (list): The player names.
+            week_num (int): The week number.
+
+        Returns:
+            numpy.ndarray: The prices in millions, NaN for players without a row.
+        """
+        tenths = self.tenths(names, week_num)
+        return np.where(tenths == NO_PRICE, np.nan, tenths / 10)
+
+def build_price_matrix(season_gws):
+    """
+    Build the price matrix of a season.
+
+    Args:
+        season_gws (list): (week number, names, values) per gameweek, names and values as arrays in CSV row order.
+
+    Returns:
+        price_matrix: The price matrix, or None if there are no gameweeks.
+    """
+    if len(season_gws) == 0:
+        return None
+    names, codes = np.unique(np.concatenate([gw_names for _, gw_names, _ in season_gws]).astype(str), return_inverse=True)
+    values = np.full((len(names), max(week_num for week_num, _, _ in season_gws)), NO_PRICE, dtype=np.int16)
+    start = 0
+    for week_num, gw_names, gw_values in season_gws:
+        gw_codes = codes[start:start + len(gw_names)]
+        start += len(gw_names)
+        # The first occurrence in the reversed codes is each player's last row, so double gameweeks keep its price
+        _, last = np.unique(gw_codes[::-1], return_index=True)
+        last = len(gw_codes) - 1 - last
+        values[gw_codes[last], week_num - 1] = np.asarray(gw_values)[last]
+    return price_matrix(names.tolist(), values)
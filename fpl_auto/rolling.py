@@ -0,0 +1,131 @@
+'''
+Rolling Player Windows for FPL Automation Project
+
+Per-player sums and row counts of every gameweek in a run of consecutive gameweeks, kept as
+(gameweeks x players x stats) arrays with their cumulative sums. The mean of any window of gameweeks
+(what concatenating the window's rows and grouping by player gives) is then the difference of two
+cumulative rows divided by the difference of two counts, so a window shifted by one gameweek costs
+one new gameweek rather than re-reading and re-grouping the whole window. Other window statistics,
+such as exponentially weighted form, come from the same per-gameweek arrays.
+
+Gameweek stats are integers or float32, whose sums are exact in float64, so differences of the
+cumulative sums are exactly the window sums (understat stats, float64, to rounding). Means of float32
+stats are rounded once from the exact sum, where grouping sums in float32 first.
+'''
+import numpy as np
+import pandas as pd
+
+class week_totals:
+    def __init__(self, frame):
+        """
+        Total one gameweek's rows per player.
+
+        Args:
+            frame (pandas.DataFrame): One row per player fixture, indexed by player name, with numeric stat columns.
+        """
+        self.columns = frame.columns
+        self.dtypes = frame.dtypes
+        self.names, player_rows = np.unique(frame.index.to_numpy(dtype=object), return_inverse=True)
+        self.sums = np.zeros((len(self.names), len(self.columns)), dtype=np.float64)
+        np.add.at(self.sums, player_rows, frame.to_numpy(dtype=np.float64))
+        self.counts = np.bincount(player_rows, minlength=len(self.names))
+
+class player_window:
+    def __init__(self, weeks):
+        """
+        Initialize the rolling window.
+
+        Args:
+            weeks (list): (week key, week_totals) per gameweek in order, None for a gameweek that is left out.
+        """
+        totals = [week for _, week in weeks if week is not None]
+        self.weeks = {week: i for i, (week, _) in enumerate(weeks)}
+        self.columns = totals[0].columns if totals else pd.Index([])
+        self.dtypes = totals[0].dtypes if totals else pd.Series(dtype=object)
+        self.names = np.array(sorted(set().union(*[week.names for week in totals])), dtype=object)
+        self.week_sums = np.zeros((len(weeks), len(self.names), len(self.columns)), dtype=np.float64)
+        self.week_counts = np.zeros((len(weeks), len(self.names)), dtype=np.int64)
+        for i, (_, week) in enumerate(weeks):
+            if week is not None:
+                player_rows = np.searchsorted(self.names, week.names)
+                self.week_sums[i, player_rows] = week.sums
+                self.week_counts[i, player_rows] = week.counts
+        # Row 0 is before the first gameweek, so a window's total is cumulative[last + 1] - cumulative[first]
+        self.cumulative_sums = np.concatenate((np.zeros((1,) + self.week_sums.shape[1:]), np.cumsum(self.week_sums, axis=0)))
+        self.cumulative_counts = np.concatenate((np.zeros((1, len(self.names)), dtype=np.int64), np.cumsum(self.week_counts, axis=0)))
+
+    def has_weeks(self, first_week, last_week):
+        """
+        Check whether the window holds a run of gameweeks.
+
+        Args:
+            first_week (object): The key of the first gameweek.
+            last_week (object): The key of the last gameweek.
+
+        Returns:
+            bool: True if both gameweeks are held.
+        """
+        return first_week in self.weeks and last_week in self.weeks
+
+    def totals(self, first_week, last_week):
+        """
+        Get each player's stat totals and row count over a run of gameweeks.
+
+        Args:
+            first_week (object): The key of the first gameweek.
+            last_week (object): The key of the last gameweek (inclusive).
+
+        Returns:
+            tuple: (players x stats) sums and the row count of each player.
+        """
+        first, last = self.weeks[first_week], self.weeks[last_week] + 1
+        return self.cumulative_sums[last] - self.cumulative_sums[first], self.cumulative_counts[last] - self.cumulative_counts[first]
+
+    def frame(self, values, players):
+        """
+        Wrap per-player stats in a table like the gameweek frames.
+
+        Args:
+            values (numpy.ndarray): (players x stats) values.
+            players (numpy.ndarray): Which players (rows of names) to keep.
+
+        Returns:
+            pandas.DataFrame: The stats indexed by player name; float32 stats stay float32, others are float64.
+        """
+        values = values[players]
+        columns = {column: values[:, j].astype(np.float32 if self.dtypes[column] == np.float32 else np.float64) for j, column in enumerate(self.columns)}
+        return pd.DataFrame(columns, index=pd.Index(self.names[players], name='name'))
+
+    def mean(self, first_week, last_week):
+        """
+        Get each player's mean stats over a run of gameweeks, as grouping their rows by player would.
+
+        Args:
+            first_week (object): The key of the first gameweek.
+            last_week (object): The key of the last gameweek (inclusive).
+
+        Returns:
+            pandas.DataFrame: The mean stats of the players with rows in the window, by name.
+        """
+        sums, counts = self.totals(first_week, last_week)
+        players = np.flatnonzero(counts > 0)
+        return self.frame(sums / np.maximum(counts, 1)[:, np.newaxis], players)
+
+    def ewm(self, first_week, last_week, decay):
+        """
+        Get each player's exponentially weighted mean stats over a run of gameweeks (their form).
+
+        Args:
+            first_week (object): The key of the first gameweek.
+            last_week (object): The key of the last gameweek (inclusive).
+            decay (float): The weight of a gameweek relative to the one after it, between 0 and 1.
+
+        Returns:
+            pandas.DataFrame: The weighted mean stats of the players with rows in the window, by name.
+        """
+        first, last = self.weeks[first_week], self.weeks[last_week] + 1
+        weights = decay ** np.arange(last - first - 1, -1, -1, dtype=np.float64)
+        sums = np.tensordot(weights, self.week_sums[first:last], axes=1)
+        counts = weights @ self.week_counts[first:last]
+        players = np.flatnonzero(counts > 0)
+        return self.frame(sums / np.where(counts > 0, counts, 1)[:, np.newaxis], players)
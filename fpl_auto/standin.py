@@ -0,0 +1,340 @@
+'''
+Local FPL API Stand-in for FPL Automation Project
+
+Serves bootstrap-static, fixtures and element-summary responses from a local HTTP server, so code that
+calls the FPL API can run (and be latency benchmarked) without a network. Responses are either replayed
+from a recording (a directory of JSON files saved with -record) or synthesized from a season of the local
+dataset, as the API would have looked after a given gameweek. Point fpl_data(api_url=...), the
+updater's -base_url or FPL_API_URL at the printed URL.
+
+Run with: python -m fpl_auto.standin -season 2023-24 -gameweek 10
+'''
+import argparse
+import ast
+import asyncio
+import datetime
+import http.server
+import json
+import os
+import threading
+import time
+import pandas as pd
+from fpl_auto import players
+from fpl_auto import updater
+
+POSITION_NAMES = {1: 'GKP', 2: 'DEF', 3: 'MID', 4: 'FWD'}
+
+def recording_path(recording_location, path):
+    """
+    Get the file an API response is recorded in.
+
+    Args:
+        recording_location (str): The directory of the recording.
+        path (str): The endpoint, relative to the API root (e.g. 'element-summary/1/').
+
+    Returns:
+        str: The path of the JSON file.
+    """
+    return f"{recording_location}/{path.strip('/')}.json"
+
+def load_recording(recording_location):
+    """
+    Load every response of a recording.
+
+    Args:
+        recording_location (str): The directory of the recording.
+
+    Returns:
+        dict: endpoint --> decoded JSON response.
+    """
+    responses = {}
+    for root, dirs, files in os.walk(recording_location):
+        for file in files:
+            if file.endswith('.json'):
+                with open(f'{root}/{file}') as response_file:
+                    responses[f'{os.path.relpath(f"{root}/{file}", recording_location)[:-5]}/'] = json.load(response_file)
+    return responses
+
+def record(base_url, recording_location, elements=None):
+    """
+    Record bootstrap-static, fixtures and every element summary of an API for later replay.
+
+    Args:
+        base_url (str): The root of the API to record.
+        recording_location (str): The directory to write the recording to.
+        elements (list): The element ids to record summaries of (default: None, every element in bootstrap-static).
+
+    Returns:
+        int: The number of responses recorded.
+    """
+    client = updater.updater(base_url=base_url)
+    bootstrap = client.get_json('bootstrap-static/')
+    elements = elements if elements is not None else [element['id'] for element in bootstrap['elements']]
+    paths = ['fixtures/'] + [f'element-summary/{element}/' for element in elements]
+    responses = dict(zip(paths, asyncio.run(client.fetch_all(paths))))
+    responses['bootstrap-static/'] = bootstrap
+    for path, response in responses.items():
+        os.makedirs(os.path.dirname(recording_path(recording_location, path)), exist_ok=True)
+        with open(recording_path(recording_location, path), 'w') as response_file:
+            json.dump(response, response_file)
+    return len(responses)
+
+def to_records(frame):
+    """
+    Convert a table to JSON records, with missing values as null.
+
+    Args:
+        frame (pandas.DataFrame): The table.
+
+    Returns:
+        list: One dict per row.
+    """
+    return json.loads(frame.to_json(orient='records'))
+
+class synthesized_api:
+    def __init__(self, data_location, season, gameweek=None):
+        """
+        Synthesize the API of a season from the local dataset.
+
+        Args:
+            data_location (str): The location of the data.
+            season (str): The season to serve.
+            gameweek (int): The last finished gameweek; deadlines are moved so the next one is a day away
+                (default: None, the last gameweek with fixtures played, deadlines unchanged).
+        """
+        self.data_location = data_location
+        self.season = season
+        self.fixtures = pd.read_csv(f'{data_location}/{season}/fixtures.csv')
+        played = self.fixtures[self.fixtures['finished'] == True]['event'].dropna()
+        self.gameweek = gameweek if gameweek is not None else int(played.max()) if len(played) > 0 else 0
+        self.elements = pd.read_csv(f'{data_location}/{season}/players_raw.csv')
+        self.element_teams = dict(zip(self.elements['id'], self.elements['team']))
+        self.player_store = players.load_player_store(data_location, season)
+        # Without a consolidated store, players are read from their directories
+        self.player_dirs = players.player_dirs(data_location, season) if self.player_store is None else {}
+        self.responses = {}
+        self.lock = threading.Lock()
+
+    def events(self):
+        """
+        Build the events of bootstrap-static from the fixtures, each deadline 90 minutes before the gameweek's first kickoff.
+
+        Returns:
+            list: The events, by gameweek.
+        """
+        first_kickoffs = pd.to_datetime(self.fixtures['kickoff_time'], utc=True).groupby(self.fixtures['event']).min().sort_index()
+        deadlines = first_kickoffs - pd.Timedelta(minutes=90)
+        if self.gameweek + 1 in deadlines.index:
+            now = pd.Timestamp(datetime.datetime.now(datetime.timezone.utc)).floor('D')
+            deadlines = deadlines + (now + pd.Timedelta(days=1) - deadlines[self.gameweek + 1].floor('D'))
+        return [{'id': int(event), 'name': f'Gameweek {int(event)}', 'deadline_time': deadline.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                 'average_entry_score': 0, 'finished': bool(event <= self.gameweek), 'data_checked': bool(event <= self.gameweek),
+                 'is_previous': bool(event == self.gameweek), 'is_current': bool(event == self.gameweek), 'is_next': bool(event == self.gameweek + 1)}
+                for event, deadline in deadlines.items()]
+
+    def bootstrap_static(self):
+        """
+        Build bootstrap-static. Element totals are the season's final ones, whatever the gameweek.
+
+        Returns:
+            dict: The events, teams, elements and element types.
+        """
+        return {'events': self.events(),
+                'teams': to_records(pd.read_csv(f'{self.data_location}/{self.season}/teams.csv')),
+                'elements': to_records(self.elements),
+                'element_types': [{'id': element_type, 'singular_name_short': name} for element_type, name in POSITION_NAMES.items()]}
+
+    def fixture_records(self, fixtures):
+        """
+        Convert fixtures.csv rows to API fixtures, parsing each fixture's stats.
+
+        Args:
+            fixtures (pandas.DataFrame): The fixtures.
+
+        Returns:
+            list: The API fixtures.
+        """
+        records = to_records(fixtures)
+        for record in records:
+            if isinstance(record.get('stats'), str):
+                record['stats'] = ast.literal_eval(record['stats'])
+        return records
+
+    def element_summary(self, element):
+        """
+        Build a player's element summary: gameweeks played up to the last finished one, and their team's later fixtures.
+
+        Args:
+            element (int): The element id.
+
+        Returns:
+            dict: The history, fixtures and history_past, or None if the player has no history.
+        """
+        history, history_past = self.player_tables(element)
+        if len(history) == 0:
+            return None
+        team_id = self.element_teams.get(element)
+        team_fixtures = self.fixtures[(self.fixtures['team_h'] == team_id) | (self.fixtures['team_a'] == team_id)]
+        return {'history': to_records(history[history['round'].astype(int) <= self.gameweek]),
+                'fixtures': self.fixture_records(team_fixtures[team_fixtures['event'] > self.gameweek].drop(columns='stats')),
+                'history_past': to_records(history_past)}
+
+    def player_tables(self, element):
+        """
+        Get a player's gameweek and previous season rows, from the consolidated store if built, else their directory.
+
+        Args:
+            element (int): The element id.
+
+        Returns:
+            tuple: The gw and history tables (empty if the player has none).
+        """
+        if self.player_store is not None:
+            return self.player_store.get_player(element), self.player_store.get_player(element, 'history')
+        if element not in self.player_dirs:
+            return pd.DataFrame(), pd.DataFrame()
+        _, tables = players.read_player_dir(self.data_location, self.season, self.player_dirs[element])
+        return tuple(tables[table] if tables[table] is not None else pd.DataFrame() for table in ('gw', 'history'))
+
+    def get(self, path):
+        """
+        Get the response of an endpoint, building it on first request.
+
+        Args:
+            path (str): The endpoint, relative to the API root.
+
+        Returns:
+            object: The decoded JSON response, or None if the endpoint is not served.
+        """
+        with self.lock:
+            if path not in self.responses:
+                if path == 'bootstrap-static/':
+                    self.responses[path] = self.bootstrap_static()
+                elif path == 'fixtures/':
+                    self.responses[path] = self.fixture_records(self.fixtures)
+                elif path.startswith('element-summary/') and path[16:-1].isdigit():
+                    self.responses[path] = self.element_summary(int(path[16:-1]))
+                else:
+                    return None
+            return self.responses[path]
+
+class stand_in_server:
+    def __init__(self, responses, host='127.0.0.1', port=0, latency=0, error_every=0):
+        """
+        Initialize the stand-in server.
+
+        Args:
+            responses (dict): endpoint --> JSON response, or any object with the same get(path) (e.g. synthesized_api).
+            host (str): The host to listen on (default: '127.0.0.1').
+            port (int): The port to listen on (default: 0, any free port).
+            latency (float): Seconds each response is delayed by, to mimic the real API in benchmarks (default: 0).
+            error_every (int): Answer every n-th request with a 503, to exercise retries (default: 0, never).
+        """
+        self.responses = responses
+        self.latency = latency
+        self.error_every = error_every
+        self.requested = []
+        self.lock = threading.Lock()
+        server = self
+
+        class handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                path = path[len('/api/'):] if path.startswith('/api/') else path.lstrip('/')
+                with server.lock:
+                    server.requested.append(path)
+                    failing = server.error_every > 0 and len(server.requested) % server.error_every == 0
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                if failing:
+                    self.send_error(503)
+                    return
+                response = server.responses.get(path)
+                if response is None:
+                    self.send_error(404)
+                    return
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), handler)
+        self.base_url = f'http://{host}:{self.httpd.server_port}/api/'
+        self.thread = None
+
+    def start(self):
+        """
+        Serve requests on a background thread.
+
+        Returns:
+            stand_in_server: The server.
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Local FPL API stand-in")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default='2023-24',
+                        help='Season to synthesize the API of. Format: YYYY-YY e.g 2023-24, default: 2023-24')
+    parser.add_argument('-gameweek', type=int, default=None,
+                        help='Last finished gameweek of the synthesized API, default: the last gameweek played')
+    parser.add_argument('-recording', type=str, default=None,
+                        help='Directory of recorded responses to replay instead of synthesizing, default: None')
+    parser.add_argument('-record',
+                        action=argparse.BooleanOptionalAction, default=False, help='Record -base_url into -recording and exit, default: False')
+    parser.add_argument('-base_url', type=str, default=updater.API_URL,
+                        help=f'API to record from, default: {updater.API_URL}')
+    parser.add_argument('-port', type=int, default=8000,
+                        help='Port to serve on, default: 8000')
+    parser.add_argument('-latency', type=float, default=0,
+                        help='Seconds to delay each response by, default: 0')
+    parser.add_argument('-error_every', type=int, default=0,
+                        help='Answer every n-th request with a 503, default: 0 (never)')
+    inputs = parser.parse_args()
+    if inputs.record and inputs.recording is None:
+        parser.error('-record needs -recording')
+    return inputs
+
+def main():
+    inputs = parse_args()
+    if inputs.record:
+        count = record(inputs.base_url, inputs.recording)
+        print(f'Recorded {count} responses into {inputs.recording}')
+        return
+    responses = load_recording(inputs.recording) if inputs.recording else synthesized_api(inputs.gw_data, inputs.season, inputs.gameweek)
+    server = stand_in_server(responses, port=inputs.port, latency=inputs.latency, error_every=inputs.error_every)
+    print(f'Serving the FPL API stand-in at {server.base_url} (Ctrl+C to stop)')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f'Served {len(server.requested)} requests')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,509 @@
+'''
+Compiled Gameweek Store for FPL Automation Project
+
+Packs every data/<season>/gws/gw{N}.csv into a single typed, columnar .npz file so that
+fpl_data.get_gw_data can slice a gameweek out of memory instead of re-parsing the CSV.
+
+Alongside it a dense (players x 38 gameweeks x fixture slots x stats) float64 tensor is saved as a
+.npy file with a sidecar index (element id --> row, string tables), and opened memory-mapped so
+worker processes share one copy through the page cache. Fixture slots hold double gameweeks.
+
+Build with: python -m fpl_auto.store -season 2021-22
+'''
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from fpl_auto import cache
+
+# Columns kept from each gameweek file (in output order)
+GW_COLUMNS = ['name', 'position', 'team', 'assists', 'bps', 'clean_sheets', 'creativity', 'goals_conceded', 'goals_scored', 'ict_index', 'influence', 'minutes', 'own_goals', 'penalties_missed', 'penalties_saved', 'red_cards', 'saves', 'threat', 'total_points', 'yellow_cards', 'selected', 'was_home', 'value']
+# Columns stored as integer codes into a string table
+STRING_COLUMNS = ['name', 'position', 'team']
+# Compact dtypes get_gw_data emits for each column, instead of pandas' default int64/float64/object
+GW_SCHEMA = {
+    'name': object, 'position': 'category', 'team': 'category',
+    'assists': np.int16, 'bps': np.int16, 'clean_sheets': np.int16, 'creativity': np.float32, 'goals_conceded': np.int16,
+    'goals_scored': np.int16, 'ict_index': np.float32, 'influence': np.float32, 'minutes': np.int16, 'own_goals': np.int16,
+    'penalties_missed': np.int16, 'penalties_saved': np.int16, 'red_cards': np.int16, 'saves': np.int16, 'threat': np.float32,
+    'total_points': np.int16, 'yellow_cards': np.int16, 'selected': np.int32, 'was_home': bool, 'value': np.int16,
+}
+# Stats along the last axis of the gameweek tensor, 'row' is the row's position within its gameweek CSV
+TENSOR_STATS = ['row'] + GW_COLUMNS
+
+def compiled_dir(data_location, season):
+    """
+    Get the directory holding the compiled files for a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The compiled directory for the season.
+    """
+    return f'{data_location}/{season}/compiled'
+
+def gw_store_path(data_location, season):
+    """
+    Get the path of the compiled gameweek store for a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The path of the compiled gameweek store.
+    """
+    return f'{compiled_dir(data_location, season)}/gws.npz'
+
+def read_season_gws(data_location, season):
+    """
+    Parse every gameweek CSV of a season, keeping the get_gw_data columns plus the element id.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        list: (week_num, pandas.DataFrame) pairs, or None if the season has no usable gameweek files.
+    """
+    season_gws = []
+    for week_num in range(1, 39):
+        try:
+            gw_data = pd.read_csv(f'{data_location}/{season}/gws/gw{week_num}.csv')
+        except FileNotFoundError:
+            continue
+        except UnicodeDecodeError:
+            # Older seasons are latin-1 encoded and lack position/team columns, get_gw_data cannot serve them
+            return None
+        if not set(GW_COLUMNS + ['element']).issubset(gw_data.columns):
+            return None
+        season_gws.append((week_num, gw_data[GW_COLUMNS + ['element']]))
+
+    if len(season_gws) == 0:
+        return None
+    return season_gws
+
+def compact_gw(gw_data):
+    """
+    Convert gameweek data to the compact GW_SCHEMA dtypes.
+
+    Args:
+        gw_data (pandas.DataFrame): The game week data (GW_COLUMNS, in any dtypes).
+
+    Returns:
+        pandas.DataFrame: The game week data with categorical team/position, small integer counts and float32 rates.
+    """
+    return gw_data.astype({column: GW_SCHEMA[column] for column in gw_data.columns if column in GW_SCHEMA})
+
+def memory_report(data_location, season):
+    """
+    Compare the memory used by a season's gameweek frames in pandas' default dtypes and in GW_SCHEMA.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        dict: Bytes used by the default and compact frames, or None if the season has no usable gameweek files.
+    """
+    season_gws = read_season_gws(data_location, season)
+    if season_gws is None:
+        return None
+    default_bytes = sum(int(gw_data[GW_COLUMNS].memory_usage(deep=True).sum()) for _, gw_data in season_gws)
+    compact_bytes = sum(int(compact_gw(gw_data[GW_COLUMNS]).memory_usage(deep=True).sum()) for _, gw_data in season_gws)
+    return {'weeks': len(season_gws), 'default_bytes': default_bytes, 'compact_bytes': compact_bytes}
+
+def build_gw_store(data_location, season, season_gws=None):
+    """
+    Compile every gameweek CSV of a season into one columnar .npz file.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        season_gws (list): Already parsed gameweeks from read_season_gws (default: None, parse them).
+
+    Returns:
+        str: The path of the written store, or None if the season has no usable gameweek files.
+    """
+    if season_gws is None:
+        season_gws = read_season_gws(data_location, season)
+    if season_gws is None:
+        return None
+
+    frames = []
+    weeks = []
+    offsets = [0]
+    for week_num, gw_data in season_gws:
+        gw_data = gw_data[GW_COLUMNS]
+        weeks.append(week_num)
+        offsets.append(offsets[-1] + len(gw_data))
+        # Empty gameweeks (e.g. 2022-23 GW7) only need their offset recorded
+        if len(gw_data) > 0:
+            frames.append(gw_data)
+
+    if len(frames) == 0:
+        return None
+
+    all_gws = pd.concat(frames, ignore_index=True)
+    arrays = {'weeks': np.array(weeks, dtype=np.int16), 'offsets': np.array(offsets, dtype=np.int64)}
+    for column in GW_COLUMNS:
+        if column in STRING_COLUMNS:
+            strings, codes = np.unique(all_gws[column].astype(str).to_numpy(), return_inverse=True)
+            arrays[f'{column}_codes'] = codes.astype(np.int32)
+            arrays[f'{column}_strings'] = strings.astype(str)
+        else:
+            arrays[column] = all_gws[column].to_numpy()
+
+    path = gw_store_path(data_location, season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **arrays)
+    # Tables already loaded in this process are now stale
+    cache.shared_cache.invalidate(data_location, season)
+    return path
+
+class gw_store:
+    def __init__(self, path):
+        """
+        Load a compiled gameweek store into memory.
+
+        Args:
+            path (str): The path of the compiled gameweek store.
+        """
+        with np.load(path, allow_pickle=False) as store:
+            self.weeks = store['weeks']
+            self.offsets = store['offsets']
+            self.columns = {}
+            for column in GW_COLUMNS:
+                if column in STRING_COLUMNS:
+                    strings = store[f'{column}_strings'].astype(object)
+                    self.columns[column] = strings[store[f'{column}_codes']]
+                else:
+                    self.columns[column] = store[column]
+        self.week_to_slot = {int(week): i for i, week in enumerate(self.weeks)}
+
+    def has_gw(self, week_num):
+        """
+        Check whether a gameweek is present in the store.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek is present.
+        """
+        return week_num in self.week_to_slot
+
+    def get_gw(self, week_num):
+        """
+        Slice one gameweek out of the store.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            pandas.DataFrame: The game week data (same columns as the CSV path), or None if the gameweek is not stored.
+        """
+        if week_num not in self.week_to_slot:
+            return None
+        slot = self.week_to_slot[week_num]
+        start, end = self.offsets[slot], self.offsets[slot + 1]
+        return pd.DataFrame({column: self.columns[column][start:end] for column in GW_COLUMNS})
+
+def load_gw_store(data_location, season):
+    """
+    Load the compiled gameweek store for a season if it has been built.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        gw_store: The compiled store, or None if it has not been built.
+    """
+    path = gw_store_path(data_location, season)
+    if not os.path.exists(path):
+        return None
+    return gw_store(path)
+
+def gw_tensor_paths(data_location, season):
+    """
+    Get the paths of the gameweek tensor and its index for a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        tuple: The tensor (.npy) path and the index (.npz) path.
+    """
+    directory = compiled_dir(data_location, season)
+    return f'{directory}/gw_tensor.npy', f'{directory}/gw_tensor_index.npz'
+
+def build_gw_tensor(data_location, season, season_gws=None):
+    """
+    Compile every gameweek CSV of a season into a dense player x gameweek x slot x stat tensor.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        season_gws (list): Already parsed gameweeks from read_season_gws (default: None, parse them).
+
+    Returns:
+        str: The path of the written tensor, or None if the season has no usable gameweek files.
+    """
+    if season_gws is None:
+        season_gws = read_season_gws(data_location, season)
+    if season_gws is None:
+        return None
+
+    frames = []
+    for week_num, gw_data in season_gws:
+        if len(gw_data) > 0:
+            frames.append(gw_data.assign(gw=week_num, row=np.arange(len(gw_data))))
+    all_gws = pd.concat(frames, ignore_index=True)
+
+    elements = np.unique(all_gws['element'].to_numpy())
+    players = np.searchsorted(elements, all_gws['element'].to_numpy())
+    weeks = all_gws['gw'].to_numpy() - 1
+    slots = all_gws.groupby(['element', 'gw']).cumcount().to_numpy()
+
+    tensor = np.full((len(elements), 38, slots.max() + 1, len(TENSOR_STATS)), np.nan)
+    index = {'elements': elements, 'stats': np.array(TENSOR_STATS), 'weeks': np.array([week_num for week_num, _ in season_gws], dtype=np.int16)}
+    dtypes = []
+    for i, stat in enumerate(TENSOR_STATS):
+        if stat in STRING_COLUMNS:
+            strings, codes = np.unique(all_gws[stat].astype(str).to_numpy(), return_inverse=True)
+            index[f'{stat}_strings'] = strings.astype(str)
+            values = codes
+            dtypes.append('int64')
+        else:
+            values = all_gws[stat].to_numpy()
+            dtypes.append(str(values.dtype))
+        tensor[players, weeks, slots, i] = values.astype(np.float64)
+    index['dtypes'] = np.array(dtypes)
+
+    # Every (name, player row) pair, names can change mid-season and be shared by two players
+    name_codes = tensor[..., TENSOR_STATS.index('name')]
+    pairs = np.unique(np.column_stack((name_codes[~np.isnan(name_codes)], np.nonzero(~np.isnan(name_codes))[0])).astype(np.int64), axis=0)
+    index['name_pairs'] = pairs
+
+    tensor_path, index_path = gw_tensor_paths(data_location, season)
+    os.makedirs(os.path.dirname(tensor_path), exist_ok=True)
+    np.save(tensor_path, tensor)
+    np.savez(index_path, **index)
+    cache.shared_cache.invalidate(data_location, season)
+    return tensor_path
+
+class gw_tensor:
+    def __init__(self, tensor_path, index_path):
+        """
+        Open a compiled gameweek tensor (memory-mapped, read only).
+
+        Args:
+            tensor_path (str): The path of the tensor (.npy).
+            index_path (str): The path of the tensor index (.npz).
+        """
+        self.tensor = np.load(tensor_path, mmap_mode='r')
+        with np.load(index_path, allow_pickle=False) as index:
+            self.elements = index['elements']
+            self.stats = index['stats'].tolist()
+            self.dtypes = index['dtypes'].tolist()
+            self.weeks = set(index['weeks'].tolist())
+            self.strings = {column: index[f'{column}_strings'].astype(object) for column in STRING_COLUMNS}
+            name_pairs = index['name_pairs']
+        self.stat_index = {stat: i for i, stat in enumerate(self.stats)}
+        self.element_to_row = {int(element): i for i, element in enumerate(self.elements)}
+        self.name_to_code = {name: i for i, name in enumerate(self.strings['name'])}
+        self.position_to_code = {position: i for i, position in enumerate(self.strings['position'])}
+        self.name_to_rows = {}
+        for code, player_row in name_pairs:
+            self.name_to_rows.setdefault(self.strings['name'][code], []).append(player_row)
+
+    def player_row(self, element):
+        """
+        Get the tensor row of a player.
+
+        Args:
+            element (int): The player's element id.
+
+        Returns:
+            int: The row of the player, or None if the player never appears in the season.
+        """
+        return self.element_to_row.get(element)
+
+    def has_gw(self, week_num):
+        """
+        Check whether a gameweek is present in the tensor.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek is present.
+        """
+        return week_num in self.weeks
+
+    def gw_entries(self, week_num):
+        """
+        Get the filled (player row, slot) entries of a gameweek in CSV order.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            tuple: Arrays of player rows and slots.
+        """
+        rows = np.asarray(self.tensor[:, week_num - 1, :, self.stat_index['row']])
+        players, slots = np.nonzero(~np.isnan(rows))
+        order = np.argsort(rows[players, slots], kind='stable')
+        return players[order], slots[order]
+
+    def column(self, values, stat):
+        """
+        Convert a slice of one stat back to its original column type.
+
+        Args:
+            values (numpy.ndarray): The float values of the stat.
+            stat (str): The stat name.
+
+        Returns:
+            numpy.ndarray: The values with their original dtype (strings for string columns).
+        """
+        if stat in STRING_COLUMNS:
+            return self.strings[stat][values.astype(np.int64)]
+        return values.astype(self.dtypes[self.stat_index[stat]])
+
+    def get_gw(self, week_num, position=None):
+        """
+        Slice one gameweek (optionally one position) out of the tensor.
+
+        Args:
+            week_num (int): The week number.
+            position (str): Only return players in this position (default: None, all players).
+
+        Returns:
+            pandas.DataFrame: The game week data (same columns and order as the CSV path), or None if the gameweek is not stored.
+        """
+        if not self.has_gw(week_num):
+            return None
+        players, slots = self.gw_entries(week_num)
+        values = self.tensor[players, week_num - 1, slots, :]
+        if position is not None:
+            values = values[values[:, self.stat_index['position']] == self.position_to_code.get(position, -1)]
+        return pd.DataFrame({column: self.column(values[:, self.stat_index[column]], column) for column in GW_COLUMNS})
+
+    def last_value(self, week_num, name, stat):
+        """
+        Get a stat of a player in a gameweek, from their last row if they played twice (matching DataFrame.to_dict).
+
+        Args:
+            week_num (int): The week number.
+            name (str): The player name.
+            stat (str): The stat name.
+
+        Returns:
+            float: The stat value, or None if the player has no row in the gameweek.
+        """
+        if name not in self.name_to_rows:
+            return None
+        entries = self.tensor[self.name_to_rows[name], week_num - 1]
+        entries = entries[entries[..., self.stat_index['name']] == self.name_to_code[name]]
+        if len(entries) == 0:
+            return None
+        return entries[np.argmax(entries[:, self.stat_index['row']]), self.stat_index[stat]]
+
+    def stat_dict(self, week_num, stat):
+        """
+        Get a name --> stat dictionary for a gameweek (last row wins, matching DataFrame.to_dict).
+
+        Args:
+            week_num (int): The week number.
+            stat (str): The stat name.
+
+        Returns:
+            dict: The stat value of each player.
+        """
+        players, slots = self.gw_entries(week_num)
+        values = self.tensor[players, week_num - 1, slots, :]
+        names = self.column(values[:, self.stat_index['name']], 'name')
+        return dict(zip(names, self.column(values[:, self.stat_index[stat]], stat).tolist()))
+
+    def didnt_play(self, week_num):
+        """
+        Get the players with a zero-minute row in a gameweek, in CSV order.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            list: The player names.
+        """
+        players, slots = self.gw_entries(week_num)
+        values = self.tensor[players, week_num - 1, slots, :]
+        values = values[values[:, self.stat_index['minutes']] == 0]
+        return list(dict.fromkeys(self.column(values[:, self.stat_index['name']], 'name')))
+
+def load_gw_tensor(data_location, season):
+    """
+    Open the compiled gameweek tensor for a season if it has been built.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        gw_tensor: The memory-mapped tensor, or None if it has not been built.
+    """
+    tensor_path, index_path = gw_tensor_paths(data_location, season)
+    if not os.path.exists(tensor_path) or not os.path.exists(index_path):
+        return None
+    return gw_tensor(tensor_path, index_path)
+
+def list_seasons(data_location):
+    """
+    List the seasons present in the data directory.
+
+    Args:
+        data_location (str): The location of the data.
+
+    Returns:
+        list: The season names, sorted.
+    """
+    return sorted(s for s in os.listdir(data_location) if os.path.isdir(f'{data_location}/{s}') and len(s) == 7 and s[4] == '-')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Compile gameweek store")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default=None,
+                        help='Season to compile. Format: YYYY-YY e.g 2021-22, default: every season in the dataset')
+    parser.add_argument('-memory_report',
+                        action=argparse.BooleanOptionalAction, default=False, help='Only report the memory used by default vs compact gameweek frames, default: False')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    seasons = [inputs.season] if inputs.season else list_seasons(inputs.gw_data)
+    for season in seasons:
+        if inputs.memory_report:
+            report = memory_report(inputs.gw_data, season)
+            if report is None:
+                print(f'{season}: skipped (no compatible gameweek files)')
+            else:
+                print(f"{season}: {report['weeks']} weeks, default {report['default_bytes'] / 2**20:.2f} MiB, compact {report['compact_bytes'] / 2**20:.2f} MiB ({report['compact_bytes'] / report['default_bytes']:.0%})")
+            continue
+        start = time.time()
+        season_gws = read_season_gws(inputs.gw_data, season)
+        path = build_gw_store(inputs.gw_data, season, season_gws)
+        if path is not None:
+            build_gw_tensor(inputs.gw_data, season, season_gws)
+        if path is None:
+            print(f'{season}: skipped (no compatible gameweek files)')
+        else:
+            print(f'{season}: wrote {compiled_dir(inputs.gw_data, season)} in {time.time() - start:.2f}s')
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
+import numpy as np
 import pandas as pd
-import fpl_auto.data as fpl
+from fpl_auto.context import season_context, NO_CLUB
+from fpl_auto import names
 
 class team:
-    def __init__(self, season, gameweek=1, budget=100.0, transfers_left=0, players=[[], [], [], [], []], chips_used=[], transfer_history=[], triple_captain_available=True, bench_boost_available=True, free_hit_available=True, wildcard_available=True, free_hit_team=None):
+    def __init__(self, season, gameweek=1, budget=100.0, transfers_left=0, players=[[], [], [], [], []], chips_used=[], transfer_history=[], triple_captain_available=True, bench_boost_available=True, free_hit_available=True, wildcard_available=True, free_hit_team=None, context=None):
         """
         Initializes a team object.
 
@@ -15,20 +17,25 @@ class team:
             - mids (list): List of midfielders in the team (default: []).
             - fwds (list): List of forwards in the team (default: []).
             - subs (list): List of substitutes in the team (default: []).
+            Players may be given by name or by player id; the team holds them as ids.
+            - context (season_context): Season data shared between gameweeks (default: None, builds a new one).
 
         Returns:
             - None
         """
-                
-        self.fpl = fpl.fpl_data('data', season)
+        if context is None:
+            context = season_context(season)
+        self.context = context
+        self.fpl = context.fpl
         self.season = season
         self.gameweek = gameweek
         self.budget = budget
-        self.gks = players[0]
-        self.defs = players[1]
-        self.mids = players[2]
-        self.fwds = players[3]
-        self.subs = players[4]
+        self.player_ids = context.player_ids
+        self.gks = [self.player_id(player) for player in players[0]]
+        self.defs = [self.player_id(player) for player in players[1]]
+        self.mids = [self.player_id(player) for player in players[2]]
+        self.fwds = [self.player_id(player) for player in players[3]]
+        self.subs = [[self.player_id(sub[0]), sub[1]] for sub in players[4]]
         self.free_hit_team = free_hit_team
 
         self.transfers_left = min(transfers_left, 2)
@@ -42,68 +49,100 @@ class team:
         self.chip_free_hit_active = False
         self.chip_wildcard_available = wildcard_available
 
-        self.gw_data = self.fpl.get_gw_data(self.season, self.gameweek)
+        self.gw_data = context.get_gw_data(self.gameweek)
 
         if self.chip_wildcard_available is False and self.gameweek == 19:
             print('============== Wildcard Returned! ==============\n')
             self.chip_wildcard_available = True
         
         self.positions = ['GK', 'DEF', 'MID', 'FWD']
-        self.gk_xp = pd.read_csv(f'predictions/{season}/GW{self.gameweek}/GK.tsv', sep='\t')
-        self.def_xp = pd.read_csv(f'predictions/{season}/GW{self.gameweek}/DEF.tsv', sep='\t')
-        self.mid_xp = pd.read_csv(f'predictions/{season}/GW{self.gameweek}/MID.tsv', sep='\t')
-        self.fwd_xp = pd.read_csv(f'predictions/{season}/GW{self.gameweek}/FWD.tsv', sep='\t')
+        self.gk_xp, self.def_xp, self.mid_xp, self.fwd_xp = context.get_predictions(self.gameweek)
         self.combined_xp = [self.gk_xp, self.def_xp, self.mid_xp, self.fwd_xp]
         
         self.all_xp = self.get_n_gws_xp(5, discount_factor=0.8)
+        self.all_xp_dicts = context.get_n_gws_xp_dicts(self.gameweek, 5, 0.8)
         
-        self.player_list = self.fpl.player_list
-        self.gk_player_list = self.generate_player_list('GK')
-        self.def_player_list = self.generate_player_list('DEF')
-        self.mid_player_list = self.generate_player_list('MID')
-        self.fwd_player_list = self.generate_player_list('FWD')
-
-        self.gk_xp_dict = dict(zip(self.gk_xp.Name, self.gk_xp.xP))
-        self.def_xp_dict = dict(zip(self.def_xp.Name, self.def_xp.xP))
-        self.mid_xp_dict = dict(zip(self.mid_xp.Name, self.mid_xp.xP))
-        self.fwd_xp_dict = dict(zip(self.fwd_xp.Name, self.fwd_xp.xP))
+        self.player_list = context.player_id_list
+        self.gk_player_list = context.get_player_list('GK')
+        self.def_player_list = context.get_player_list('DEF')
+        self.mid_player_list = context.get_player_list('MID')
+        self.fwd_player_list = context.get_player_list('FWD')
+
+        self.gk_xp_dict, self.def_xp_dict, self.mid_xp_dict, self.fwd_xp_dict = context.get_xp_dicts(self.gameweek)
         self.player_xp_list = self.gk_xp.xP.tolist() + self.def_xp.xP.tolist() + self.mid_xp.xP.tolist() + self.fwd_xp.xP.tolist()
         
-        self.prev_pos_list = self.fpl.position_dict(self.gameweek - 1)
+        self.prev_pos_list = context.position_dict(self.gameweek - 1)
 
-        self.captain = ''
-        self.vice_captain = ''
+        self.captain = None
+        self.vice_captain = None
 
-        try:
-            self.recent_gw = self.fpl.get_recent_gw() - 1 #is this correct? won't this return gw-2?
-        except:
-            self.recent_gw = 38 # if gw = 1, recent_gw = 0 ==> set recent_gw=38
+        self.recent_gw = context.recent_gw #is this correct? won't this return gw-2?
         if self.gameweek >= self.recent_gw and self.season == '2023-24':
-            self.positions_list = self.fpl.position_dict(self.recent_gw) #generate league position
-            self.points_scored = self.fpl.actual_points_dict(season, self.recent_gw - 1)
+            self.positions_list = context.position_dict(self.recent_gw) #generate league position
+            self.points_scored = context.actual_points_dict(self.recent_gw - 1)
         elif self.gameweek == 8 and self.season == '2023-24': 
-            self.positions_list = self.fpl.position_dict(self.gameweek)
-            self.points_scored = self.fpl.actual_points_dict(season, gameweek)
+            self.positions_list = context.position_dict(self.gameweek)
+            self.points_scored = context.actual_points_dict(gameweek)
         else:
-            self.positions_list = self.fpl.position_dict(self.gameweek - 1)
-            self.points_scored = self.fpl.actual_points_dict(season, gameweek - 1)
+            self.positions_list = context.position_dict(self.gameweek - 1)
+            self.points_scored = context.actual_points_dict(gameweek - 1)
         
+        self.clubs = context.club_dict(self.gameweek)
+        self.club_codes, self.club_names = context.club_codes(self.gameweek)
+        self.count_clubs()
+
         # Optional stop list for players
         self.player_stop_list = []
 
         if self.free_hit_team is not None and self.free_hit_team[2] == self.gameweek - 1: 
             self.load_free_hit_team()
 
+    def player_id(self, player):
+        """
+        Returns the id of a player, interning names seen for the first time.
+        A name the season's data does not use (e.g. without accents) is resolved to the player's name in the season.
+
+        Parameters:
+            - player (str or int): The name or id of the player.
+
+        Returns:
+            - int: The id of the player (None stays None).
+        """
+        if player is None or isinstance(player, (int, np.integer)):
+            return player
+        player_id = self.player_ids.lookup(player)
+        if player_id is None:
+            player_id = self.player_ids.intern(self.fpl.get_name_index().resolve(player, self.season) or player)
+        return player_id
+
+    def player_name(self, player):
+        """
+        Returns the name of a player, for display and export.
+
+        Parameters:
+            - player (int): The id of the player.
+
+        Returns:
+            - str: The name of the player ('' for None).
+        """
+        if player is None:
+            return ''
+        return self.player_ids.name(player)
+
     def check_violate_club_rule(self, player, club_counts=None):
         """
         Checks if adding a player would violate the club rule.
         
         Parameters:
             - player (str): The name of the player.
-            - club_counts (dict): A dictionary containing the number of players from each club in the team (default: None)."""
-        player_club = self.fpl.get_player_team(player, self.gameweek, self.gw_data)
+            - club_counts (dict): A dictionary containing the number of players from each club in the team (default: None, the team's club counts)."""
+        player = self.player_id(player)
+        player_club = self.clubs.get(player)
         if club_counts is None:
-            club_counts = self.get_club_counts(self.gw_data)
+            # Players without a club, or with several rows (a Series of clubs), never violate the rule
+            if player_club is None or isinstance(player_club, pd.Series):
+                return False
+            return self.club_counts[self.club_code(player)] + 1 > 3
         try:
             if player_club not in club_counts:
                 club_counts[player_club] = 0
@@ -126,6 +165,7 @@ class team:
             - None
         """
         force = False
+        player = self.player_id(player)
         if self.transfer_in_allowed(player, position, custom_price) or force and self.squad_size() < 15:
             #print('Adding', player, 'to', position)
             if custom_price == None:
@@ -139,6 +179,7 @@ class team:
             position_list = getattr(self, position.lower() + 's')
 
             position_list.append(player)
+            self.club_counts[self.club_code(player)] += 1
             self.budget -= p_cost        
 
     def transfer_in_allowed(self, player, position='none', custom_price=None):
@@ -152,6 +193,7 @@ class team:
         Returns:
             - bool: True if the transfer in is allowed, False otherwise.
         """
+        player = self.player_id(player)
         if custom_price == None:
             p_cost = self.player_value(player, self.gw_data)
         else:
@@ -162,7 +204,8 @@ class team:
 
         position_list = getattr(self, position.lower() + 's')
         
-        if player in self.player_stop_list:
+        # The stop list may hold names or ids
+        if player in {self.player_id(stopped) for stopped in self.player_stop_list}:
             #print(f'FAILED (player on stoplist) {player} to {position} for {p_cost}, Budget {self.budget} {self.squad_size()} players in squad')
             return False
         
@@ -170,16 +213,10 @@ class team:
             #print(f'FAILED (invalid pos {position}) {player} to {position} for {p_cost}, Budget {self.budget} {self.squad_size()} players in squad')
             return False
         
-        player_club = str(self.fpl.get_player_team(player, self.gameweek, self.gw_data))  # Convert player_club to a string
-        club_counts = self.get_club_counts(self.gw_data)
+        player_club = self.club_code(player)
         
-        # Add 1 to the count of the player's club
-        if player_club not in club_counts:
-            club_counts[player_club] = 0
-
-        club_counts[player_club] += 1
-        # Check if the count is greater than 3
-        if club_counts[player_club] > 3 and player_club != 'None':
+        # Check if adding the player takes their club's count over 3
+        if self.club_counts[player_club] + 1 > 3 and player_club != NO_CLUB:
             # Cannot add {player}, {player_club} has 3 players already
             #print(f'FAILED (club count > 3) {player} to {position} for {p_cost}, Budget {self.budget} {self.squad_size()} players in squad')
             return False
@@ -276,6 +313,7 @@ class team:
         Returns:
             - None
         """
+        player = self.player_id(player)
         self.return_subs_to_team()
         if position == 'GK':
             self.gks.remove(player)
@@ -291,11 +329,13 @@ class team:
             self.budget += self.player_value(player, self.gw_data)
         else:
             print('Invalid position')
+            return
+        self.club_counts[self.club_code(player)] -= 1
 
         #print(f'Removed {player} from {position}, {self.squad_size()} players in squad')
     def add_sub(self, player, position):
         """
-        Removes a player from the team without affecting the budget
+        Removes a player from the team without affecting the budget (or the club counts, subs are still in the squad)
 
         Parameters:
             - player (str): The name of the player.
@@ -317,7 +357,7 @@ class team:
 
     def remove_sub(self, player, position):
         """
-        Removes a substitute player from the team.
+        Removes a substitute player from the team (the club counts are unchanged, the player stays in the squad).
 
         Parameters:
         - player (str): The name of the player.
@@ -338,12 +378,12 @@ class team:
         """
         Displays the current team lineup.
         """
-        print(f'GK: {self.gks}')
-        print(f'DEF: {self.defs}')
-        print(f'MID: {self.mids}')
-        print(f'FWD: {self.fwds}')
-        print(f'SUBS: {self.subs}')
-        print(f'C: {self.captain}, VC: {self.vice_captain}')
+        print(f'GK: {self.player_ids.names_of(self.gks)}')
+        print(f'DEF: {self.player_ids.names_of(self.defs)}')
+        print(f'MID: {self.player_ids.names_of(self.mids)}')
+        print(f'FWD: {self.player_ids.names_of(self.fwds)}')
+        print(f'SUBS: {[[self.player_name(sub[0]), sub[1]] for sub in self.subs]}')
+        print(f'C: {self.player_name(self.captain)}, VC: {self.player_name(self.vice_captain)}')
         print(f'Budget: {self.budget:.1f}\n')
 
     def get_team(self):
@@ -438,7 +478,7 @@ class team:
         Suggests the substitutions to be made in the team.
 
         Returns:
-            - list: A list of suggested substitutions, each containing the name of the player and their position.
+            - list: A list of suggested substitutions, each containing the id of the player and their position.
         """
         if self.squad_size() != 15:
             print(f'Error: Squad has not been filled up (Size {self.squad_size()})')
@@ -492,7 +532,7 @@ class team:
         Makes the substitutions in the team.
 
         Parameters:
-            - subs (list): A list of substitutions, each containing the name of the player and their position.
+            - subs (list): A list of substitutions, each containing the id of the player and their position.
 
         Returns:
             - None
@@ -525,11 +565,11 @@ class team:
         Returns:
             - float: The expected points for the player.
         """
+        player = self.player_id(player)
         if position == None:
             position = self.player_pos(player)
 
-        xp_dict = self.all_xp[self.pos_to_num(position)]
-        xp_dict = dict(zip(xp_dict.Name, xp_dict.xP))
+        xp_dict = self.all_xp_dicts[self.pos_to_num(position)]
         
         # return xP for player
         if player in xp_dict:
@@ -546,7 +586,7 @@ class team:
             - include_subs (bool): Whether to include the expected points for substitutes (default: False).
 
         Returns:
-            - list: A list of player names and their expected points.
+            - list: A list of player ids and their expected points.
         """
         # List of players and their xP
         team_xp = []
@@ -586,7 +626,7 @@ class team:
             - include_subs (bool): Whether to include the expected points for substitutes (default: False).
 
         Returns:
-            - list: A list of player names and their expected points.
+            - list: A list of player ids and their expected points.
         """
         # List of players and their p
         team_p = []
@@ -686,14 +726,14 @@ class team:
             if len(getattr(self, position.lower() + 's')) > self.get_max_players(position):
                 # Find the player with the lowest xP in that position
                 min_xp = 100
-                min_player = ''
+                min_player = None
                 for player in getattr(self, position.lower() + 's'):
                     if self.player_xp(player, position) < min_xp:
                         min_xp = self.player_p(player, position)
                         min_player = player
                 # Remove the player
                 self.remove_player(min_player, position)
-                print(f'Removed {min_player} from {position}', end='\r')
+                print(f'Removed {self.player_name(min_player)} from {position}', end='\r')
             
     def player_p(self, player, position):
         """
@@ -706,6 +746,7 @@ class team:
         Returns:
             - int: The actual points scored by the player.
         """
+        player = self.player_id(player)
         if player in self.points_scored:
             captain_played = self.captain_played()
             # Captain played and triple active
@@ -798,35 +839,35 @@ class team:
         captain_played = self.captain_played()
         for player in self.gks:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'GK', self.player_p(player, 'GK')])
+                p_list.append([f'(C) {self.player_name(player)}', 'GK', self.player_p(player, 'GK')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'GK', self.player_p(player, 'GK')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'GK', self.player_p(player, 'GK')])
             else:
-                p_list.append([player, 'GK', self.player_p(player, 'GK')])
+                p_list.append([self.player_name(player), 'GK', self.player_p(player, 'GK')])
         for player in self.defs:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'DEF', self.player_p(player, 'DEF')])
+                p_list.append([f'(C) {self.player_name(player)}', 'DEF', self.player_p(player, 'DEF')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'DEF', self.player_p(player, 'DEF')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'DEF', self.player_p(player, 'DEF')])
             else:
-                p_list.append([player, 'DEF', self.player_p(player, 'DEF')])
+                p_list.append([self.player_name(player), 'DEF', self.player_p(player, 'DEF')])
         for player in self.mids:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'MID', self.player_p(player, 'MID')])
+                p_list.append([f'(C) {self.player_name(player)}', 'MID', self.player_p(player, 'MID')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'MID', self.player_p(player, 'MID')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'MID', self.player_p(player, 'MID')])
             else:
-                p_list.append([player, 'MID', self.player_p(player, 'MID')])
+                p_list.append([self.player_name(player), 'MID', self.player_p(player, 'MID')])
         for player in self.fwds:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'FWD', self.player_p(player, 'FWD')])
+                p_list.append([f'(C) {self.player_name(player)}', 'FWD', self.player_p(player, 'FWD')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'FWD', self.player_p(player, 'FWD')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'FWD', self.player_p(player, 'FWD')])
             else:
-                p_list.append([player, 'FWD', self.player_p(player, 'FWD')])
+                p_list.append([self.player_name(player), 'FWD', self.player_p(player, 'FWD')])
         if include_subs:
             for player in self.subs:
-                p_list.append([player[0], player[1], self.player_p(player[0], player[1])])
+                p_list.append([self.player_name(player[0]), player[1], self.player_p(player[0], player[1])])
 
         return p_list
     
@@ -841,24 +882,24 @@ class team:
         self.auto_subs()
         for player in self.gks:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'GK', self.player_xp(player, 'GK') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'GK', self.player_xp(player, 'GK') * 2])
             else:
-                xp_list.append([player, 'GK', self.player_xp(player, 'GK')])
+                xp_list.append([self.player_name(player), 'GK', self.player_xp(player, 'GK')])
         for player in self.defs:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'DEF', self.player_xp(player, 'DEF') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'DEF', self.player_xp(player, 'DEF') * 2])
             else:
-                xp_list.append([player, 'DEF', self.player_xp(player, 'DEF')])
+                xp_list.append([self.player_name(player), 'DEF', self.player_xp(player, 'DEF')])
         for player in self.mids:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'MID', self.player_xp(player, 'MID') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'MID', self.player_xp(player, 'MID') * 2])
             else:
-                xp_list.append([player, 'MID', self.player_xp(player, 'MID')])
+                xp_list.append([self.player_name(player), 'MID', self.player_xp(player, 'MID')])
         for player in self.fwds:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'FWD', self.player_xp(player, 'FWD') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'FWD', self.player_xp(player, 'FWD') * 2])
             else:
-                xp_list.append([player, 'FWD', self.player_xp(player, 'FWD')])
+                xp_list.append([self.player_name(player), 'FWD', self.player_xp(player, 'FWD')])
 
         return xp_list
     
@@ -884,7 +925,8 @@ class team:
         Returns:
             - int: The price of the player.
         """
-        value = self.fpl.get_price(self.gameweek, player, gw_data)
+        # Prices are looked up by name, the id is only converted here
+        value = self.fpl.get_price(self.gameweek, self.player_name(self.player_id(player)), gw_data)
         return value
         
     
@@ -898,12 +940,13 @@ class team:
         Returns:
             - str: The position of the player.
         """
+        player = self.player_id(player)
         # Get position for player
         if player in self.positions_list:
             return self.positions_list[player]
         elif player in self.prev_pos_list:
             return self.prev_pos_list[player]
-        next_pos_list = self.fpl.position_dict(self.gameweek)
+        next_pos_list = self.context.position_dict(self.gameweek)
         if player in next_pos_list:
             return next_pos_list[player]
     
@@ -929,8 +972,8 @@ class team:
             - captain (str): The name of the captain.
             - vice_captain (str): The name of the vice-captain.
         """
-        self.captain = captain
-        self.vice_captain = vice_captain
+        self.captain = self.player_id(captain)
+        self.vice_captain = self.player_id(vice_captain)
     
     def auto_captain(self):
         """
@@ -944,7 +987,7 @@ class team:
         Suggests a player to transfer out of the team.
 
         Returns:
-            - str: The name of the player to transfer out.
+            - int: The id of the player to transfer out.
             - str: The position of the player to transfer out.
             - int: The price of the player to transfer out.
         """
@@ -956,7 +999,7 @@ class team:
         for potential_player in xp_list:
             target_name = potential_player[0]
             target_pos = self.player_pos(target_name)
-            target_budget = self.fpl.get_price(self.gameweek, target_name, self.gw_data)
+            target_budget = self.player_value(target_name, self.gw_data)
             if target_pos != None and target_budget != None and target_budget != None:
                 return target_name, target_pos, target_budget
             
@@ -973,59 +1016,36 @@ class team:
             - budget (int): The budget available for the transfer.
 
         Returns:
-            - str: The name of the player to transfer in.
+            - int: The id of the player to transfer in, or None if no player is found.
         """
-        player_xp_list = self.all_xp[self.pos_to_num(position)]
-        
-        # sort the pandas dataframe by xp
-        player_xp_list = player_xp_list.sort_values(by='xP', ascending=False)
-        player_xp_list = player_xp_list.values.tolist()
-        
-        # Remove all players with xP less than 3
-        player_xp_list = [player for player in player_xp_list if player[1] >= 3]
+        out_player = self.player_id(out_player)
+        index = self.get_xp_index(position, self.gameweek)
         out_xp = self.player_xp(out_player, position)
 
-        for player in player_xp_list:
-            p_cost = self.player_value(player[0], self.gw_data)
-            p_xp = player[1]
-            xp_gain = p_xp - out_xp
-            
-            if xp_gain < 2 or p_cost is None or self.player_in_squad(player):
-                continue
-
-            #print(f'Considering - {player[0]} {position}, xP Gain: {xp_gain}, Budget - Cost: {budget - p_cost}, Player in squad: {self.player_in_squad(player)}, Violate club rule: {self.check_violate_club_rule(player[0])}')
+        # Players with at least 3 xP that fit the budget, best first, who gain at least 2 xP
+        ranks = index.affordable(budget, min_xp=3)
+        ranks = ranks[index.xp[ranks] - out_xp >= 2]
 
-            if player == out_player:
-                #print(f'Player {player[0]} is the same as the player being transferred out')
+        for player in index.ids[ranks].tolist():
+            if player == out_player or self.player_in_squad(player) or self.check_violate_club_rule(player):
                 continue
-
-            if xp_gain >= 2 and p_cost is not None and p_cost <= budget and not self.player_in_squad(player) and not self.check_violate_club_rule(player[0]):
-                #print(f'Allowed? {self.transfer_in_allowed(player[0])} for Player {player}')
-                if self.transfer_in_allowed(player[0]):
-                    return player[0]
+            if self.transfer_in_allowed(player):
+                return player
                 
-        return 'No player found to transfer in'
+        return None
     
     def player_in_squad(self, player):
         """
         Checks if a player is already in the team.
 
         Parameters:
-            - player (str): The name of the player.
+            - player (str or int): The name or id of the player.
 
         Returns:
             - bool: True if the player is in the team, False otherwise.
         """
-        if player[0] in self.gks:
-            return True
-        elif player[0] in self.defs:
-            return True
-        elif player[0] in self.mids:
-            return True
-        elif player[0] in self.fwds:
-            return True
-        else:
-            return False
+        player = self.player_id(player)
+        return player in self.gks or player in self.defs or player in self.mids or player in self.fwds
         
     def transfer(self, transfer_out, transfer_in, position, threshold=4):
         """
@@ -1037,6 +1057,8 @@ class team:
             - position (str): The position of the players ('GK', 'DEF', 'MID', 'FWD').
             - threshold (int): The minimum improvement in xP required for the transfer (default: 4).
         """
+        transfer_out = self.player_id(transfer_out)
+        transfer_in = self.player_id(transfer_in)
         try:
             out_xp = self.player_xp(transfer_out, position)
             in_xp = self.player_xp(transfer_in, position)
@@ -1053,9 +1075,10 @@ class team:
                 elif self.squad_size() == 16:
                     self.remove_player(transfer_in, position)
                 else:
-                    print(f'TRANSFER: OUT {transfer_out} {position} --> IN {transfer_in} {position} | xP Gain: {xp_gain:.2f}\n')
+                    out_name, in_name = self.player_name(transfer_out), self.player_name(transfer_in)
+                    print(f'TRANSFER: OUT {out_name} {position} --> IN {in_name} {position} | xP Gain: {xp_gain:.2f}\n')
                     self.transfers_left -= 1
-                    self.transfer_history.append([self.gameweek, [transfer_out, transfer_in], round(xp_gain, 2)])
+                    self.transfer_history.append([self.gameweek, [out_name, in_name], round(xp_gain, 2)])
         except ValueError:
             pass
         
@@ -1113,32 +1136,15 @@ class team:
         """
         Swaps players who didn't play with substitutes in the team.
         """
-        # Get players who didn't play
-        players_who_didnt_play = self.fpl.get_players_who_didnt_play(self.gameweek)
-
-        # Get a list of players on the team who didnt play
-        gks_who_didnt_play = []
-        defs_who_didnt_play = []
-        mids_who_didnt_play = []
-        fwds_who_didnt_play = []
-        subs_who_didnt_play = []
-        
-        # get list of subs names
-        sub_list = []
-        for sub in self.subs:
-            sub_list.append(sub[0])
-
-        for player in players_who_didnt_play:
-            if player in self.gks:
-                gks_who_didnt_play.append(player)
-            elif player in self.defs:
-                defs_who_didnt_play.append(player)
-            elif player in self.mids:
-                mids_who_didnt_play.append(player)
-            elif player in self.fwds:
-                fwds_who_didnt_play.append(player)
-            elif player in sub_list:
-                subs_who_didnt_play.append(player)
+        # Players on the team who didn't play, in the order of the gameweek's rows
+        season_availability, _, gw_week = self.fpl.gw_availability(self.season, self.gameweek)
+        if season_availability is not None:
+            gks_who_didnt_play = season_availability.didnt_play_ids(gw_week, self.gks)
+            defs_who_didnt_play = season_availability.didnt_play_ids(gw_week, self.defs)
+            mids_who_didnt_play = season_availability.didnt_play_ids(gw_week, self.mids)
+            fwds_who_didnt_play = season_availability.didnt_play_ids(gw_week, self.fwds)
+        else:
+            gks_who_didnt_play, defs_who_didnt_play, mids_who_didnt_play, fwds_who_didnt_play = [], [], [], []
         
         # Get a list of players on the team who did play
         team_nonplayers = gks_who_didnt_play + defs_who_didnt_play + mids_who_didnt_play + fwds_who_didnt_play
@@ -1212,7 +1218,7 @@ class team:
         Returns:
             - team: The ideal team.
         """
-        temp_t = team(self.season, self.gameweek, self.budget, self.transfers_left, self.gks, self.defs, self.mids, self.fwds)
+        temp_t = team(self.season, self.gameweek, self.budget, self.transfers_left, self.gks, self.defs, self.mids, self.fwds, context=self.context)
         counts = {}
         new_fwds = self.initial_players('FWD', fwd_n, fwd_budget, counts)
         all_players = new_fwds
@@ -1280,16 +1286,17 @@ class team:
         # Sort by P all_p[x][2]
         all_p = sorted(p_list, key=lambda x: x[2], reverse=True)
         # Display best 3 players
-        print(f'''GW{self.gameweek} - {self.season} | P: {self.team_p()} | xP: {self.team_xp():.2f} | B: {self.budget:.1f} | C: {self.captain} | VC: {self.vice_captain}
+        print(f'''GW{self.gameweek} - {self.season} | P: {self.team_p()} | xP: {self.team_xp():.2f} | B: {self.budget:.1f} | C: {self.player_name(self.captain)} | VC: {self.player_name(self.vice_captain)}
     Top 3: {all_p[0][0]} {all_p[0][1]} {all_p[0][2]}, {all_p[1][0]} {all_p[1][1]} {all_p[1][2]}, {all_p[2][0]} {all_p[2][1]} {all_p[2][2]}
     Worst 3: {all_p[-1][0]} {all_p[-1][1]} {all_p[-1][2]}, {all_p[-2][0]} {all_p[-2][1]} {all_p[-2][2]}, {all_p[-3][0]} {all_p[-3][1]} {all_p[-3][2]}\n''')
 
     def name_in_list(self, name, list):
         """
-        Checks if a name is in a list (of names).
+        Checks if a name is part of any name in a list (of names), ignoring accents and case.
         """
+        name = names.fold(name)
         for player in list:
-            if name in player:
+            if name in names.fold(player):
                 return True
         return False
     
@@ -1343,6 +1350,7 @@ class team:
         self.defs = []
         self.gks = []
         self.subs = []
+        self.count_clubs()
         
         # Work out maximum I can spend
         # FWD, MID, DEF, GK
@@ -1376,8 +1384,7 @@ class team:
             - list: The list of players selected for the position.
             - int: The budget remaining after selecting the players.
         """
-        players_by_xp = self.all_xp[self.pos_to_num(position)].sort_values(by='xP', ascending=False)
-        players_by_xp = players_by_xp.Name.tolist()
+        index = self.get_xp_index(position, self.gameweek + 1) # <-----! Erroneous line (prices are the next gameweek's)
         players_needed = self.pos_size(position)
         players_bought = []
         premium_players = 0
@@ -1385,12 +1392,18 @@ class team:
         total_spent = 0
         original_budget = budget
 
-        last_gw_data = self.fpl.get_gw_data(self.season, self.gameweek + 1)
-        for player in players_by_xp:
-            p_cost = self.player_value(player, last_gw_data) # <-----! Erroneous line
-            
-            # If we have enough players, stop
-            if len(players_bought) < players_needed and p_cost != None:
+        after = -1
+        while len(players_bought) < players_needed:
+            # Only players a premium (under budget) or a filler (up to 6.0) slot could still take
+            limits = [limit for limit, open_slots in ((budget, premium_players < players_needed - fillers), (6, budget_players < fillers)) if open_slots]
+            ranks = index.affordable(max(limits, default=-1), after=after)
+            if len(ranks) == 0:
+                break
+            for rank in ranks.tolist():
+                after = rank
+                player = int(index.ids[rank])
+                p_cost = float(index.prices[rank])
+                bought = len(players_bought)
                 if premium_players < players_needed - fillers and p_cost <= budget:
                     if self.transfer_in_allowed(player, position, p_cost):
                         self.add_player(player, position, p_cost)
@@ -1405,6 +1418,11 @@ class team:
                         budget -= p_cost
                         budget_players += 1
                         total_spent += p_cost
+                # The budget and open slots changed, so the affordable players are looked up again
+                if len(players_bought) > bought:
+                    break
+            else:
+                break
         print(f'{len(players_bought)} players bought for {position}')
         budget_remaining = original_budget - total_spent
         return players_bought, budget_remaining
@@ -1449,25 +1467,37 @@ class team:
         """
         return self.fpl.get_avg_score_list()
     
-    def get_club_counts(self, gw_data):
+    def club_code(self, player):
         """
-        Returns the counts of each player's club in the team.
+        Returns the club code of a player, their index in the club counts.
 
         Parameters:
-            - gw_data (dict): The data for the gameweek.
+            - player (int): The id of the player.
 
         Returns:
-            - dict: The counts of each player's club in the team.
+            - int: The club code (NO_CLUB if the player has no club in the gameweek).
+        """
+        return self.club_codes.get(player, NO_CLUB)
+
+    def count_clubs(self):
+        """
+        Recounts the clubs of the squad from scratch, after the squad lists have been replaced.
+        add_player and remove_player then keep the counts up to date.
         """
-        # Get counts of each player's club
-        club_counts = {}
         players = self.gks + self.defs + self.mids + self.fwds + [player[0] for player in self.subs]
+        self.club_counts = np.bincount([self.club_code(player) for player in players], minlength=len(self.club_names))
 
-        for player in players:
-            club = str(self.fpl.get_player_team(player, self.gameweek, gw_data))  # Convert club to string
-            club_counts[club] = club_counts.get(club, 0) + 1
+    def get_club_counts(self, gw_data=None):
+        """
+        Returns the counts of each player's club in the team.
 
-        return club_counts
+        Parameters:
+            - gw_data (dict): Unused, clubs are read from the team's gameweek (default: None).
+
+        Returns:
+            - dict: The counts of each player's club in the team.
+        """
+        return {self.club_names[code]: int(count) for code, count in enumerate(self.club_counts) if count > 0}
     
     def counts_from_list(self, player_list):
         """
@@ -1482,7 +1512,7 @@ class team:
         # Get counts of each player's club
         club_counts = {}
         for player in player_list:
-            club = self.fpl.get_player_team(player, self.gameweek)
+            club = self.club_names[self.club_code(self.player_id(player))]
             club_counts[club] = club_counts.get(club, 0) + 1
 
         return club_counts
@@ -1494,15 +1524,10 @@ class team:
         Returns:
             bool: True if the team has at most 3 players from the same club, False otherwise.
         """
-        club_counts = self.get_club_counts()
-
         # Check if any club has more than 3 players
-        for club in club_counts:
-            if club_counts[club] > 3:
-                #print(f'Club {club} has {club_counts[club]} players from the same team')
-                return False
-            
-        return True
+        club_counts = self.club_counts.copy()
+        club_counts[NO_CLUB] = 0
+        return bool((club_counts <= 3).all())
     
     def auto_chips(self, triple_captain_threshold=8, bench_threshold=4, free_hit_threshold=35, wildcard_threshold=30):
         """
@@ -1527,7 +1552,7 @@ class team:
             captain_xp = self.player_xp(captain, self.player_pos(captain))
             #print(f'Captain xP: {captain_xp:.2f}')
             if captain_xp > triple_captain_threshold and self.gameweek > 1:
-                print(f'CHIP: Triple Captain activated on GW{self.gameweek} for {captain} with {captain_xp:.2f} xP\n')
+                print(f'CHIP: Triple Captain activated on GW{self.gameweek} for {self.player_name(captain)} with {captain_xp:.2f} xP\n')
                 self.chips_used.append(['Triple Captain', self.gameweek])
                 self.chip_triple_captain_available = False
                 self.chip_triple_captain_active = True
@@ -1595,6 +1620,7 @@ class team:
         self.mids = []
         self.fwds = []
         self.subs = []
+        self.count_clubs()
 
         print(f'Loading pre-Free Hit team with from GW{gw}', end='\r')
 
@@ -1621,46 +1647,21 @@ class team:
         Returns:
             - float: The total value of the team.
         """
+        players = self.gks + self.defs + self.mids + self.fwds + [player[0] for player in self.subs]
+        values = self.fpl.get_prices(self.player_ids.names_of(players), self.gw_data)
+        if not np.isnan(values).any():
+            # Summed in tenths, so the total is exact
+            return float(np.rint(values * 10).sum()) / 10
+
+        # Players without a price are valued at the average so far
         value = 0
         p_count = 0
-        for player in self.gks:
-            val = self.player_value(player, self.gw_data)
-            if val != None:
-                value += val
-                p_count += 1
-            else:
-                if p_count > 0:
-                    value += (value / p_count)
-                
-        for player in self.defs:
-            val = self.player_value(player, self.gw_data)
-            if val != None:
-                value += val
-                p_count += 1
-            else:
-                value += (value / p_count)
-        for player in self.mids:
-            val = self.player_value(player, self.gw_data)
-            if val != None:
-                value += val
-                p_count += 1
-            else:
-                value += (value / p_count)
-        for player in self.fwds:
-            val = self.player_value(player, self.gw_data)
-            if val != None:
+        for i, val in enumerate(values):
+            if not np.isnan(val):
                 value += val
                 p_count += 1
-            else:
+            elif i >= len(self.gks) or p_count > 0:
                 value += (value / p_count)
-        for player in self.subs:
-            val = self.player_value(player[0], self.gw_data)
-            if val != None:
-                value += val
-                p_count += 1
-            else:
-                value += (value / p_count)
-            
         return value
 
     def get_n_gws_xp(self, n, discount_factor):
@@ -1674,11 +1675,20 @@ class team:
         Returns:
             - float: The expected points for the next n gameweeks.
         """
-        if self.gameweek < 36:
-            results = self.fpl.discount_next_n_gws(self.combined_xp, self.gameweek, n, discount_factor=discount_factor)
-        else:
-            results = self.combined_xp
-        return results
+        return self.context.get_n_gws_xp(self.gameweek, n, discount_factor)
+
+    def get_xp_index(self, position, price_gameweek):
+        """
+        Returns the index of a position's players by their xP over the next 5 gameweeks (as all_xp).
+
+        Parameters:
+            - position (str): The position ('GK', 'DEF', 'MID', 'FWD').
+            - price_gameweek (int): The gameweek the players are priced in.
+
+        Returns:
+            - xp_index.position_index: The index.
+        """
+        return self.context.get_xp_index(self.gameweek, 5, 0.8, position, price_gameweek)
     
     def pos_price_minimum(self, position):
         """
@@ -0,0 +1,186 @@
+'''
+Multi-Season Timeline for FPL Automation Project
+
+Maps (season, gameweek) pairs onto one global gameweek index running across every season in the
+data directory, so a window of gameweeks can span any number of season boundaries. Gameweeks before
+1 or after the end of a season carry over into the neighbouring seasons, e.g. (2022-23, 0) is the
+last gameweek of 2021-22. Team ids, which are reassigned every season, are reconciled through
+data/master_team_list.csv.
+'''
+import bisect
+import os
+import re
+import pandas as pd
+from fpl_auto import store
+
+# Gameweeks in a season, unless its gws folder says otherwise (2019-20 ran to GW47)
+GAMEWEEKS = 38
+
+def season_name(start_year):
+    """
+    Format the season starting in a given year.
+
+    Args:
+        start_year (int): The year the season starts in, e.g. 2021.
+
+    Returns:
+        str: The season, e.g. '2021-22'.
+    """
+    return f'{start_year}-{str(start_year + 1)[2:]}'
+
+def season_length(data_location, season):
+    """
+    Count the gameweeks of a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        int: The highest gameweek file of the season, and at least GAMEWEEKS.
+    """
+    gws_dir = f'{data_location}/{season}/gws'
+    if not os.path.isdir(gws_dir):
+        return GAMEWEEKS
+    weeks = [int(match.group(1)) for match in (re.fullmatch(r'gw(\d+)\.csv', file) for file in os.listdir(gws_dir)) if match]
+    return max(weeks + [GAMEWEEKS])
+
+class timeline:
+    def __init__(self, data_location='data'):
+        """
+        Initialize the timeline.
+
+        Args:
+            data_location (str): The location of the data (default: 'data').
+        """
+        self.data_location = data_location
+        self.seasons = store.list_seasons(data_location)
+        self.lengths = {season: season_length(data_location, season) for season in self.seasons}
+        self.starts = []
+        total = 0
+        for season in self.seasons:
+            self.starts.append(total)
+            total += self.lengths[season]
+        self.total = total
+        self.season_index = {season: i for i, season in enumerate(self.seasons)}
+        self.teams = self.read_teams()
+
+    def read_teams(self):
+        """
+        Read the team id --> team name mapping of every season, from master_team_list.csv or else the season's teams.csv.
+
+        Returns:
+            dict: season --> {team id: team name}.
+        """
+        teams = {}
+        try:
+            master_team_list = pd.read_csv(f'{self.data_location}/master_team_list.csv')
+            for season, season_teams in master_team_list.groupby('season'):
+                teams[season] = dict(zip(season_teams['team'], season_teams['team_name']))
+        except FileNotFoundError:
+            pass
+        for season in self.seasons:
+            if season not in teams and os.path.exists(f'{self.data_location}/{season}/teams.csv'):
+                season_teams = pd.read_csv(f'{self.data_location}/{season}/teams.csv')
+                teams[season] = dict(zip(season_teams['id'], season_teams['name']))
+        return teams
+
+    def to_global(self, season, gameweek):
+        """
+        Get the global index of a gameweek.
+
+        Args:
+            season (str): The season.
+            gameweek (int): The gameweek, may be < 1 or past the end of the season.
+
+        Returns:
+            int: The global gameweek index (0 is GW1 of the first season in the data directory).
+        """
+        if season in self.season_index:
+            return self.starts[self.season_index[season]] + gameweek - 1
+        # Seasons outside the data directory are assumed to have GAMEWEEKS gameweeks
+        start_year = int(season[:4])
+        if len(self.seasons) == 0:
+            return start_year * GAMEWEEKS + gameweek - 1
+        first_year = int(self.seasons[0][:4])
+        if start_year < first_year:
+            return (start_year - first_year) * GAMEWEEKS + gameweek - 1
+        return self.total + (start_year - int(self.seasons[-1][:4]) - 1) * GAMEWEEKS + gameweek - 1
+
+    def to_season_gw(self, global_gw):
+        """
+        Get the season and gameweek of a global index.
+
+        Args:
+            global_gw (int): The global gameweek index.
+
+        Returns:
+            tuple: The season and gameweek.
+        """
+        if len(self.seasons) == 0:
+            return season_name(global_gw // GAMEWEEKS), global_gw % GAMEWEEKS + 1
+        if global_gw < 0:
+            return season_name(int(self.seasons[0][:4]) + global_gw // GAMEWEEKS), global_gw % GAMEWEEKS + 1
+        if global_gw >= self.total:
+            past_end = global_gw - self.total
+            return season_name(int(self.seasons[-1][:4]) + 1 + past_end // GAMEWEEKS), past_end % GAMEWEEKS + 1
+        i = bisect.bisect_right(self.starts, global_gw) - 1
+        return self.seasons[i], global_gw - self.starts[i] + 1
+
+    def resolve(self, season, gameweek):
+        """
+        Resolve a gameweek before GW1 (e.g. GW0 or GW-20) onto the earlier season holding it.
+
+        Args:
+            season (str): The season.
+            gameweek (int): The gameweek.
+
+        Returns:
+            tuple: The season and gameweek holding the data. Gameweeks from 1 up are returned unchanged.
+        """
+        if gameweek >= 1:
+            return season, gameweek
+        return self.to_season_gw(self.to_global(season, gameweek))
+
+    def window(self, season, from_gw, to_gw):
+        """
+        Get a contiguous window of gameweeks, across as many season boundaries as it spans.
+
+        Args:
+            season (str): The season the gameweeks are relative to.
+            from_gw (int): The first gameweek of the window.
+            to_gw (int): The gameweek after the last of the window (like range).
+
+        Returns:
+            list: (season, gameweek) pairs in order.
+        """
+        return [self.to_season_gw(global_gw) for global_gw in range(self.to_global(season, from_gw), self.to_global(season, to_gw))]
+
+    def team_name(self, season, team_id):
+        """
+        Get the name of a team from its id in a given season.
+
+        Args:
+            season (str): The season.
+            team_id (int): The team's id in that season.
+
+        Returns:
+            str: The team name, or None if unknown.
+        """
+        return self.teams.get(season, {}).get(team_id)
+
+    def team_id(self, season, team_name):
+        """
+        Get the id a team had in a given season.
+
+        Args:
+            season (str): The season.
+            team_name (str): The team name.
+
+        Returns:
+            int: The team's id in that season, or None if the team was not in the league.
+        """
+        for team_id, name in self.teams.get(season, {}).items():
+            if name == team_name:
+                return team_id
+        return None
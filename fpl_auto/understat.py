@@ -0,0 +1,260 @@
+'''
+Understat Features for FPL Automation Project
+
+Consolidates the per-player data/<season>/understat/<Name>_<understat id>.csv files into one
+columnar table per season, joined to FPL element ids and gameweeks, so expected goals / assists can
+be added to the model features on request. Rows are sorted by gameweek with per-gameweek offsets, so a
+gameweek window is a single slice.
+
+Build with: python -m fpl_auto.understat -season 2023-24
+'''
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from fpl_auto import store
+from fpl_auto import cache
+
+# Per-match understat stats available as features
+UNDERSTAT_STATS = ['xG', 'xA', 'npxG', 'xGChain', 'xGBuildup', 'shots', 'key_passes']
+# Understat names of the teams FPL names differently
+TEAM_NAMES = {'Manchester City': 'Man City', 'Manchester United': 'Man Utd', 'Newcastle United': 'Newcastle',
+              'Nottingham Forest': "Nott'm Forest", 'Sheffield United': 'Sheffield Utd', 'Tottenham': 'Spurs',
+              'West Bromwich Albion': 'West Brom', 'Wolverhampton Wanderers': 'Wolves'}
+
+def understat_path(data_location, season):
+    """
+    Get the path of the consolidated understat table for a season.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        str: The path of the consolidated understat table.
+    """
+    return f'{store.compiled_dir(data_location, season)}/understat.npz'
+
+def understat_to_element(data_location, season):
+    """
+    Map understat player ids to FPL element ids, from id_dict.csv where the season has one, otherwise by name.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        dict: understat id --> element id.
+    """
+    if os.path.exists(f'{data_location}/{season}/id_dict.csv'):
+        id_dict = pd.read_csv(f'{data_location}/{season}/id_dict.csv', skipinitialspace=True)
+        return dict(zip(id_dict['Understat_ID'], id_dict['FPL_ID']))
+
+    # Other seasons' id_dict.csv files give the FPL name of players whose understat name differs
+    fpl_names = {}
+    for other_season in store.list_seasons(data_location):
+        if os.path.exists(f'{data_location}/{other_season}/id_dict.csv'):
+            id_dict = pd.read_csv(f'{data_location}/{other_season}/id_dict.csv', skipinitialspace=True)
+            fpl_names.update(zip(id_dict['Understat_ID'], id_dict['FPL_Name']))
+
+    player_ids = pd.read_csv(f'{data_location}/{season}/player_idlist.csv')
+    name_to_element = dict(zip(player_ids['first_name'] + ' ' + player_ids['second_name'], player_ids['id']))
+    understat_ids = {}
+    for file in os.listdir(f'{data_location}/{season}/understat'):
+        name, understat_id = file[:-len('.csv')].rsplit('_', 1)
+        if not understat_id.isdigit():
+            continue
+        name = name.replace('_', ' ')
+        if name not in name_to_element:
+            name = fpl_names.get(int(understat_id))
+        if name in name_to_element:
+            understat_ids[int(understat_id)] = name_to_element[name]
+    return understat_ids
+
+def fixture_gws(data_location, season):
+    """
+    Map matches to gameweeks using the season's fixtures. A match is found by its date and teams, as
+    a date alone can hold fixtures of two gameweeks (e.g. a rescheduled one).
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        pandas.DataFrame: date ('YYYY-MM-DD'), h_team, a_team (FPL team names) and round columns.
+    """
+    fixtures = pd.read_csv(f'{data_location}/{season}/fixtures.csv').dropna(subset=['kickoff_time', 'event'])
+    teams = pd.read_csv(f'{data_location}/{season}/teams.csv')
+    team_names = dict(zip(teams['id'], teams['name']))
+    return pd.DataFrame({'date': fixtures['kickoff_time'].str[:10], 'h_team': fixtures['team_h'].map(team_names),
+                         'a_team': fixtures['team_a'].map(team_names), 'round': fixtures['event'].astype(int)})
+
+def gw_names(data_location, season, season_gws=None):
+    """
+    Get the name each element is listed under in every gameweek, which is what get_pos_data is indexed by.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        season_gws (list): Already parsed gameweeks from store.read_season_gws (default: None, parse them).
+
+    Returns:
+        pandas.DataFrame: round, element and name columns, or None if the season has no usable gameweek files.
+    """
+    if season_gws is None:
+        season_gws = store.read_season_gws(data_location, season)
+    if season_gws is None:
+        return None
+    names = pd.concat([gw_data[['element', 'name']].assign(round=week_num) for week_num, gw_data in season_gws])
+    return names.drop_duplicates(['round', 'element'])
+
+def read_understat(data_location, season, season_gws=None):
+    """
+    Parse every per-player understat file of a season into one table of gameweek totals.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        season_gws (list): Already parsed gameweeks from store.read_season_gws (default: None, parse them).
+
+    Returns:
+        pandas.DataFrame: round, name and UNDERSTAT_STATS columns sorted by round, or None if the season has no understat players.
+    """
+    understat_dir = f'{data_location}/{season}/understat'
+    if not os.path.isdir(understat_dir):
+        return None
+    understat_ids = understat_to_element(data_location, season)
+    gws = fixture_gws(data_location, season)
+
+    frames = []
+    for file in sorted(os.listdir(understat_dir)):
+        understat_id = file[:-len('.csv')].rsplit('_', 1)[-1]
+        # understat_<Team>.csv files hold team stats, only player files end in an id
+        if not understat_id.isdigit() or int(understat_id) not in understat_ids:
+            continue
+        matches = pd.read_csv(f'{understat_dir}/{file}')
+        # Each file holds the player's whole career, keep this season's matches
+        matches = matches[matches['season'] == int(season[:4])]
+        frames.append(matches[['date', 'h_team', 'a_team'] + UNDERSTAT_STATS].assign(element=understat_ids[int(understat_id)]))
+    if len(frames) == 0:
+        return None
+
+    matches = pd.concat(frames, ignore_index=True)
+    matches[['h_team', 'a_team']] = matches[['h_team', 'a_team']].replace(TEAM_NAMES)
+    # Matches without a fixture (other competitions, or not played yet) are dropped
+    matches = matches.merge(gws, on=['date', 'h_team', 'a_team'])
+    if len(matches) == 0:
+        # e.g. a season that has not started yet
+        return None
+    # Double gameweeks are summed into one row per player per gameweek
+    totals = matches.groupby(['round', 'element'], as_index=False)[UNDERSTAT_STATS].sum()
+
+    names = gw_names(data_location, season, season_gws)
+    if names is None:
+        # Seasons without gameweek files fall back to the end of season names
+        player_ids = pd.read_csv(f'{data_location}/{season}/player_idlist.csv')
+        names = pd.DataFrame({'element': player_ids['id'], 'name': player_ids['first_name'] + ' ' + player_ids['second_name']})
+        totals = totals.merge(names, on='element')
+    else:
+        totals = totals.merge(names, on=['round', 'element'])
+    # Players sharing a name share a row, as get_pos_data is indexed by name
+    totals = totals.groupby(['round', 'name'], as_index=False)[UNDERSTAT_STATS].sum()
+    totals[UNDERSTAT_STATS] = totals[UNDERSTAT_STATS].astype(np.float64)
+    return totals.sort_values(['round', 'name'], kind='stable').reset_index(drop=True)
+
+def build_understat(data_location, season, season_gws=None):
+    """
+    Consolidate the per-player understat files of a season into one columnar .npz file.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        season_gws (list): Already parsed gameweeks from store.read_season_gws (default: None, parse them).
+
+    Returns:
+        str: The path of the written table, or None if the season has no understat players.
+    """
+    totals = read_understat(data_location, season, season_gws)
+    if totals is None:
+        return None
+    path = understat_path(data_location, season)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, round=totals['round'].to_numpy(), name=totals['name'].to_numpy(dtype=str),
+             **{stat: totals[stat].to_numpy(dtype=np.float64) for stat in UNDERSTAT_STATS})
+    cache.shared_cache.invalidate(data_location, season)
+    return path
+
+class understat_table:
+    def __init__(self, totals):
+        """
+        Initialize the understat table.
+
+        Args:
+            totals (pandas.DataFrame): round, name and UNDERSTAT_STATS columns sorted by round.
+        """
+        self.totals = totals
+        rounds = totals['round'].to_numpy()
+        # Rows of gameweek w are offsets[w - 1]:offsets[w]
+        self.offsets = np.searchsorted(rounds, np.arange(1, 40))
+
+    def window(self, from_gw, to_gw, stats=None):
+        """
+        Get each player's understat totals over a window of gameweeks.
+
+        Args:
+            from_gw (int): The first gameweek of the window.
+            to_gw (int): The last gameweek of the window (inclusive).
+            stats (list): The stats to return (default: None, all of UNDERSTAT_STATS).
+
+        Returns:
+            pandas.DataFrame: The summed stats, indexed by player name.
+        """
+        stats = stats or UNDERSTAT_STATS
+        rows = self.totals.iloc[self.offsets[max(from_gw, 1) - 1]:self.offsets[min(to_gw, 38)]]
+        if from_gw == to_gw:
+            return rows.set_index('name')[stats]
+        return rows.groupby('name')[stats].sum()
+
+def load_understat(data_location, season):
+    """
+    Load the consolidated understat table of a season, consolidating the per-player files in memory if it has not been built.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        understat_table: The understat table, or None if the season has no understat players.
+    """
+    path = understat_path(data_location, season)
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as understat_file:
+            totals = pd.DataFrame({column: understat_file[column] for column in ['round', 'name'] + UNDERSTAT_STATS})
+    else:
+        totals = read_understat(data_location, season)
+    if totals is None:
+        return None
+    return understat_table(totals)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Consolidate understat data")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default=None,
+                        help='Season to consolidate. Format: YYYY-YY e.g 2021-22, default: every season in the dataset')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    seasons = [inputs.season] if inputs.season else store.list_seasons(inputs.gw_data)
+    for season in seasons:
+        start = time.time()
+        path = build_understat(inputs.gw_data, season)
+        if path is None:
+            print(f'{season}: skipped (no understat players)')
+        else:
+            print(f'{season}: wrote {path} in {time.time() - start:.2f}s')
+
+if __name__ == '__main__':
+    main()
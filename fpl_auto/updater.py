@@ -0,0 +1,343 @@
+'''
+Incremental Dataset Updater for FPL Automation Project
+
+Brings data/<season> up to date with the FPL API without re-downloading the whole season: the finished
+events in bootstrap-static are compared with the local gws/gw{N}.csv files and only the missing gameweeks
+are fetched. Element summaries are fetched concurrently (asyncio, with a request rate limit) and written
+in the existing Vaastav layout, then the season's compiled files are rebuilt by the bulk ingest.
+
+Run with: python -m fpl_auto.updater
+Point -base_url at a local stand-in of the API to test without touching the real one.
+'''
+import argparse
+import asyncio
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from fpl_auto import cache
+from fpl_auto import ingest
+from fpl_auto import timeline
+
+API_URL = 'https://fantasy.premierleague.com/api/'
+# Columns leading each gw{N}.csv, followed by the element-summary history fields in alphabetical order
+GW_LEADING_COLUMNS = ['name', 'position', 'team', 'xP']
+# Responses worth retrying: rate limited, or the API briefly unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CLEANED_PLAYER_COLUMNS = ['first_name', 'second_name', 'goals_scored', 'assists', 'total_points', 'minutes', 'goals_conceded', 'creativity', 'influence', 'threat', 'bonus', 'bps', 'ict_index', 'clean_sheets', 'red_cards', 'yellow_cards', 'selected_by_percent', 'now_cost', 'element_type']
+
+class rate_limiter:
+    def __init__(self, max_per_second, max_concurrent):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            max_per_second (float): The maximum number of requests started per second.
+            max_concurrent (int): The maximum number of requests in flight at once.
+        """
+        self.interval = 1 / max_per_second
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.lock = asyncio.Lock()
+        self.next_start = 0
+
+    async def wait(self):
+        """
+        Wait until the next request may start.
+        """
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            delay = max(0, self.next_start - now)
+            self.next_start = max(now, self.next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def player_dir_name(element):
+    """
+    Get the players/ directory name of an element, e.g. Bukayo_Saka_15.
+
+    Args:
+        element (dict): The element, from bootstrap-static.
+
+    Returns:
+        str: The directory name.
+    """
+    return f"{element['first_name']}_{element['second_name']}_{element['id']}".replace(' ', '_')
+
+class updater:
+    def __init__(self, data_location='data', base_url=API_URL, max_per_second=10, max_concurrent=8, retries=3, backoff=0.5):
+        """
+        Initialize the updater.
+
+        Args:
+            data_location (str): The location of the data (default: 'data').
+            base_url (str): The root of the FPL API (default: the live API).
+            max_per_second (float): The maximum number of requests started per second (default: 10).
+            max_concurrent (int): The maximum number of requests in flight at once (default: 8).
+            retries (int): How many times a failed request is retried (default: 3).
+            backoff (float): Seconds before the first retry, doubling with each retry (default: 0.5).
+        """
+        self.data_location = data_location
+        self.base_url = base_url if base_url.endswith('/') else f'{base_url}/'
+        self.max_per_second = max_per_second
+        self.max_concurrent = max_concurrent
+        self.retries = retries
+        self.backoff = backoff
+        # One pooled connection per request in flight
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent))
+        # The default executor would cap the requests in flight at a handful of threads
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        # The counters are updated from the executor's threads
+        self.counter_lock = threading.Lock()
+        self.requests_made = 0
+        self.retries_made = 0
+
+    def close(self):
+        """
+        Shut down the request threads and close the pooled connections.
+        """
+        self.executor.shutdown()
+        self.session.close()
+
+    def get_json(self, path):
+        """
+        Fetch one API endpoint (blocking), retrying with exponential backoff on connection errors and 429/5xx responses.
+
+        Args:
+            path (str): The endpoint, relative to the base URL (e.g. 'bootstrap-static/').
+
+        Returns:
+            dict: The decoded JSON response.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(f'{self.base_url}{path}', timeout=30)
+                with self.counter_lock:
+                    self.requests_made += 1
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.raise_for_status()
+                    return response.json()
+                delay = float(response.headers.get('Retry-After', self.backoff * 2 ** attempt))
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+            with self.counter_lock:
+                self.retries_made += 1
+            time.sleep(delay)
+
+    async def fetch_json(self, path, limiter):
+        """
+        Fetch one API endpoint within the rate limit.
+
+        Args:
+            path (str): The endpoint, relative to the base URL.
+            limiter (rate_limiter): The shared rate limiter.
+
+        Returns:
+            dict: The decoded JSON response.
+        """
+        async with limiter.semaphore:
+            await limiter.wait()
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.get_json, path)
+
+    async def fetch_all(self, paths):
+        """
+        Fetch many API endpoints concurrently within the rate limit.
+
+        Args:
+            paths (list): The endpoints, relative to the base URL.
+
+        Returns:
+            list: The decoded JSON responses, in the order of paths.
+        """
+        limiter = rate_limiter(self.max_per_second, self.max_concurrent)
+        return await asyncio.gather(*[self.fetch_json(path, limiter) for path in paths])
+
+    def local_gws(self, season):
+        """
+        List the gameweeks already in data/<season>/gws.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            set: The gameweeks with a gw{N}.csv file.
+        """
+        gws_dir = f'{self.data_location}/{season}/gws'
+        if not os.path.isdir(gws_dir):
+            return set()
+        return {int(file[2:-4]) for file in os.listdir(gws_dir) if file.startswith('gw') and file[2:-4].isdigit()}
+
+    def missing_gws(self, season, events):
+        """
+        Compare the API's finished events with the local gameweek files.
+
+        Args:
+            season (str): The season of the data.
+            events (list): The events of bootstrap-static.
+
+        Returns:
+            list: The finished gameweeks not yet stored locally, sorted.
+        """
+        local_gws = self.local_gws(season)
+        return sorted(event['id'] for event in events if event['finished'] and event['id'] not in local_gws)
+
+    def write_season_tables(self, season, bootstrap):
+        """
+        Write the season-wide tables (teams, player id list, cleaned players) from bootstrap-static.
+
+        Args:
+            season (str): The season of the data.
+            bootstrap (dict): The bootstrap-static response.
+        """
+        season_dir = f'{self.data_location}/{season}'
+        os.makedirs(season_dir, exist_ok=True)
+        positions = {element_type['id']: element_type['singular_name_short'] for element_type in bootstrap['element_types']}
+        elements = pd.DataFrame(bootstrap['elements'])
+        pd.DataFrame(bootstrap['teams']).to_csv(f'{season_dir}/teams.csv', index=False)
+        elements[['first_name', 'second_name', 'id']].to_csv(f'{season_dir}/player_idlist.csv', index=False)
+        cleaned_players = elements.assign(element_type=elements['element_type'].map(positions))
+        cleaned_players[CLEANED_PLAYER_COLUMNS].to_csv(f'{season_dir}/cleaned_players.csv', index=False)
+
+    def write_fixtures(self, season, fixtures):
+        """
+        Write data/<season>/fixtures.csv, keeping the column order of an existing file.
+
+        Args:
+            season (str): The season of the data.
+            fixtures (list): The fixtures response.
+        """
+        path = f'{self.data_location}/{season}/fixtures.csv'
+        fixtures = pd.DataFrame(fixtures)
+        if os.path.exists(path):
+            columns = pd.read_csv(path, nrows=0).columns
+            fixtures = fixtures[[column for column in columns if column in fixtures.columns] + [column for column in fixtures.columns if column not in columns]]
+        fixtures.to_csv(path, index=False)
+
+    def write_players(self, season, bootstrap, summaries):
+        """
+        Write each player's players/<First_Second_id>/gw.csv from their element summary.
+
+        Args:
+            season (str): The season of the data.
+            bootstrap (dict): The bootstrap-static response.
+            summaries (dict): element id --> element-summary response.
+        """
+        for element in bootstrap['elements']:
+            if element['id'] not in summaries or len(summaries[element['id']]['history']) == 0:
+                continue
+            player_dir = f"{self.data_location}/{season}/players/{player_dir_name(element)}"
+            os.makedirs(player_dir, exist_ok=True)
+            pd.DataFrame(summaries[element['id']]['history']).to_csv(f'{player_dir}/gw.csv', index=False)
+
+    def write_gw(self, season, gameweek, bootstrap, summaries):
+        """
+        Write data/<season>/gws/gw{N}.csv from the element summaries, and append to merged_gw.csv if the season keeps one.
+
+        Args:
+            season (str): The season of the data.
+            gameweek (int): The gameweek.
+            bootstrap (dict): The bootstrap-static response.
+            summaries (dict): element id --> element-summary response.
+
+        Returns:
+            int: The number of rows written.
+        """
+        positions = {element_type['id']: element_type['singular_name_short'] for element_type in bootstrap['element_types']}
+        teams = {team['id']: team['name'] for team in bootstrap['teams']}
+        rows = []
+        for element in bootstrap['elements']:
+            for fixture in summaries.get(element['id'], {'history': []})['history']:
+                if fixture['round'] != gameweek:
+                    continue
+                row = {'name': f"{element['first_name']} {element['second_name']}", 'position': positions[element['element_type']],
+                       'team': teams[element['team']], 'xP': element.get('ep_this') or 0}
+                row.update(fixture)
+                rows.append(row)
+
+        gws_dir = f'{self.data_location}/{season}/gws'
+        os.makedirs(gws_dir, exist_ok=True)
+        history_columns = sorted({column for row in rows for column in row if column not in GW_LEADING_COLUMNS})
+        with open(f'{gws_dir}/gw{gameweek}.csv', 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=GW_LEADING_COLUMNS + history_columns)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        if os.path.exists(f'{gws_dir}/merged_gw.csv') and len(rows) > 0:
+            merged_columns = pd.read_csv(f'{gws_dir}/merged_gw.csv', nrows=0).columns
+            pd.DataFrame(rows).assign(GW=gameweek).reindex(columns=merged_columns).to_csv(f'{gws_dir}/merged_gw.csv', mode='a', header=False, index=False)
+        return len(rows)
+
+    async def update_async(self, season=None):
+        """
+        Fetch and write every missing finished gameweek of the API's current season.
+
+        Args:
+            season (str): The season the API is serving (default: None, inferred from the first event's deadline).
+
+        Returns:
+            dict: The season, the gameweeks written, the number of requests made and the seconds taken.
+        """
+        start = time.time()
+        bootstrap, = await self.fetch_all(['bootstrap-static/'])
+        season = season or timeline.season_name(int(bootstrap['events'][0]['deadline_time'][:4]))
+        missing = self.missing_gws(season, bootstrap['events'])
+        if len(missing) == 0:
+            return {'season': season, 'gameweeks': [], 'requests': self.requests_made, 'seconds': time.time() - start}
+
+        self.write_season_tables(season, bootstrap)
+        element_ids = [element['id'] for element in bootstrap['elements']]
+        responses = await self.fetch_all(['fixtures/'] + [f'element-summary/{element_id}/' for element_id in element_ids])
+        self.write_fixtures(season, responses[0])
+        summaries = dict(zip(element_ids, responses[1:]))
+        self.write_players(season, bootstrap, summaries)
+        for gameweek in missing:
+            self.write_gw(season, gameweek, bootstrap, summaries)
+
+        # Only this season's inputs changed, so only its compiled files are rebuilt
+        cache.shared_cache.invalidate(self.data_location, season)
+        ingest.ingest_season(self.data_location, season)
+        return {'season': season, 'gameweeks': missing, 'requests': self.requests_made, 'seconds': time.time() - start}
+
+    def update(self, season=None):
+        """
+        Fetch and write every missing finished gameweek of the API's current season.
+
+        Args:
+            season (str): The season the API is serving (default: None, inferred from the first event's deadline).
+
+        Returns:
+            dict: The season, the gameweeks written, the number of requests made and the seconds taken.
+        """
+        return asyncio.run(self.update_async(season))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Update dataset")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default=None,
+                        help='Season the API is serving. Format: YYYY-YY e.g 2024-25, default: inferred from the API')
+    parser.add_argument('-base_url', type=str, default=API_URL,
+                        help=f'Root of the FPL API, default: {API_URL}')
+    parser.add_argument('-rate', type=float, default=10,
+                        help='Maximum requests per second, default: 10')
+    parser.add_argument('-concurrency', type=int, default=8,
+                        help='Maximum requests in flight at once, default: 8')
+    return parser.parse_args()
+
+def main():
+    inputs = parse_args()
+    result = updater(inputs.gw_data, inputs.base_url, inputs.rate, inputs.concurrency).update(inputs.season)
+    if len(result['gameweeks']) == 0:
+        print(f"{result['season']}: already up to date ({result['requests']} requests, {result['seconds']:.2f}s)")
+    else:
+        print(f"{result['season']}: fetched GW{', GW'.join(map(str, result['gameweeks']))} ({result['requests']} requests, {result['seconds']:.2f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+'''
+Position xP Index for FPL Automation Project
+
+The players of one position in one gameweek, sorted once by expected points (xP) with their prices,
+plus a price-sorted view of the same players. "The best players under a budget" is then a binary
+search on the price view and a sort of the few ranks it returns, instead of re-sorting the position's
+predictions and pricing every row for each transfer or squad selection.
+'''
+import numpy as np
+
+class position_index:
+    def __init__(self, player_ids, xp, prices):
+        """
+        Initialize the index.
+
+        Args:
+            player_ids (list): The player ids, best xP first; a player's position in the list is their rank.
+            xp (numpy.ndarray): The xP of each player, in the same order (NaN last).
+            prices (numpy.ndarray): The price of each player, in the same order, NaN for players without a price.
+        """
+        self.ids = np.asarray(player_ids, dtype=np.int64)
+        self.xp = np.asarray(xp, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        # Ascending, so the number of players with at least some xP is a binary search
+        self.negated_xp = -self.xp
+        # Ranks by price, cheapest first; players without a price are left out
+        priced = np.flatnonzero(~np.isnan(self.prices))
+        self.by_price = priced[np.argsort(self.prices[priced], kind='stable')]
+        self.sorted_prices = self.prices[self.by_price]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count_xp_at_least(self, min_xp):
+        """
+        Count the players with at least some xP, the ranks before the returned one.
+
+        Args:
+            min_xp (float): The minimum xP.
+
+        Returns:
+            int: The number of players with xP >= min_xp.
+        """
+        return int(np.searchsorted(self.negated_xp, -min_xp, side='right'))
+
+    def affordable(self, budget, min_xp=None, after=-1):
+        """
+        Get the players priced at most the budget, best xP first.
+
+        Args:
+            budget (float): The maximum price.
+            min_xp (float): The minimum xP (default: None, any xP).
+            after (int): Only players ranked after this one (default: -1, every player).
+
+        Returns:
+            numpy.ndarray: The ranks of the players, in xP order.
+        """
+        ranks = self.by_price[:np.searchsorted(self.sorted_prices, budget, side='right')]
+        end = len(self.ids) if min_xp is None else self.count_xp_at_least(min_xp)
+        return np.sort(ranks[(ranks > after) & (ranks < end)])
+
+def build_position_index(position_xp, player_ids, price_of):
+    """
+    Build the index of one position's predictions.
+
+    Args:
+        position_xp (pandas.DataFrame): The predictions of the position (Name, xP).
+        player_ids (ids.player_ids): The season's player ids.
+        price_of (callable): Maps a list of names to an array of prices, NaN for players without one.
+
+    Returns:
+        position_index: The index.
+    """
+    position_xp = position_xp.sort_values(by='xP', ascending=False)
+    names = position_xp.Name.tolist()
+    return position_index(player_ids.intern_all(names), position_xp.xP.to_numpy(dtype=np.float64), price_of(names))
@@ -6,9 +6,11 @@ Author: Benjamin Tindal
 import sys
 import argparse
 import fpl_auto.team as team
+from fpl_auto.context import season_context
 import json
 import numpy as np
 from fpl_auto import evaluate as eval
+from fpl_auto import api
 
 def parse_args():
     parser = argparse.ArgumentParser(description="FPL Automation Project: Team Manager")
@@ -29,6 +31,10 @@ def parse_args():
                         action=argparse.BooleanOptionalAction, default=False, help='Plot P vs AVG P, IMPORTANT: only works for current season, default: False')
     parser.add_argument('-plot_xp',
                         action=argparse.BooleanOptionalAction, default=False, help='Plot XP each week, default: False')
+    parser.add_argument('-offline',
+                        action=argparse.BooleanOptionalAction, default=False, help='Never call the FPL API, only use the cached bootstrap-static snapshot, default: False')
+    parser.add_argument('-api_url', type=str, default=None,
+                        help='Root of the FPL API, e.g. a local stand-in from python -m fpl_auto.standin, default: the live API')
     args = parser.parse_args()
     
     return args
@@ -45,6 +51,10 @@ sys.argv = [
     
 
 inputs = parse_args()
+if inputs.offline:
+    api.configure(offline=True)
+if inputs.api_url:
+    api.configure(base_url=inputs.api_url)
 
 #%%
 
@@ -52,22 +62,22 @@ season = inputs.season
 start_gw = inputs.start_gw
 repeat = inputs.repeat_until - 1
 
-def get_team_from_manager_id(manager_id):
+def get_team_from_manager_id(manager_id, context=None):
     target_url = f'https://fantasy.premierleague.com/api/my-team/{manager_id}/'
     print(f'First, sign in on the official FPL website, then go to the following url and copy the response and set it as var r: {target_url}')
     r = '{"picks":[{"element":409,"position":1,"selling_price":40,"multiplier":1,"purchase_price":39,"is_captain":false,"is_vice_captain":false},{"element":430,"position":2,"selling_price":67,"multiplier":1,"purchase_price":68,"is_captain":false,"is_vice_captain":false},{"element":506,"position":3,"selling_price":56,"multiplier":1,"purchase_price":55,"is_captain":false,"is_vice_captain":false},{"element":220,"position":4,"selling_price":47,"multiplier":1,"purchase_price":46,"is_captain":false,"is_vice_captain":false},{"element":353,"position":5,"selling_price":77,"multiplier":1,"purchase_price":75,"is_captain":false,"is_vice_captain":false},{"element":526,"position":6,"selling_price":80,"multiplier":1,"purchase_price":79,"is_captain":false,"is_vice_captain":false},{"element":362,"position":7,"selling_price":56,"multiplier":1,"purchase_price":56,"is_captain":false,"is_vice_captain":true},{"element":19,"position":8,"selling_price":88,"multiplier":2,"purchase_price":87,"is_captain":true,"is_vice_captain":false},{"element":343,"position":9,"selling_price":68,"multiplier":1,"purchase_price":67,"is_captain":false,"is_vice_captain":false},{"element":60,"position":10,"selling_price":86,"multiplier":1,"purchase_price":83,"is_captain":false,"is_vice_captain":false},{"element":85,"position":11,"selling_price":70,"multiplier":1,"purchase_price":69,"is_captain":false,"is_vice_captain":false},{"element":597,"position":12,"selling_price":48,"multiplier":0,"purchase_price":50,"is_captain":false,"is_vice_captain":false},{"element":5,"position":13,"selling_price":49,"multiplier":0,"purchase_price":49,"is_captain":false,"is_vice_captain":false},{"element":92,"position":14,"selling_price":43,"multiplier":0,"purchase_price":43,"is_captain":false,"is_vice_captain":false},{"element":473,"position":15,"selling_price":38,"multiplier":0,"purchase_price":38,"is_captain":false,"is_vice_captain":false}],"chips":[{"status_for_entry":"available","played_by_entry":[],"name":"wildcard","number":1,"start_event":21,"stop_event":38,"chip_type":"transfer"},{"status_for_entry":"available","played_by_entry":[],"name":"freehit","number":1,"start_event":2,"stop_event":38,"chip_type":"transfer"},{"status_for_entry":"available","played_by_entry":[],"name":"bboost","number":1,"start_event":1,"stop_event":38,"chip_type":"team"},{"status_for_entry":"available","played_by_entry":[],"name":"3xc","number":1,"start_event":1,"stop_event":38,"chip_type":"team"}],"transfers":{"cost":4,"status":"cost","limit":1,"made":1,"bank":99,"value":931}}'
     # Convert r to pds object
     r = json.loads(r)
     r = r['picks']
-    t = team.team(season, start_gw, 100)
+    t = team.team(season, start_gw, 100, context=context)
     for player in r:
         player_name = t.id_to_name(player['element'])
-        t.add_player(player_name, t.positions_list[player_name], (player['purchase_price'] / 10))
+        t.add_player(player_name, t.positions_list[t.player_id(player_name)], (player['purchase_price'] / 10))
     
     return t
 
-def my_team_at_gw1():
-    t = team.team(season, start_gw)
+def my_team_at_gw1(context=None):
+    t = team.team(season, start_gw, context=context)
     t.add_player('Aaron Ramsdale', 'GK')
     t.add_player('Gabriel dos Santos Magalhães', 'DEF')
     t.add_player('Luke Shaw', 'DEF')
@@ -87,12 +97,15 @@ def my_team_at_gw1():
     return t
 
 def main():
+    # Season data, predictions and lookups are loaded once and shared by every gameweek's team
+    context = season_context(season)
+
     if inputs.starting_team == 'custom_1':
-        t = my_team_at_gw1()
+        t = my_team_at_gw1(context)
     elif inputs.starting_team == 'custom_2':
-        t = get_team_from_manager_id(3124032) # 1 is my manager id
+        t = get_team_from_manager_id(3124032, context) # 1 is my manager id
     else:
-        t = team.team(season, start_gw, 100)
+        t = team.team(season, start_gw, 100, context=context)
         t.initial_team_generator() #t = t.select_ideal_team(2, 12, 3, 12, 2, 7, 2, 5.5) 
 
     p_list = []
@@ -123,7 +136,7 @@ def main():
             t.return_subs_to_team()
             
             try:
-                t = team.team(season, i + 1, t.budget, t.transfers_left + 1, [t.gks, t.defs, t.mids, t.fwds, t.subs], t.chips_used, t.transfer_history, t.chip_triple_captain_available, t.chip_bench_boost_available, t.chip_free_hit_available, t.chip_wildcard_available, t.free_hit_team)
+                t = team.team(season, i + 1, t.budget, t.transfers_left + 1, [t.gks, t.defs, t.mids, t.fwds, t.subs], t.chips_used, t.transfer_history, t.chip_triple_captain_available, t.chip_bench_boost_available, t.chip_free_hit_available, t.chip_wildcard_available, t.free_hit_team, context)
             except FileNotFoundError:
                 print(f'GW{i} | End Reached')
                 break
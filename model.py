@@ -8,6 +8,7 @@ import sys
 import numpy as np
 from fpl_auto.data import fpl_data
 from fpl_auto import evaluate as eval
+from fpl_auto import api
 import pandas as pd
 
 #%%
@@ -24,14 +25,24 @@ def parse_args():
     parser.add_argument('-repeat', type=int, default=38, help='How many weeks to repeat testing over, default: 38')
     parser.add_argument('-training_prev_weeks', type=int, default=19, help='How many past weeks of data to use for training, default: 19')
     parser.add_argument('-predict_weeks', type=int, default=4, help='How many past weeks of data to use for predicting, default: 4')
+    parser.add_argument('-understat', type=str, nargs='*', default=None, choices=['xG', 'xA', 'npxG', 'xGChain', 'xGBuildup', 'shots', 'key_passes'],
+                        help='Understat stats to add to the model features, e.g. -understat xG xA, default: none')
+    parser.add_argument('-training_report', type=int, nargs='*', default=None,
+                        help='Only report the time and peak memory of assembling training data over these numbers of past weeks, e.g. -training_report 19 38 76, default: none')
     parser.add_argument('-display_weights',
                         action=argparse.BooleanOptionalAction, default=False, help='Whether to display feature weights, default: False')
     parser.add_argument('-plot_predictions',
                         action=argparse.BooleanOptionalAction, default=False, help='Whether to plot predictions vs actual points, default: False')
     parser.add_argument('-save', '-s',
-                        action=argparse.BooleanOptionalAction, default=False, help='Whether to export predictions to tsv, default: False')
+                        action=argparse.BooleanOptionalAction, default=False, help='Whether to export predictions to the predictions store, default: False')
+    parser.add_argument('-tsv',
+                        action=argparse.BooleanOptionalAction, default=False, help='Whether to also export predictions to tsv files, default: False')
     parser.add_argument('-score_train_vs_test',
                         action=argparse.BooleanOptionalAction, default=False, help='Print RMSE, AE etc.. of model on training and test data, default: False')
+    parser.add_argument('-offline',
+                        action=argparse.BooleanOptionalAction, default=False, help='Never call the FPL API, only use the cached bootstrap-static snapshot, default: False')
+    parser.add_argument('-api_url', type=str, default=None,
+                        help='Root of the FPL API, e.g. a local stand-in from python -m fpl_auto.standin, default: the live API')
     args = parser.parse_args()
     
     return args
@@ -52,6 +63,10 @@ sys.argv = [
 ]
 
 inputs = parse_args()
+if inputs.offline:
+    api.configure(offline=True)
+if inputs.api_url:
+    api.configure(base_url=inputs.api_url)
 
 #%%
 
@@ -78,11 +93,17 @@ output_files = inputs.save
 #%%
 # Initialise classes
 # Ensure that the correct location is specified for Vastaav data
-vastaav = fpl_data('data', season)
+vastaav = fpl_data('data', season, understat_stats=inputs.understat)
 
 #%%
 
 def main():
+    if inputs.training_report:
+        for weeks in inputs.training_report:
+            report = vastaav.training_data_report(season, target_gameweek, weeks)
+            print(f"{season} GW{target_gameweek}: {report['weeks']} weeks, {report['rows']} rows in {report['seconds']:.2f}s, peak {report['peak_bytes'] / 2**20:.1f} MiB")
+        return
+
     simulation_finished = False
     count = 0
     total_e = 0
@@ -96,7 +117,7 @@ def main():
         try:
             training_data, test_data = vastaav.get_training_data_all(
                 season, i - training_prev_weeks, i)
-        except UnboundLocalError:
+        except FileNotFoundError:
             print(f'Reached Prediction Limit for {season} GW{i}, can only predict 1 week beyond data.')
             quit()
 
@@ -174,7 +195,7 @@ def main():
             clean_predictions = vastaav.post_model_weightings_for_next_gw(clean_predictions, i-1)
 
         if output_files:
-            eval.export_tsv(clean_predictions, season, i)
+            eval.export_tsv(clean_predictions, season, i, tsv=inputs.tsv)
         
         if simulation_finished:
             break
@@ -1,5 +1,45 @@
+import os
+import shutil
+import tempfile
 import unittest
+import numpy as np
+import pandas as pd
+import requests
 from fpl_auto import team
+from fpl_auto import store
+from fpl_auto import cache
+from fpl_auto import players
+from fpl_auto import ingest
+from fpl_auto import timeline
+from fpl_auto import predictions
+from fpl_auto import evaluate
+from fpl_auto import updater
+from fpl_auto import api
+from fpl_auto import standin
+from fpl_auto import fetcher
+from fpl_auto import fixtures
+from fpl_auto import prices
+from fpl_auto import ids
+from fpl_auto import availability
+from fpl_auto import xp_index
+from fpl_auto import names
+from fpl_auto import horizon
+from fpl_auto import rolling
+from fpl_auto import understat
+from fpl_auto.context import season_context
+from fpl_auto.data import fpl_data
+
+def setUpModule():
+    # Serve the FPL API from the local dataset, so no test reaches fantasy.premierleague.com
+    global api_server, api_cache
+    api_cache = tempfile.mkdtemp()
+    api_server = standin.stand_in_server(standin.synthesized_api('data', '2021-22')).start()
+    api.configure(base_url=api_server.base_url, cache_location=api_cache)
+
+def tearDownModule():
+    api.configure(base_url=api.API_URL, cache_location='data/api')
+    api_server.stop()
+    shutil.rmtree(api_cache)
 
 class TestTeam(unittest.TestCase):
     def testMaxThreeFromSameTeam(self):
@@ -34,6 +74,538 @@ class TestTeam(unittest.TestCase):
         t.add_player('Andrew Robertson', 'DEF')
         self.assertFalse(t.add_player('Andrew Robertson', 'DEF'))
 
+    def testClubCountsFollowSquad(self):
+        t = team.team('2021-22', 1, 100, players=[[], [], [], [], []])
+        t.add_player('Joel Matip', 'DEF')
+        t.add_player('Mohamed Salah', 'MID')
+        t.add_player('Sadio Mané', 'MID')
+        self.assertEqual(t.get_club_counts(), {'Liverpool': 3})
+        self.assertTrue(t.check_violate_club_rule('Andrew Robertson'))
+        t.remove_player('Sadio Mané', 'MID')
+        self.assertEqual(t.get_club_counts(), {'Liverpool': 2})
+        self.assertFalse(t.check_violate_club_rule('Andrew Robertson'))
+        self.assertTrue(t.transfer_in_allowed('Andrew Robertson', 'DEF'))
+
+    def testStopListedPlayerNotAllowed(self):
+        t = team.team('2021-22', 1, 100, players=[[], [], [], [], []])
+        t.player_stop_list = ['Mohamed Salah']
+        self.assertFalse(t.transfer_in_allowed('Mohamed Salah', 'MID'))
+        self.assertFalse(t.transfer_in_allowed(t.player_id('Mohamed Salah'), 'MID'))
+        self.assertTrue(t.transfer_in_allowed('Sadio Mané', 'MID'))
+
+class TestGwStore(unittest.TestCase):
+    def setUp(self):
+        self.data_location = tempfile.mkdtemp()
+        season_dir = f'{self.data_location}/2021-22'
+        os.makedirs(f'{season_dir}/gws')
+        for file in ['cleaned_players.csv', 'teams.csv', 'player_idlist.csv', 'gws/gw1.csv', 'gws/gw2.csv']:
+            shutil.copy(f'data/2021-22/{file}', f'{season_dir}/{file}')
+
+    def tearDown(self):
+        cache.shared_cache.invalidate(self.data_location)
+        shutil.rmtree(self.data_location)
+
+    def testStoreMatchesCsv(self):
+        csv_data = fpl_data(self.data_location, '2021-22').get_gw_data('2021-22', 2)
+        store.build_gw_store(self.data_location, '2021-22')
+        stored_data = fpl_data(self.data_location, '2021-22').get_gw_data('2021-22', 2)
+        pd.testing.assert_frame_equal(csv_data, stored_data)
+
+    def testTensorMatchesCsv(self):
+        csv_fpl = fpl_data(self.data_location, '2021-22')
+        csv_mids = csv_fpl.get_pos_data('2021-22', 2, 'MID')
+        csv_points = csv_fpl.actual_points_dict('2021-22', 2)
+        store.build_gw_tensor(self.data_location, '2021-22')
+        tensor_fpl = fpl_data(self.data_location, '2021-22')
+        self.assertIsNotNone(tensor_fpl.get_gw_tensor('2021-22', 2))
+        pd.testing.assert_frame_equal(csv_mids, tensor_fpl.get_pos_data('2021-22', 2, 'MID'))
+        self.assertEqual(csv_points, tensor_fpl.actual_points_dict('2021-22', 2))
+        gw_data = tensor_fpl.get_gw_data('2021-22', 2)
+        self.assertEqual(tensor_fpl.get_price(2, 'Mohamed Salah', gw_data), gw_data.loc['Mohamed Salah', 'value'] / 10)
+
+    def testMissingWeekNotFound(self):
+        store.build_gw_store(self.data_location, '2021-22')
+        with self.assertRaises(FileNotFoundError):
+            fpl_data(self.data_location, '2021-22').get_gw_data('2021-22', 3)
+
+    def testPlayerStoreMatchesPlayerDirs(self):
+        for player_dir in ['Aaron_Ramsdale_559', 'Mohamed_Salah_233']:
+            shutil.copytree(f'data/2021-22/players/{player_dir}', f'{self.data_location}/2021-22/players/{player_dir}')
+        dir_history = fpl_data(self.data_location, '2021-22').get_player_history([233, 559])
+        players.build_player_store(self.data_location, '2021-22')
+        stored_history = fpl_data(self.data_location, '2021-22').get_player_history([233, 559])
+        self.assertEqual(stored_history['element'].tolist(), dir_history['element'].tolist())
+        pd.testing.assert_frame_equal(dir_history.drop(columns='kickoff_time'), stored_history.drop(columns='kickoff_time'))
+        self.assertEqual(len(stored_history), len(fpl_data(self.data_location, '2021-22').get_player_history(233)) + len(fpl_data(self.data_location, '2021-22').get_player_history(559)))
+
+    def testUnderstatOnlyJoinedOnRequest(self):
+        os.makedirs(f'{self.data_location}/2021-22/understat')
+        for file in ['fixtures.csv', 'id_dict.csv', 'understat/Mohamed_Salah_1250.csv']:
+            shutil.copy(f'data/2021-22/{file}', f'{self.data_location}/2021-22/{file}')
+        cache.shared_cache.reset_stats()
+        mids = fpl_data(self.data_location, '2021-22').get_pos_data('2021-22', 2, 'MID')
+        self.assertNotIn('understat', cache.shared_cache.stats()['tables'])
+        understat_mids = fpl_data(self.data_location, '2021-22', understat_stats=['xG', 'xA']).get_pos_data('2021-22', 2, 'MID')
+        pd.testing.assert_frame_equal(mids, understat_mids.drop(columns=['xG', 'xA']))
+        self.assertGreater(understat_mids.loc['Mohamed Salah', 'xG'], 0)
+        self.assertEqual(understat_mids.drop('Mohamed Salah')['xG'].sum(), 0)
+
+    def testUnderstatMatchedToFixtureByTeams(self):
+        os.makedirs(f'{self.data_location}/2021-22/understat')
+        for file in ['fixtures.csv', 'id_dict.csv']:
+            shutil.copy(f'data/2021-22/{file}', f'{self.data_location}/2021-22/{file}')
+        matches = pd.read_csv('data/2021-22/understat/Mohamed_Salah_1250.csv')
+        # A match of another competition on the day of his GW1 fixture
+        other = matches[matches['date'] == '2021-08-14'].assign(h_team='Udinese', a_team='Juventus', xG=5.0)
+        pd.concat([matches, other]).to_csv(f'{self.data_location}/2021-22/understat/Mohamed_Salah_1250.csv', index=False)
+        totals = understat.read_understat(self.data_location, '2021-22').set_index(['round', 'name'])
+        self.assertAlmostEqual(totals.loc[(1, 'Mohamed Salah'), 'xG'], matches[matches['date'] == '2021-08-14']['xG'].sum())
+
+    def testCompactSchemaKeepsPredictions(self):
+        fpl = fpl_data(self.data_location, '2021-22')
+        gw_data = fpl.get_gw_data('2021-22', 1)
+        self.assertEqual(gw_data['team'].dtype, 'category')
+        self.assertEqual(gw_data['minutes'].dtype, 'int16')
+        self.assertEqual(gw_data['influence'].dtype, 'float32')
+        training_data = fpl.get_training_data('2021-22', 1)
+        models = fpl.get_model('linear', training_data)
+        wide_models = fpl.get_model('linear', [(features.astype(float), labels.astype(float)) for features, labels in training_data])
+        for model, wide_model, (features, _) in zip(models, wide_models, fpl.get_training_data('2021-22', 2)):
+            np.testing.assert_allclose(model.predict(features), wide_model.predict(features.astype(float)), atol=1e-4)
+
+    def testIngestSkipsUnchangedSeasons(self):
+        first, = ingest.ingest(self.data_location, workers=1)
+        self.assertFalse(first['skipped'])
+        self.assertTrue(os.path.exists(store.gw_store_path(self.data_location, '2021-22')))
+        second, = ingest.ingest(self.data_location, workers=1)
+        self.assertTrue(second['skipped'])
+        shutil.copy('data/2021-22/gws/gw3.csv', f'{self.data_location}/2021-22/gws/gw3.csv')
+        third, = ingest.ingest(self.data_location, workers=1)
+        self.assertFalse(third['skipped'])
+
+class TestTableCache(unittest.TestCase):
+    def testLeastRecentlyUsedEvicted(self):
+        c = cache.table_cache(max_entries=2)
+        c.get(('data', '2021-22', 'gws', 1), lambda: 1)
+        c.get(('data', '2021-22', 'gws', 2), lambda: 2)
+        c.get(('data', '2021-22', 'gws', 1), lambda: 1)
+        c.get(('data', '2021-22', 'gws', 3), lambda: 3)
+        self.assertEqual(c.get(('data', '2021-22', 'gws', 1), lambda: -1), 1)
+        self.assertEqual(c.get(('data', '2021-22', 'gws', 2), lambda: -1), -1)
+        self.assertEqual(c.stats()['evictions'], 2)
+
+    def testFilesParsedOncePerProcess(self):
+        cache.shared_cache.invalidate('data', '2021-22')
+        cache.shared_cache.reset_stats()
+        for i in range(3):
+            fpl_data('data', '2021-22').get_gw_data('2021-22', 1)
+        stats = cache.shared_cache.stats()['tables']
+        self.assertEqual(stats['players']['misses'], 1)
+        self.assertEqual(stats['gws']['misses'], 1)
+        self.assertEqual(stats['gws']['hits'], 2)
+
+    def testTrailingSlashSharesEntries(self):
+        cache.shared_cache.invalidate('data', '2021-22')
+        cache.shared_cache.reset_stats()
+        fpl = fpl_data('data/', '2021-22')
+        fpl.get_gw_data('2021-22', 1)
+        fpl_data('data', '2021-22').get_gw_data('2021-22', 1)
+        self.assertEqual(cache.shared_cache.stats()['tables']['gws']['misses'], 1)
+        self.assertIs(fpl.player_ids, fpl_data('data', '2021-22').player_ids)
+        self.assertGreater(cache.shared_cache.invalidate('data/', '2021-22'), 0)
+        self.assertEqual(cache.shared_cache.invalidate('data', '2021-22'), 0)
+
+class TestTimeline(unittest.TestCase):
+    def testWindowSpansSeasons(self):
+        seasons = timeline.timeline('data')
+        self.assertEqual(seasons.resolve('2022-23', 0), ('2021-22', 38))
+        self.assertEqual(seasons.resolve('2022-23', -40), ('2020-21', 36))
+        window = seasons.window('2023-24', -76, 2)
+        self.assertEqual(len(window), 78)
+        self.assertEqual(window[0], ('2020-21', 38))
+        self.assertEqual(window[-1], ('2023-24', 1))
+        self.assertEqual(len(set(window)), len(window))
+
+    def testTeamIdsReconciled(self):
+        seasons = timeline.timeline('data')
+        self.assertEqual(seasons.team_name('2020-21', 1), 'Arsenal')
+        self.assertEqual(seasons.team_id('2023-24', 'Luton'), 12)
+        self.assertIsNone(seasons.team_id('2022-23', 'Burnley'))
+
+class TestFixtureIndex(unittest.TestCase):
+    def testMatchesFixtureTable(self):
+        fpl = fpl_data('data', '2021-22')
+        index = fpl.get_fixture_index('2021-22')
+        for week_num in [0, 17, 37, 38]:
+            next_fixtures = index.next_fixtures_all(week_num, 5)
+            for team_name, team_id in fpl.team_to_id.items():
+                team_fixtures = fpl.get_future_fixtures_for_team(team_name, week_num)[0:5]
+                home = (team_fixtures['team_h'] == team_id).to_numpy()
+                self.assertEqual(next_fixtures[team_id]['event'].tolist(), team_fixtures['event'].tolist())
+                self.assertEqual(next_fixtures[team_id]['home'].tolist(), home.tolist())
+                self.assertEqual(next_fixtures[team_id]['difficulty'].tolist(), np.where(home, team_fixtures['team_h_difficulty'], team_fixtures['team_a_difficulty']).tolist())
+                self.assertEqual(next_fixtures[team_id]['opponent'].tolist(), np.where(home, team_fixtures['team_a'], team_fixtures['team_h']).tolist())
+
+    def testUnscheduledFixturesLeftOut(self):
+        index = fixtures.fixture_index(pd.DataFrame({'id': [1, 2, 3], 'event': [1, None, 2], 'team_h': [1, 2, 2], 'team_a': [2, 1, 1],
+                                                     'team_h_difficulty': [2, 3, 4], 'team_a_difficulty': [5, 3, 2]}))
+        self.assertEqual(index.next_fixtures(1, 0)['fixture'].tolist(), [1, 3])
+        self.assertEqual(index.next_fixtures(2, 1)['difficulty'].tolist(), [4])
+        self.assertEqual(len(index.next_fixtures(7, 0)['event']), 0)
+
+class TestPostModelWeightings(unittest.TestCase):
+    def testMatchesNextFixture(self):
+        f = fpl_data('data', '2022-23')
+        gw_data = f.get_gw_data('2022-23', 5)
+        names = [name for name in gw_data.index.unique()[:40] if isinstance(f.get_player_team(name, 5, gw_data), str)]
+        xp = pd.DataFrame({'Name': names + ['Nobody Atall'], 'xP': np.linspace(1.0, 8.0, len(names) + 1)}).set_index('Name')
+        weighted = f.post_model_weightings_for_next_gw([xp], 5)[0]
+        fixture_index = f.get_fixture_index('2022-23')
+        for name, xP, p in zip(weighted.Name, xp.xP, weighted.xP):
+            if name == 'Nobody Atall':
+                self.assertEqual(p, 0)
+                continue
+            fixture = fixture_index.next_fixtures(f.team_to_id[f.get_player_team(name, 5, gw_data)], 5, 1)
+            weighting = (0.1 if fixture['home'][0] else -0.1) + {1: 0.2, 2: 0.05, 3: 0.0, 4: -0.05, 5: -0.2}[fixture['difficulty'][0]]
+            self.assertAlmostEqual(p, xP * (1 + weighting), delta=0.001)
+
+    def testConfigurableWeightings(self):
+        f = fpl_data('data', '2022-23')
+        gw_data = f.get_gw_data('2022-23', 5)
+        xp = pd.DataFrame({'Name': gw_data.index.unique()[:40], 'xP': 2.0}).set_index('Name')
+        weighted = f.post_model_weightings_for_next_gw([xp], 5, home_weighting=0.0, away_weighting=0.0, difficulty_weightings={})[0]
+        self.assertTrue(weighted.xP.isin([0.0, 2.0]).all())
+        self.assertTrue((weighted.xP == 2.0).any())
+
+class TestXpHorizon(unittest.TestCase):
+    def testDiscountedMean(self):
+        xp_horizon = horizon.xp_horizon(np.array(['A', 'B']), np.array([[2.0, 4.0, 1.0], [1.0, 1.0, 1.0]]))
+        self.assertEqual(xp_horizon.mean(2, 0.5).tolist(), [2.0, 0.75])
+        self.assertEqual(xp_horizon.mean(3, 1.0).tolist(), [2.33, 1.0])
+        self.assertEqual(xp_horizon.discounted(3, 0.5)[0].tolist(), [2.0, 2.0, 0.25])
+
+    def testMatchesNextFixtures(self):
+        f = fpl_data('data', '2022-23')
+        gw_data = f.get_gw_data('2022-23', 5)
+        names = [name for name in gw_data.index.unique()[:30] if isinstance(f.get_player_team(name, 5, gw_data), str)]
+        xp = pd.DataFrame({'Name': names + ['Nobody Atall'], 'xP': 3.0})
+        xp_horizon = f.get_xp_horizons([xp], 5, 6)[0]
+        self.assertEqual(xp_horizon.xp[-1].tolist(), [0.0] * 6)
+        fixture_index = f.get_fixture_index('2022-23')
+        for name, row in zip(names, xp_horizon.xp):
+            fixture_list = fixture_index.next_fixtures(f.team_to_id[f.get_player_team(name, 5, gw_data)], 5, 6)
+            for p, home, difficulty in zip(row, fixture_list['home'], fixture_list['difficulty']):
+                self.assertAlmostEqual(p, 3.0 + (0.1 if home else -0.1) + {1: 0.2, 2: 0.05, 3: 0.0, 4: -0.05, 5: -0.2}[difficulty])
+        # Shorter horizons are the first columns of a longer one
+        five = f.discount_next_n_gws([xp], 5, 5, discount_factor=0.8)[0]
+        self.assertEqual(five.xP.tolist(), xp_horizon.mean(5, 0.8).tolist())
+
+    def testConfigurableWeightings(self):
+        f = fpl_data('data', '2022-23')
+        gw_data = f.get_gw_data('2022-23', 5)
+        xp = pd.DataFrame({'Name': gw_data.index.unique()[:40], 'xP': 2.0})
+        xp_horizon = f.get_xp_horizons([xp], 5, 6, home_weighting=0.0, away_weighting=0.0, difficulty_weightings={})[0]
+        self.assertTrue(np.isin(xp_horizon.xp, [0.0, 2.0]).all())
+        self.assertTrue((xp_horizon.xp == 2.0).any())
+
+class TestPlayerWindow(unittest.TestCase):
+    def testWindowMeanAndForm(self):
+        weeks = [pd.DataFrame({'goals': [1, 0], 'threat': np.array([2.5, 1.0], dtype=np.float32)}, index=pd.Index(['A', 'B'], name='name')),
+                 pd.DataFrame({'goals': [2, 1, 0], 'threat': np.array([0.5, 1.5, 3.0], dtype=np.float32)}, index=pd.Index(['A', 'A', 'C'], name='name'))]
+        player_window = rolling.player_window([(1, rolling.week_totals(weeks[0])), (2, None), (3, rolling.week_totals(weeks[1]))])
+        pd.testing.assert_frame_equal(player_window.mean(1, 3), pd.concat(weeks).groupby('name').mean().astype({'goals': float}))
+        self.assertEqual(player_window.mean(3, 3).index.tolist(), ['A', 'C'])
+        self.assertEqual(player_window.ewm(1, 3, 0.5).loc['A', 'goals'], (0.25 * 1 + 3) / (0.25 + 2))
+
+    def testMatchesConcatenatedGameweeks(self):
+        f = fpl_data('data', '2022-23')
+        for from_gw in [-2, 3, 4]:
+            mids = f.sum_player_data('2022-23', from_gw, from_gw + 3)[2]
+            rows = pd.concat([f.get_pos_data('2022-23', week_num, 'MID') for week_num in range(from_gw, from_gw + 4)]).groupby('name').mean()
+            rows.loc[f.didnt_play_mask(rows.index, '2022-23', from_gw, from_gw + 1), :] = 0
+            pd.testing.assert_frame_equal(mids, rows, check_exact=False, rtol=1e-6)
+
+class TestTrainingData(unittest.TestCase):
+    def testWeekSplitMatchesPositions(self):
+        f = fpl_data('data', '2022-23')
+        for week_num in [0, 5]:
+            for position, pos_data in zip(['GK', 'DEF', 'MID', 'FWD'], f.get_all_pos_data('2022-23', week_num)):
+                pd.testing.assert_frame_equal(pos_data, f.get_pos_data('2022-23', week_num, position))
+
+    def testReport(self):
+        report = fpl_data('data', '2022-23').training_data_report('2022-23', 5, 6)
+        self.assertEqual(report['weeks'], 6)
+        self.assertGreater(report['rows'], 0)
+        self.assertGreater(report['peak_bytes'], 0)
+
+class TestPriceMatrix(unittest.TestCase):
+    def testMatchesGwData(self):
+        fpl = fpl_data('data', '2021-22')
+        for week_num in [1, 22, 38]:
+            gw_data = fpl.get_gw_data('2021-22', week_num)
+            # A copy without the source attrs takes the to_dict path
+            expected = {player: fpl.get_price(week_num, player, gw_data.iloc[:-1]) for player in gw_data.index[:-1]}
+            self.assertEqual({player: fpl.get_price(week_num, player, gw_data) for player in expected}, expected)
+            self.assertTrue(np.isnan(fpl.get_prices(['Not A Player'], gw_data)[0]))
+            self.assertEqual(fpl.get_prices(list(expected), gw_data).tolist(), list(expected.values()))
+
+    def testDoubleGameweekKeepsLastRow(self):
+        matrix = prices.build_price_matrix([(1, np.array(['A', 'B', 'A']), np.array([50, 45, 51])), (3, np.array(['B']), np.array([46]))])
+        self.assertEqual(matrix.price('A', 1), 5.1)
+        self.assertIsNone(matrix.price('A', 3))
+        self.assertFalse(matrix.has_gw(2))
+        self.assertEqual(matrix.tenths(['B', 'C'], 3).tolist(), [46, prices.NO_PRICE])
+
+    def testTeamValue(self):
+        t = team.team('2021-22', 2, players=[[], [], [], [], []])
+        for player, position in [('Mohamed Salah', 'MID'), ('Joel Matip', 'DEF'), ('Harry Kane', 'FWD')]:
+            t.add_player(player, position)
+        self.assertAlmostEqual(t.team_value(), sum(t.player_value(player, t.gw_data) for player in ['Mohamed Salah', 'Joel Matip', 'Harry Kane']))
+
+class TestPlayerIds(unittest.TestCase):
+    def testIdsDenseAndStable(self):
+        player_ids = ids.player_ids(['Mohamed Salah', 'Joel Matip'])
+        self.assertEqual(player_ids.intern_all(['Joel Matip', 'Player X', 'Mohamed Salah', 'Player X']), [1, 2, 0, 2])
+        self.assertEqual(player_ids.names_of([2, 0]), ['Player X', 'Mohamed Salah'])
+        self.assertIsNone(player_ids.lookup('Player Y'))
+        self.assertEqual(len(player_ids), 3)
+
+    def testTeamHoldsIdsAndExportsNames(self):
+        t = team.team('2021-22', 2, 100, players=[[], [], [], [], []])
+        t.add_player('Mohamed Salah', 'MID')
+        salah = t.player_ids.lookup('Mohamed Salah')
+        self.assertEqual(t.mids, [salah])
+        self.assertIs(t.fpl.player_ids, season_context('2021-22').player_ids)
+        self.assertTrue(t.player_in_squad('Mohamed Salah'))
+        self.assertTrue(t.player_in_squad(salah))
+        self.assertEqual(t.player_xp('Mohamed Salah', 'MID'), t.player_xp(salah, 'MID'))
+        self.assertEqual(t.player_p(salah, 'MID'), t.context.fpl.actual_points_dict('2021-22', 1)['Mohamed Salah'])
+        self.assertEqual([row[0] for row in t.team_p_list()], ['Mohamed Salah'])
+
+class TestAvailability(unittest.TestCase):
+    def testMatchesMinutesFilter(self):
+        fpl = fpl_data('data', '2021-22')
+        gw_data = fpl.get_gw_data('2021-22', 5)
+        season_availability = fpl.get_availability('2021-22')
+        names = list(dict.fromkeys(gw_data[gw_data['minutes'] == 0].index))
+        self.assertEqual(fpl.player_ids.names_of(season_availability.didnt_play_ids(5)), names)
+        played = list(dict.fromkeys(gw_data[gw_data['minutes'] > 0].index))
+        self.assertTrue(season_availability.played_mask(fpl.player_ids.intern_all(played), 5).all())
+
+    def testNonPlayersOfLastWeek(self):
+        with standin.stand_in_server(standin.synthesized_api('data', '2021-22')) as server:
+            fpl = fpl_data('data', '2021-22', api_url=server.base_url)
+            gw_data = fpl.get_gw_data('2021-22', 38)
+            pd.testing.assert_frame_equal(fpl.non_players('2021-22', 38), gw_data[gw_data['minutes'] == 0])
+            self.assertEqual(server.requested, [])
+
+    def testDoubleGameweekZeroMinutesCounts(self):
+        player_ids = ids.player_ids()
+        season_availability = availability.build_availability([(1, np.array(['A', 'B', 'A', 'C']), np.array([90, 0, 0, 0]))], player_ids)
+        self.assertEqual(player_ids.names_of(season_availability.didnt_play_ids(1)), ['B', 'A', 'C'])
+        self.assertEqual(player_ids.names_of(season_availability.didnt_play_ids(1, player_ids.intern_all(['C', 'A']))), ['A', 'C'])
+        self.assertEqual(season_availability.played_mask(player_ids.intern_all(['A', 'B', 'D']), 1).tolist(), [True, False, False])
+
+class TestXpIndex(unittest.TestCase):
+    def testAffordableBestFirst(self):
+        index = xp_index.position_index([10, 11, 12, 13, 14], np.array([9.0, 7.5, 5.0, 3.0, np.nan]), np.array([12.0, 6.5, np.nan, 4.5, 4.0]))
+        self.assertEqual(index.ids[index.affordable(7.0)].tolist(), [11, 13, 14])
+        self.assertEqual(index.ids[index.affordable(7.0, min_xp=3)].tolist(), [11, 13])
+        self.assertEqual(index.ids[index.affordable(20.0, after=1)].tolist(), [13, 14])
+        self.assertEqual(index.count_xp_at_least(5.0), 3)
+
+    def testMatchesSortedPredictions(self):
+        context = season_context('2021-22')
+        index = context.get_xp_index(3, 5, 0.8, 'MID', 3)
+        mids = context.get_n_gws_xp(3, 5, 0.8)[2].sort_values(by='xP', ascending=False)
+        self.assertEqual(context.player_ids.names_of(index.ids), mids.Name.tolist())
+        prices = context.fpl.get_prices(mids.Name.tolist(), context.get_gw_data(3))
+        ranks = index.affordable(6.0)
+        self.assertTrue((index.prices[ranks] <= 6.0).all())
+        self.assertEqual(len(ranks), int((prices <= 6.0).sum()))
+
+class TestNameIndex(unittest.TestCase):
+    def testFoldedNamesResolve(self):
+        self.assertEqual(names.fold('Gabriel_dos  Santos Magalhães'), 'gabriel dos santos magalhaes')
+        self.assertEqual(names.fold('Đorđe Petrović'), 'djordje petrovic')
+        index = fpl_data('data', '2023-24').get_name_index()
+        self.assertEqual(index.resolve('Gabriel dos Santos Magalhaes', '2023-24'), 'Gabriel dos Santos Magalhães')
+        self.assertEqual(index.resolve('Djordje Petrovic', '2023-24'), 'Đorđe Petrović')
+        self.assertEqual(index.resolve('Aaron_Cresswell_376', '2019-20'), 'Aaron Cresswell')
+        self.assertIsNone(index.resolve('Nobody Atall', '2023-24'))
+
+    def testIdentityAcrossSeasons(self):
+        index = fpl_data('data', '2023-24').get_name_index()
+        identity = index.identity_of('Erling Haaland', '2023-24')
+        self.assertEqual(index.identity_of('Haaland', '2022-23'), identity)
+        self.assertIsNone(index.element_of(identity, '2021-22'))
+        self.assertEqual(index.translate('Mohamed Salah', '2023-24', '2019-20'), 'Mohamed Salah')
+
+    def testTeamAcceptsUnaccentedNames(self):
+        t = team.team('2023-24', 1)
+        t.add_player('Gabriel dos Santos Magalhaes', 'DEF')
+        self.assertEqual(t.player_name(t.defs[0]), 'Gabriel dos Santos Magalhães')
+        self.assertTrue(t.name_in_list('gabriel dos santos magalhaes', [t.player_name(player) for player in t.defs]))
+        self.assertTrue(t.name_in_list('magalhaes', [t.player_name(player) for player in t.defs]))
+        self.assertFalse(t.name_in_list('Mohamed Salah', [t.player_name(player) for player in t.defs]))
+
+class TestPredictionsStore(unittest.TestCase):
+    def setUp(self):
+        self.predictions_location = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.predictions_location)
+
+    def testExportMatchesTsv(self):
+        for gameweek in [2, 1]:
+            gw_predictions = predictions.read_tsv_gw('predictions', '2022-23', gameweek)
+            evaluate.export_tsv([xp[['Name', 'xP']] for xp in gw_predictions], '2022-23', gameweek, tsv=True, predictions_location=self.predictions_location)
+        predictions_store = predictions.load_predictions(self.predictions_location, '2022-23')
+        self.assertEqual(predictions_store.gws(), [1, 2])
+        for stored, exported in zip(predictions_store.get_gw(2), predictions.read_tsv_gw(self.predictions_location, '2022-23', 2)):
+            pd.testing.assert_frame_equal(stored, exported[['Name', 'xP']])
+        self.assertEqual(predictions_store.get_player('Mohamed Salah')['gw'].tolist(), [1, 2])
+
+    def testAppendReplacesGameweek(self):
+        predictions.append_predictions(self.predictions_location, '2022-23', 5, [pd.DataFrame({'Name': ['A', 'B'], 'xP': [2.0, 1.0]})] + [pd.DataFrame({'Name': [], 'xP': []})] * 3)
+        predictions.append_predictions(self.predictions_location, '2022-23', 5, [pd.DataFrame({'Name': ['B'], 'xP': [3.0]})] + [pd.DataFrame({'Name': [], 'xP': []})] * 3)
+        predictions_store = predictions.load_predictions(self.predictions_location, '2022-23')
+        self.assertEqual(predictions_store.get_gw(5)[0]['Name'].tolist(), ['B'])
+        self.assertTrue(predictions_store.get_player('A').empty)
+
+class TestUpdater(unittest.TestCase):
+    def setUp(self):
+        self.data_location = tempfile.mkdtemp()
+        os.makedirs(f'{self.data_location}/2023-24/gws')
+        shutil.copy('data/2023-24/gws/gw1.csv', f'{self.data_location}/2023-24/gws/gw1.csv')
+        history = [{'element': 1, 'round': gameweek, 'fixture': gameweek, 'minutes': 90, 'total_points': gameweek, 'value': 50, 'was_home': True} for gameweek in [1, 2]]
+        responses = {
+            'bootstrap-static/': {
+                'events': [{'id': 1, 'deadline_time': '2023-08-11T17:30:00Z', 'finished': True}, {'id': 2, 'deadline_time': '2023-08-18T17:30:00Z', 'finished': True}, {'id': 3, 'deadline_time': '2023-08-25T17:30:00Z', 'finished': False}],
+                'elements': [{'id': 1, 'first_name': 'Folarin', 'second_name': 'Balogun', 'element_type': 4, 'team': 1, 'ep_this': '1.5', **{column: 0 for column in updater.CLEANED_PLAYER_COLUMNS[2:-1]}}],
+                'element_types': [{'id': 4, 'singular_name_short': 'FWD'}],
+                'teams': [{'id': 1, 'name': 'Arsenal'}],
+            },
+            'fixtures/': [{'id': 2, 'event': 2, 'team_h': 1, 'team_a': 2}],
+            'element-summary/1/': {'history': history, 'fixtures': [], 'history_past': []},
+        }
+        self.server = standin.stand_in_server(responses).start()
+        self.base_url, self.requested = self.server.base_url, self.server.requested
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.data_location)
+
+    def testOnlyMissingGameweeksFetched(self):
+        result = updater.updater(self.data_location, self.base_url).update()
+        self.assertEqual((result['season'], result['gameweeks']), ('2023-24', [2]))
+        gw_data = pd.read_csv(f'{self.data_location}/2023-24/gws/gw2.csv')
+        self.assertEqual(gw_data[['name', 'position', 'team', 'total_points']].values.tolist(), [['Folarin Balogun', 'FWD', 'Arsenal', 2]])
+        self.assertTrue(os.path.exists(f'{self.data_location}/2023-24/players/Folarin_Balogun_1/gw.csv'))
+
+        self.requested.clear()
+        result = updater.updater(self.data_location, self.base_url).update()
+        self.assertEqual(result['gameweeks'], [])
+        self.assertEqual(self.requested, ['bootstrap-static/'])
+
+class TestBootstrapSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.cache_location = tempfile.mkdtemp()
+        self.server = standin.stand_in_server({'bootstrap-static/': {'events': [{'id': 1, 'deadline_time': '2000-01-01T00:00:00Z', 'average_entry_score': 50}]}}).start()
+        self.base_url, self.requested = self.server.base_url, self.server.requested
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.cache_location)
+
+    def testOneRequestPerTtl(self):
+        snapshot = api.bootstrap_snapshot(self.base_url, self.cache_location, ttl=60)
+        self.assertEqual(snapshot.get()['events'][0]['id'], 1)
+        snapshot.get()
+        # A new process within the TTL reads the snapshot on disk
+        api.bootstrap_snapshot(self.base_url, self.cache_location, ttl=60).get()
+        self.assertEqual(len(self.requested), 1)
+
+    def testOfflineNeverRequests(self):
+        with self.assertRaises(requests.ConnectionError):
+            api.bootstrap_snapshot(self.base_url, self.cache_location, offline=True).get()
+        api.bootstrap_snapshot(self.base_url, self.cache_location, ttl=0).get()
+        self.assertEqual(api.bootstrap_snapshot(self.base_url, self.cache_location, ttl=0, offline=True).get()['events'][0]['average_entry_score'], 50)
+        self.assertEqual(len(self.requested), 1)
+
+class TestStandIn(unittest.TestCase):
+    def testRecentGwFromSynthesizedApi(self):
+        with standin.stand_in_server(standin.synthesized_api('data', '2021-22', gameweek=10)) as server:
+            fpl = fpl_data('data', '2021-22', api_url=server.base_url)
+            self.assertEqual(fpl.get_recent_gw(), 10)
+            summary = requests.get(f'{server.base_url}element-summary/233/').json()
+            self.assertEqual(max(fixture['round'] for fixture in summary['history']), 10)
+            self.assertTrue(all(fixture['event'] > 10 for fixture in summary['fixtures']))
+            self.assertEqual(requests.get(f'{server.base_url}element-summary/0/').status_code, 404)
+
+    def testRecordingReplayed(self):
+        recording = tempfile.mkdtemp()
+        try:
+            with standin.stand_in_server(standin.synthesized_api('data', '2021-22', gameweek=10)) as server:
+                self.assertEqual(standin.record(server.base_url, recording, elements=[233]), 3)
+            with standin.stand_in_server(standin.load_recording(recording)) as server:
+                self.assertEqual(fpl_data('data', '2021-22', api_url=server.base_url).get_recent_gw(), 10)
+                self.assertEqual(len(requests.get(f'{server.base_url}element-summary/233/').json()['history']), 10)
+        finally:
+            shutil.rmtree(recording)
+
+class TestFetcher(unittest.TestCase):
+    def testPlayersStreamedIntoStore(self):
+        data_location = tempfile.mkdtemp()
+        try:
+            # Every third request fails, so each is only written after a retry
+            with standin.stand_in_server(standin.synthesized_api('data', '2021-22', gameweek=10), error_every=3) as server:
+                result = fetcher.fetch_players(data_location, '2021-22', server.base_url, max_per_second=100, elements=[233, 559])
+            self.assertEqual((result['players'], result['failed']), (2, []))
+            self.assertGreater(result['retries'], 0)
+            fetched = players.load_player_store(data_location, '2021-22').get_player(233)
+            # The reference store is built from the dataset's player directory, not its compiled files
+            shutil.copytree('data/2021-22/players/Mohamed_Salah_233', f'{data_location}/reference/2021-22/players/Mohamed_Salah_233')
+            players.build_player_store(f'{data_location}/reference', '2021-22')
+            expected = players.load_player_store(f'{data_location}/reference', '2021-22').get_player(233)
+            self.assertEqual(fetched['total_points'].tolist(), expected['total_points'].tolist()[:10])
+            self.assertTrue(os.path.exists(f'{data_location}/2021-22/players/Mohamed_Salah_233/history.csv'))
+        finally:
+            shutil.rmtree(data_location)
+
+    def testUnfetchedPlayersKept(self):
+        data_location = tempfile.mkdtemp()
+        try:
+            with standin.stand_in_server(standin.synthesized_api('data', '2021-22', gameweek=10)) as server:
+                fetcher.fetch_players(data_location, '2021-22', server.base_url, max_per_second=100, elements=[233, 559])
+                before = players.load_player_store(data_location, '2021-22').get_player(559)
+                result = fetcher.fetch_players(data_location, '2021-22', server.base_url, max_per_second=100, elements=[233])
+            self.assertEqual(result['players'], 1)
+            after = players.load_player_store(data_location, '2021-22')
+            self.assertEqual(sorted(after.elements()), [233, 559])
+            self.assertEqual(after.get_player(559)['total_points'].tolist(), before['total_points'].tolist())
+        finally:
+            shutil.rmtree(data_location)
+
+class TestSeasonContext(unittest.TestCase):
+    def testContextSharedBetweenGameweeks(self):
+        context = season_context('2021-22')
+        t1 = team.team('2021-22', 2, context=context)
+        t2 = team.team('2021-22', 3, context=context)
+        self.assertIs(t1.fpl, t2.fpl)
+        self.assertIs(t1.gk_player_list, t2.gk_player_list)
+        self.assertIs(team.team('2021-22', 2, context=context).all_xp, t1.all_xp)
+
+    def testPastSeasonMakesNoRequests(self):
+        with standin.stand_in_server(standin.synthesized_api('data', '2022-23')) as server:
+            season_context('2022-23', api_url=server.base_url)
+            self.assertEqual(server.requested, [])
+
+    def testContextIsImmutable(self):
+        context = season_context('2021-22')
+        with self.assertRaises(AttributeError):
+            context.season = '2022-23'
+
 if __name__ == '__main__':
     unittest.main()
 